@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: автозакрытие неактивных инцидентов при разном числе открытых.
+
+per-incident — прежняя схема: выборка открытых инцидентов и по запросу
+               событий на каждый (2N+1 запросов, закрытие через ORM)
+set-based    — auto_resolve_inactive_incidents(): последние события
+               по типам одним GROUP BY и один UPDATE
+
+Перед каждым замером создаются --open открытых инцидентов старше окна;
+по сетевым событиям есть свежая активность, остальные типы закрываются.
+per-incident сравнивает ID типа события с ID типа инцидента и поэтому
+закрывает и сетевые инциденты — число закрытых у режимов различается.
+Используется временная SQLite-база.
+
+Запуск:
+    python3 benchmarks/bench_auto_resolve.py --open 100 1000 10000
+"""
+
+import argparse
+import datetime as dt
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--open", type=int, nargs="+", default=[100, 1000, 10000], help="Открытых инцидентов")
+    parser.add_argument("--events", type=int, default=20000, help="Событий в таблице")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SIEM_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        import siem_backend.data.models_user  # noqa: F401
+        from sqlalchemy import delete, insert, select
+        from siem_backend.data.db import SessionLocal, init_db
+        from siem_backend.data.event_repository import EventRepository, event_dedup_hash
+        from siem_backend.data.models import Event, EventType, Incident, IncidentType
+        from siem_backend.data.reference import references
+        from siem_backend.services.incident_service import IncidentService
+
+        init_db()
+        db = SessionLocal()
+        event_types = references.ensure_loaded(db).ids(EventType)
+        incident_types = list(references.ids(IncidentType).values())
+        now = dt.datetime.utcnow()
+
+        rows = []
+        for i in range(args.events):
+            # Свежие события только сетевые; остальные старше окна
+            kind = "network" if i % 4 == 0 else "authentication"
+            ts = now - dt.timedelta(minutes=5 if kind == "network" else 180, milliseconds=i)
+            message = f"event {i} of {kind}"
+            rows.append({
+                "ts": ts,
+                "source_os_id": 1,
+                "source_category_id": 1,
+                "event_type_id": event_types[kind],
+                "severity_id": 1,
+                "message": message,
+                "template_id": None,
+                "raw_data": {},
+                "dedup_hash": event_dedup_hash(ts, message, 1),
+            })
+        EventRepository().insert_rows(db, rows)
+        db.commit()
+
+        def per_incident(minutes: int = 60) -> int:
+            cutoff = dt.datetime.utcnow() - dt.timedelta(minutes=minutes)
+            stmt = select(Incident).where(Incident.detected_at < cutoff, Incident.status != "resolved")
+            resolved = 0
+            for incident in db.execute(stmt).scalars().all():
+                if not references.name(IncidentType, incident.incident_type_id, default=""):
+                    continue
+                event_stmt = select(Event).where(
+                    Event.ts >= cutoff, Event.event_type_id == incident.incident_type_id
+                )
+                if not db.execute(event_stmt).scalars().first():
+                    incident.status = "resolved"
+                    incident.resolved_at = dt.datetime.utcnow()
+                    incident.resolved_by = "auto"
+                    resolved += 1
+            db.commit()
+            return resolved
+
+        service = IncidentService()
+        for count in args.open:
+            results = {}
+            for mode in ("per-incident", "set-based"):
+                db.execute(delete(Incident))
+                db.execute(insert(Incident), [
+                    {
+                        "detected_at": now - dt.timedelta(hours=2),
+                        "incident_type_id": incident_types[i % len(incident_types)],
+                        "severity_id": 1,
+                        "description": f"incident {i}",
+                        "details": {},
+                    }
+                    for i in range(count)
+                ])
+                db.commit()
+                db.expunge_all()
+
+                started = time.perf_counter()
+                if mode == "per-incident":
+                    resolved = per_incident()
+                else:
+                    resolved = service.auto_resolve_inactive_incidents(db, minutes=60)
+                results[mode] = (time.perf_counter() - started, resolved)
+
+            line = ", ".join(f"{mode} {elapsed * 1000:8.1f} мс ({resolved} закр.)" for mode, (elapsed, resolved) in results.items())
+            print(f"открытых {count:>6}: {line}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: размер и время ответа списка событий при разных наборах полей.
+
+full      — fields=<все поля> (прежний ответ: raw_data у каждого события)
+default   — без fields: всё, кроме raw_data; app извлекается в SQL
+dashboard — поля статистики дашборда (карта приложений, последние события)
+chart     — fields=ts,severity (график событий по часам)
+
+Замер — запрос страницы через list_events() и сериализация в JSON так,
+как это делает FastAPI (лучший из --repeat). raw_data событий похож на
+записи unified log macOS (~1,5 КБ). Используется временная SQLite-база.
+
+Запуск:
+    python3 benchmarks/bench_event_list.py --events 20000 --limit 500
+"""
+
+import argparse
+import datetime as dt
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def raw_payload(i: int) -> dict:
+    """raw_data в духе записи unified log."""
+    return {
+        "process": f"app{i % 40}",
+        "processImagePath": f"/Applications/App{i % 40}.app/Contents/MacOS/App{i % 40}",
+        "subsystem": "com.apple.network",
+        "category": "connection",
+        "eventMessage": f"nw_connection_copy_connected_local_endpoint [C{i}] Connection has no local endpoint " * 4,
+        "formatString": "%{public}s [C%llu] %{public}s",
+        "senderImagePath": "/System/Library/Frameworks/Network.framework/Versions/A/Network",
+        "machTimestamp": 1000000 + i,
+        "threadID": 4000 + i,
+        "activityIdentifier": 0,
+        "backtrace": {"frames": [{"imageOffset": 1000 + k, "imageUUID": "8A3E4C5B-0000-4000-8000-%012d" % k} for k in range(6)]},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20000, help="Событий в таблице")
+    parser.add_argument("--limit", type=int, default=500, help="Размер страницы")
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов на замер (берётся лучший)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SIEM_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        import siem_backend.data.models_user  # noqa: F401
+        from fastapi import Response
+        from pydantic import TypeAdapter
+        from siem_backend.api.routes.events import FIELD_COLUMNS, list_events
+        from siem_backend.api.schemas.events import EventOut
+        from siem_backend.data.db import SessionLocal, init_db
+        from siem_backend.data.event_repository import EventRepository, event_dedup_hash
+
+        init_db()
+        db = SessionLocal()
+        base = dt.datetime(2026, 3, 28, 12, 0, 0)
+        repo = EventRepository()
+        for start in range(0, args.events, 10000):
+            rows = []
+            for i in range(start, min(start + 10000, args.events)):
+                ts = base + dt.timedelta(seconds=i)
+                message = f"nw_connection [C{i}] Connection has no local endpoint"
+                rows.append({
+                    "ts": ts,
+                    "source_os_id": 1,
+                    "source_category_id": 1,
+                    "event_type_id": 1,
+                    "severity_id": 1,
+                    "message": message,
+                    "template_id": None,
+                    "raw_data": raw_payload(i),
+                    "dedup_hash": event_dedup_hash(ts, message, 1),
+                })
+            repo.insert_rows(db, rows)
+            db.commit()
+
+        adapter = TypeAdapter(list[EventOut])
+        modes = {
+            "full": ",".join(FIELD_COLUMNS),
+            "default": None,
+            "dashboard": "ts,event_type,severity,source_category,message,app",
+            "chart": "ts,severity",
+        }
+
+        def respond(fields) -> bytes:
+            db.expunge_all()
+            items = list_events(
+                Response(), severity=None, limit=args.limit, offset=0, after=None, before=None, fields=fields, db=db
+            )
+            return adapter.dump_json(items, exclude_unset=True)
+
+        results = {}
+        for mode, fields in modes.items():
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                body = respond(fields)
+                timings.append(time.perf_counter() - started)
+            results[mode] = (min(timings), len(body))
+
+        full_time, full_size = results["full"]
+        for mode, (elapsed, size) in results.items():
+            print(
+                f"{mode:>9}: {size / 1024:8.1f} КБ ({full_size / size:5.1f}x меньше), "
+                f"{elapsed * 1000:7.2f} мс ({full_time / elapsed:5.1f}x быстрее)"
+            )
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: пиковая память при загрузке файла логов в БД.
+
+Сравнивает сбор списком (collect() + сохранение всего списка одним пакетом)
+с потоковым сбором (iter_events() + save_normalized_event_stream пакетами).
+Используется временная SQLite-база.
+
+Запуск:
+    python3 benchmarks/bench_event_stream.py --lines 20000 50000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[20000, 50000], help="Размеры файла в строках")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Размер пакета потокового сохранения")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SIEM_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        from generate_realtime_logs import generate_log_line
+        from siem_backend.data.db import SessionLocal, init_db
+        from siem_backend.services.collectors.file import FileLogCollector
+        from siem_backend.services.collectors.tail import FileCheckpoint
+        from siem_backend.services.event_service import EventService
+
+        init_db()
+        random.seed(42)
+
+        for n in args.lines:
+            for mode in ("list", "stream"):
+                path = os.path.join(tmp, f"{mode}-{n}.log")
+                with open(path, "w", encoding="utf-8") as f:
+                    for i in range(n):
+                        # Уникальные сообщения, чтобы дедупликация не отбрасывала строки
+                        f.write(f"{generate_log_line()} #{mode}{i}\n")
+
+                db = SessionLocal()
+                # Чтение с начала файла в режиме слежения — файл читается чанками
+                start = FileCheckpoint(inode=os.stat(path).st_ino, offset=0)
+                collector = FileLogCollector(file_path=path, follow=True, checkpoint=start)
+                tracemalloc.start()
+                started = time.perf_counter()
+                if mode == "list":
+                    saved = EventService().save_normalized_event_stream(db, collector.collect(), chunk_size=n)
+                else:
+                    saved = EventService().save_normalized_event_stream(
+                        db, collector.iter_events(), chunk_size=args.chunk_size
+                    )
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                db.close()
+
+                print(
+                    f"{mode:<7} строк {n:>8}: сохранено {saved:>8}, {elapsed:7.2f} с, "
+                    f"пик памяти {peak / (1024 * 1024):8.1f} МБ"
+                )
+
+
+if __name__ == "__main__":
+    main()
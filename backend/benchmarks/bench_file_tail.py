@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: чтение последних N строк большого файла логов.
+
+Сравнивает прежний путь FileLogCollector (readlines() целиком и срез хвоста)
+с чтением от конца файла блоками (read_last_lines).
+
+Запуск:
+    python3 benchmarks/bench_file_tail.py --size-mb 1024 --lines 100
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from siem_backend.services.collectors.tail import read_last_lines
+
+LINE = "2026-03-28 15:00:00,000 ERROR nginx[1234]: Connection timeout to 10.0.0.5:80\n"
+
+
+def make_file(path: str, size_mb: int) -> None:
+    chunk = LINE * (1024 * 1024 // len(LINE))
+    target = size_mb * 1024 * 1024
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            f.write(chunk)
+            written += len(chunk)
+
+
+def readlines_tail(path: str, n: int) -> list:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return [ln.rstrip("\n") for ln in f.readlines()[-n:]]
+
+
+def measure(fn, path: str, n: int) -> tuple:
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn(path, n)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=1024, help="Размер синтетического файла, МБ")
+    parser.add_argument("--lines", type=int, default=100, help="Сколько последних строк читать")
+    parser.add_argument("--file", default=None, help="Использовать готовый файл вместо синтетического")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = os.path.join(tmp, "system.log")
+            print(f"Генерация файла {args.size_mb} МБ...")
+            make_file(path, args.size_mb)
+
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        print(f"Файл: {path} ({size_mb:.0f} МБ), строк: {args.lines}\n")
+
+        tail, tail_time, tail_peak = measure(read_last_lines, path, args.lines)
+        print(f"read_last_lines: {tail_time * 1000:10.2f} мс, пик памяти {tail_peak / 1024:10.1f} КБ")
+
+        full, full_time, full_peak = measure(readlines_tail, path, args.lines)
+        print(f"readlines():     {full_time * 1000:10.2f} мс, пик памяти {full_peak / 1024:10.1f} КБ")
+
+        assert tail == full, "Результаты чтения различаются"
+        print(f"\nУскорение: x{full_time / tail_time:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: повторные запуски анализа — полное окно против водяного знака.
+
+full        — каждый запуск считает всё окно (run_analysis(incremental=False))
+incremental — каждый запуск читает только события новее водяного знака SystemRun
+
+Окно заполняется --events событиями, затем выполняется --runs запусков,
+перед каждым добавляется --new новых событий. Используется временная SQLite-база.
+
+Запуск:
+    python3 benchmarks/bench_incremental_analysis.py --events 100000 --runs 12 --new 500
+"""
+
+import argparse
+import datetime as dt
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+MESSAGES = {
+    "authentication": "sshd[{i}]: Failed password for root from 10.0.0.{m}",
+    "network": "nginx[{i}]: Connection timeout to 10.0.0.{m}",
+    "service": "launchd[{i}]: Service exited with code {m}",
+    "system": "kernel[{i}]: CPU frequency changed to {m} MHz",
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=100000, help="Событий в окне до первого запуска")
+    parser.add_argument("--runs", type=int, default=12, help="Число запусков")
+    parser.add_argument("--new", type=int, default=500, help="Новых событий перед каждым запуском")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SIEM_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        import siem_backend.data.models_user  # noqa: F401
+        from siem_backend.data.db import SessionLocal, init_db
+        from siem_backend.data.event_repository import EventRepository, event_dedup_hash
+        from siem_backend.data.models import EventType
+        from siem_backend.data.reference import references
+        from siem_backend.services.incident_service import IncidentService
+
+        init_db()
+        repo = EventRepository()
+        kinds = list(MESSAGES)
+        counter = 0
+
+        def insert(db, n: int, mode: str) -> None:
+            nonlocal counter
+            type_ids = references.ensure_loaded(db).ids(EventType)
+            now = dt.datetime.utcnow()
+            rows = []
+            for _ in range(n):
+                i = counter
+                counter += 1
+                kind = kinds[i % len(kinds)]
+                ts = now - dt.timedelta(milliseconds=n - len(rows))
+                message = MESSAGES[kind].format(i=i, m=i % 255) + f" {mode}"
+                rows.append({
+                    "ts": ts,
+                    "source_os_id": 1,
+                    "source_category_id": 1,
+                    "event_type_id": type_ids.get(kind, 1),
+                    "severity_id": 1,
+                    "message": message,
+                    "template_id": None,
+                    "raw_data": {"line": message},
+                    "dedup_hash": event_dedup_hash(ts, message, 1),
+                })
+            repo.insert_rows(db, rows)
+            db.commit()
+
+        for mode in ("full", "incremental"):
+            db = SessionLocal()
+            insert(db, args.events, mode)
+            service = IncidentService()
+            incremental = mode == "incremental"
+            # Первый запуск инкрементального режима строит окна по всему окну
+            service.run_analysis(db, incremental=incremental)
+            timings = []
+            for _ in range(args.runs):
+                insert(db, args.new, mode)
+                started = time.perf_counter()
+                service.run_analysis(db, incremental=incremental)
+                timings.append(time.perf_counter() - started)
+            db.close()
+            timings.sort()
+            print(
+                f"{mode:<12} окно ~{args.events} соб., +{args.new} за запуск: "
+                f"медиана {timings[len(timings) // 2] * 1000:8.1f} мс, сумма {sum(timings) * 1000:8.1f} мс"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: разбор строк файла логов.
+
+Сравнивает прежний каскад re.match/re.search из FileLogCollector
+(_parse_line + _extract_process_name) с закреплённым форматом LineParser.
+
+Запуск:
+    python3 benchmarks/bench_line_parser.py --lines 200000
+"""
+
+import argparse
+import datetime as dt
+import os
+import random
+import re
+import sys
+import time
+from typing import Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_realtime_logs import generate_log_line
+from siem_backend.services.collectors.parsers import LineParser
+
+
+class LegacyParser:
+    """Копия прежнего разбора строк FileLogCollector."""
+
+    def parse(self, line: str):
+        ts, msg = self._parse_line(line)
+        return ts, msg, self._extract_process_name(line, msg)
+
+    def _extract_process_name(self, raw_line: str, msg: str) -> str:
+        def is_meaningful(value: str) -> bool:
+            v = (value or "").strip()
+            if not v:
+                return False
+            if v.isdigit():
+                return False
+            return re.search(r"[A-Za-zА-Яа-я]", v) is not None
+
+        text = raw_line or msg or ""
+
+        service_in_msg_match = re.search(r"\b([a-zA-Z0-9_-]+)\.service:", msg or "")
+        if service_in_msg_match:
+            service_name = service_in_msg_match.group(1)
+            if is_meaningful(service_name):
+                return service_name
+
+        iso_format_match = re.match(
+            r"^\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2},\d+\s+\w+\s+(?P<proc>[^\s\[]+)(?:\[(?P<pid>\d+)\])?:\s+.*$",
+            text,
+        )
+        if iso_format_match:
+            proc = iso_format_match.group("proc")
+            if is_meaningful(proc):
+                return proc
+
+        m_full = re.match(
+            r"^(?:[A-Z][a-z]{2}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}\s+)?(?P<host>\S+)\s+(?P<proc>[^\s\[]+)(?:\[(?P<pid>\d+)\])?:\s+.*$",
+            text,
+        )
+        if m_full:
+            proc = m_full.group("proc")
+            if is_meaningful(proc):
+                return proc
+
+        m_msg = re.match(
+            r"^(?P<host>\S+)\s+(?P<proc>[^\s\[]+)(?:\[(?P<pid>\d+)\])?:\s+.*$",
+            msg or "",
+        )
+        if m_msg:
+            proc = m_msg.group("proc")
+            if is_meaningful(proc):
+                return proc
+
+        m_proc = re.match(r"^\s*(?P<proc>[^\s:]+?)(?:\[\d+\])?:\s+.*$", text)
+        if m_proc:
+            proc = m_proc.group("proc")
+            if is_meaningful(proc):
+                return proc
+
+        return ""
+
+    def _parse_line(self, line: str) -> Tuple[str, str]:
+        iso_match = re.match(
+            r"^(?P<ts>\d{4}-\d{2}-\d{2}[T\s]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?)\s+(?P<msg>.*)$",
+            line,
+        )
+        if iso_match:
+            ts = iso_match.group("ts").replace(" ", "T")
+            msg = iso_match.group("msg")
+            return self._to_iso_utc(ts), msg
+
+        syslog_match = re.match(
+            r"^(?P<mon>[A-Z][a-z]{2})\s+(?P<day>\d{1,2})\s+(?P<time>\d{2}:\d{2}:\d{2})\s+(?P<msg>.*)$",
+            line,
+        )
+        if syslog_match:
+            mon = syslog_match.group("mon")
+            day = int(syslog_match.group("day"))
+            time_part = syslog_match.group("time")
+            msg = syslog_match.group("msg")
+
+            ts = self._syslog_to_iso(mon, day, time_part)
+            return ts, msg
+
+        return dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z", line
+
+    def _syslog_to_iso(self, mon: str, day: int, time_part: str) -> str:
+        months = {
+            "Jan": 1,
+            "Feb": 2,
+            "Mar": 3,
+            "Apr": 4,
+            "May": 5,
+            "Jun": 6,
+            "Jul": 7,
+            "Aug": 8,
+            "Sep": 9,
+            "Oct": 10,
+            "Nov": 11,
+            "Dec": 12,
+        }
+
+        year = dt.datetime.utcnow().year
+        month = months.get(mon)
+        if month is None:
+            return dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+        try:
+            hour, minute, second = [int(x) for x in time_part.split(":")]
+            parsed = dt.datetime(year, month, day, hour, minute, second)
+            return parsed.replace(microsecond=0).isoformat() + "Z"
+        except ValueError:
+            return dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+    def _to_iso_utc(self, ts: str) -> str:
+        try:
+            parsed = dt.datetime.fromisoformat(ts.replace("Z", "+00:00"))
+        except ValueError:
+            return dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+        if parsed.tzinfo is None:
+            return parsed.replace(microsecond=0).isoformat() + "Z"
+
+        return parsed.astimezone(dt.timezone.utc).replace(tzinfo=None, microsecond=0).isoformat() + "Z"
+
+
+def run_legacy(lines: list) -> None:
+    parser = LegacyParser()
+    for line in lines:
+        parser.parse(line)
+
+
+def run(label: str, fn, lines: list, repeat: int) -> float:
+    # Лучший из нескольких прогонов — машина может быть занята другими задачами
+    elapsed = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(lines)
+        elapsed = min(elapsed, time.perf_counter() - started)
+    rate = len(lines) / elapsed
+    print(f"{label:<16} {rate:12,.0f} строк/с")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=200000, help="Количество строк")
+    parser.add_argument("--repeat", type=int, default=5, help="Количество прогонов (берётся лучший)")
+    args = parser.parse_args()
+
+    random.seed(42)
+    lines = [generate_log_line() for _ in range(args.lines)]
+
+    line_parser = LineParser()
+    line_parser.sniff(lines)
+
+    legacy_rate = run("legacy cascade", run_legacy, lines, args.repeat)
+    pinned_rate = run("pinned format", line_parser.parse_many, lines, args.repeat)
+    print(f"\nУскорение: x{pinned_rate / legacy_rate:.1f}")
+
+
+if __name__ == "__main__":
+    main()
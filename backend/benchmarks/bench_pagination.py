@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: глубокие страницы списка событий — OFFSET против курсора.
+
+offset — ORDER BY ts DESC, id DESC LIMIT n OFFSET page * n
+cursor — WHERE (ts, id) < курсор ORDER BY ts DESC, id DESC LIMIT n
+
+Для каждой глубины берётся лучший из --repeat замеров одной страницы.
+Используется временная SQLite-база.
+
+Запуск:
+    python3 benchmarks/bench_pagination.py --events 200000 --pages 0 100 1000 3000
+"""
+
+import argparse
+import datetime as dt
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200000, help="Событий в таблице")
+    parser.add_argument("--pages", type=int, nargs="+", default=[0, 100, 1000, 3000], help="Номера страниц")
+    parser.add_argument("--limit", type=int, default=50, help="Размер страницы")
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов на замер (берётся лучший)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SIEM_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        import siem_backend.data.models_user  # noqa: F401
+        from fastapi import Response
+        from sqlalchemy import select
+        from siem_backend.api.pagination import encode_cursor, fetch_page
+        from siem_backend.data.db import SessionLocal, init_db
+        from siem_backend.data.event_repository import EventRepository, event_dedup_hash
+        from siem_backend.data.models import Event
+
+        init_db()
+        db = SessionLocal()
+        base = dt.datetime(2026, 3, 28, 12, 0, 0)
+        repo = EventRepository()
+        for start in range(0, args.events, 50000):
+            rows = []
+            for i in range(start, min(start + 50000, args.events)):
+                # По два события на миллисекунду: сортировке нужен id
+                ts = base + dt.timedelta(milliseconds=i // 2)
+                message = f"event {i}"
+                rows.append({
+                    "ts": ts,
+                    "source_os_id": 1,
+                    "source_category_id": 1,
+                    "event_type_id": 1,
+                    "severity_id": 1,
+                    "message": message,
+                    "template_id": None,
+                    "raw_data": {},
+                    "dedup_hash": event_dedup_hash(ts, message, 1),
+                })
+            repo.insert_rows(db, rows)
+            db.commit()
+
+        def page(**kwargs):
+            db.expunge_all()
+            return fetch_page(db, select(Event), Event.ts, Event.id, Response(), limit=args.limit, **kwargs)
+
+        def best(**kwargs) -> float:
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                page(**kwargs)
+                timings.append(time.perf_counter() - started)
+            return min(timings)
+
+        for number in args.pages:
+            offset = number * args.limit
+            if offset >= args.events:
+                continue
+            cursor = None
+            if offset:
+                # Курсор последней записи предыдущей страницы
+                previous = page(offset=offset - args.limit)[-1]
+                cursor = encode_cursor(previous.ts, previous.id)
+            assert [e.id for e in page(offset=offset)] == [e.id for e in page(after=cursor)]
+            print(
+                f"страница {number:>5} (offset {offset:>7}): "
+                f"offset {best(offset=offset) * 1000:7.2f} мс, cursor {best(after=cursor) * 1000:7.2f} мс"
+            )
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: анализ окна событий — отдельный запрос на правило, общий проход,
+агрегатные запросы и параллельный запуск правил.
+
+per-rule  — каждое правило читает окно своим select(Event) (rule.run())
+shared    — RuleEngine читает окно один раз строками (id, ts, event_type_id, message)
+aggregate — RuleEngine считает пороговые правила в БД (COUNT/MAX с ILIKE)
+parallel  — aggregate, но каждое правило в своём потоке со своей сессией
+
+Используется временная SQLite-база.
+
+Запуск:
+    python3 benchmarks/bench_rule_scan.py --events 10000 100000
+"""
+
+import argparse
+import datetime as dt
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+MESSAGES = {
+    "authentication": "sshd[{i}]: Failed password for root from 10.0.0.{m}",
+    "network": "nginx[{i}]: Connection timeout to 10.0.0.{m}",
+    "service": "launchd[{i}]: Service exited with code {m}",
+    "system": "kernel[{i}]: CPU frequency changed to {m} MHz",
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, nargs="+", default=[10000, 100000], help="Размеры окна")
+    parser.add_argument("--repeat", type=int, default=3, help="Повторов на режим (берётся лучший)")
+    parser.add_argument("--workers", type=int, default=4, help="Потоков в режиме parallel")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SIEM_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        import siem_backend.data.models_user  # noqa: F401
+        from siem_backend.data.db import SessionLocal, init_db
+        from siem_backend.data.event_repository import EventRepository, event_dedup_hash
+        from siem_backend.data.models import EventType
+        from siem_backend.data.reference import references
+        from siem_backend.services.analysis.engine import RuleEngine
+        from siem_backend.services.incident_service import IncidentService
+
+        init_db()
+        rules = IncidentService()._default_rules()
+        repo = EventRepository()
+        base = dt.datetime(2026, 3, 28, 15, 0, 0)
+        inserted = 0
+
+        for n in args.events:
+            db = SessionLocal()
+            type_ids = references.ensure_loaded(db).ids(EventType)
+            kinds = list(MESSAGES)
+            rows = []
+            for i in range(inserted, n):
+                kind = kinds[i % len(kinds)]
+                ts = base + dt.timedelta(milliseconds=i)
+                message = MESSAGES[kind].format(i=i, m=i % 255)
+                rows.append({
+                    "ts": ts,
+                    "source_os_id": 1,
+                    "source_category_id": 1,
+                    "event_type_id": type_ids.get(kind, 1),
+                    "severity_id": 1,
+                    "message": message,
+                    "template_id": None,
+                    "raw_data": {"line": message, "service": kind, "pid": i},
+                    "dedup_hash": event_dedup_hash(ts, message, 1),
+                })
+            repo.insert_rows(db, rows)
+            db.commit()
+            inserted = n
+
+            since, until = base, base + dt.timedelta(days=1)
+            results = {}
+            for mode in ("per-rule", "shared", "aggregate", "parallel"):
+                best = None
+                for _ in range(args.repeat):
+                    db.expunge_all()
+                    started = time.perf_counter()
+                    if mode == "per-rule":
+                        found = [c for rule in rules for c in rule.run(db, since=since, until=until)]
+                    else:
+                        engine = RuleEngine(
+                            rules,
+                            aggregate=(mode != "shared"),
+                            workers=args.workers if mode == "parallel" else 0,
+                        )
+                        found = engine.run(db, since=since, until=until)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                results[mode] = (best, len(found))
+                summary = sorted((c.incident_type, c.details["count"], c.event_id) for c in found)
+                if mode == "per-rule":
+                    expected = summary
+                elif summary != expected:
+                    print(f"  {mode}: результат отличается от per-rule: {summary} != {expected}")
+            db.close()
+
+            line = ", ".join(f"{mode} {best * 1000:8.1f} мс ({count} инц.)" for mode, (best, count) in results.items())
+            print(f"событий {n:>7}: {line}")
+
+
+if __name__ == "__main__":
+    main()
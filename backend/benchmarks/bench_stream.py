@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк: нагрузка на БД от N клиентов дашборда — опрос против потока.
+
+polling — каждый клиент на каждом тике перечитывает списки, как прежний
+          startPolling: инциденты (500), события (500), уведомления (20)
+stream  — клиенты подключены к StreamHub; на каждую пачку новых событий
+          записи читаются и сериализуются один раз для всех
+
+На каждый из --batches тиков записывается пачка из --batch событий.
+Считаются SQL-запросы и время (для stream — до получения пачки всеми
+клиентами). Используется временная SQLite-база.
+
+Запуск:
+    python3 benchmarks/bench_stream.py --clients 1 10 50
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50], help="Подключённых клиентов")
+    parser.add_argument("--events", type=int, default=20000, help="Событий в таблице до замера")
+    parser.add_argument("--batches", type=int, default=20, help="Тиков (пачек новых событий)")
+    parser.add_argument("--batch", type=int, default=10, help="Событий в пачке")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SIEM_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        import siem_backend.data.models_user  # noqa: F401
+        from fastapi import Response
+        from sqlalchemy import event as sa_event
+        from siem_backend.api.routes.events import list_events
+        from siem_backend.api.routes.incidents import list_incidents
+        from siem_backend.api.routes.notifications import list_notifications
+        from siem_backend.api.stream import StreamHub
+        from siem_backend.data.db import SessionLocal, engine, init_db
+        from siem_backend.data.event_repository import EventRepository, event_dedup_hash
+        from siem_backend.services.stream_bus import StreamBus
+
+        init_db()
+        db = SessionLocal()
+        repo = EventRepository()
+        base = dt.datetime(2026, 3, 28, 12, 0, 0)
+        counter = {"next": 0}
+
+        def write_batch(size: int):
+            rows = []
+            for _ in range(size):
+                i = counter["next"]
+                counter["next"] += 1
+                ts = base + dt.timedelta(seconds=i)
+                message = f"nginx.service: Main process exited {i}"
+                rows.append({
+                    "ts": ts,
+                    "source_os_id": 1,
+                    "source_category_id": 1,
+                    "event_type_id": 1,
+                    "severity_id": 1,
+                    "message": message,
+                    "template_id": None,
+                    "raw_data": {"service": "nginx"},
+                    "dedup_hash": event_dedup_hash(ts, message, 1),
+                })
+            inserted = repo.insert_rows(db, rows)
+            db.commit()
+            return list(inserted.values())
+
+        for start in range(0, args.events, 10000):
+            write_batch(min(10000, args.events - start))
+
+        statements = {"count": 0}
+        sa_event.listen(engine, "before_cursor_execute", lambda *a: statements.__setitem__("count", statements["count"] + 1))
+
+        def poll_tick(clients: int) -> None:
+            for _ in range(clients):
+                session = SessionLocal()
+                try:
+                    list_incidents(Response(), severity=None, incident_type=None, limit=500, offset=0,
+                                   after=None, before=None, db=session)
+                    list_events(Response(), severity=None, limit=500, offset=0, after=None, before=None,
+                                fields="id,ts,source_os,source_category,event_type,severity,message,app", db=session)
+                    list_notifications(Response(), severity=None, notification_type=None, channel=None,
+                                       status=None, limit=20, offset=0, after=None, before=None, db=session)
+                finally:
+                    session.close()
+
+        async def stream_run(clients: int) -> None:
+            bus = StreamBus()
+            hub = StreamHub(bus=bus, queue_size=args.batches + 1)
+            loop = asyncio.get_running_loop()
+            connected = [hub.connect(loop) for _ in range(clients)]
+            for _ in range(args.batches):
+                ids = await asyncio.to_thread(write_batch, args.batch)
+                await asyncio.to_thread(bus.publish, "event", ids)
+                for client in connected:
+                    await client.queue.get()
+            for client in connected:
+                hub.disconnect(client)
+
+        for clients in args.clients:
+            results = {}
+            for mode in ("polling", "stream"):
+                db.expunge_all()
+                statements["count"] = 0
+                started = time.perf_counter()
+                if mode == "polling":
+                    for _ in range(args.batches):
+                        write_batch(args.batch)
+                        poll_tick(clients)
+                else:
+                    asyncio.run(stream_run(clients))
+                # Запросы записи одинаковы в обоих режимах: считаем только чтение
+                results[mode] = (time.perf_counter() - started, statements["count"] - args.batches)
+            line = ", ".join(
+                f"{mode} {queries:6d} запросов {elapsed * 1000:8.1f} мс" for mode, (elapsed, queries) in results.items()
+            )
+            print(f"клиентов {clients:>4}: {line}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Миграция: Составные индексы под запросы правил анализа и списков.
+
+- events (event_type_id, ts) — правила: event_type_id = ? AND ts BETWEEN ? AND ?
+- events (severity_id, ts, id) — список событий с фильтром серьёзности
+- events (ts DESC, id DESC), incidents (detected_at DESC, id DESC),
+  notifications (created_at DESC, id DESC) — курсорная пагинация
+- incidents (status, detected_at), notifications (status, created_at, id)
+
+Индексы берутся из моделей; уже существующие пропускаются, поэтому
+миграцию можно запускать повторно. На большой таблице PostgreSQL
+построение индекса блокирует запись — запускайте в окно обслуживания.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from siem_backend.core.config import settings
+from siem_backend.data.models import Event, Incident, Notification
+
+INDEX_NAMES = (
+    "ix_events_event_type_id_ts",
+    "ix_events_severity_id_ts",
+    "ix_events_ts_id",
+    "ix_incidents_detected_at_id",
+    "ix_incidents_status_detected_at",
+    "ix_notifications_created_at_id",
+    "ix_notifications_status_created_at",
+)
+
+engine = create_engine(settings.database_url, future=True)
+indexes = {
+    index.name: index
+    for model in (Event, Incident, Notification)
+    for index in model.__table__.indexes
+}
+
+conn = engine.connect()
+for name in INDEX_NAMES:
+    try:
+        indexes[name].create(conn, checkfirst=True)
+        conn.commit()
+        print(f"✓ Индекс {name} готов")
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Ошибка создания индекса {name}: {e}")
+conn.close()
+
+# Обновляем статистику планировщика под новые индексы
+conn = engine.connect()
+try:
+    conn.exec_driver_sql("ANALYZE")
+    conn.commit()
+    print("✓ Статистика планировщика обновлена")
+except Exception as e:
+    conn.rollback()
+    print(f"✗ Ошибка ANALYZE: {e}")
+conn.close()
+
+print("\n=== Миграция завершена ===")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Миграция: Хэш дедупликации events.dedup_hash с уникальным индексом.
+
+Хэш существующих событий вычисляется пакетами по 1000. Если в таблице уже
+есть дубликаты, хэш получает только самое раннее событие, остальным
+остаётся NULL — иначе уникальный индекс не создать.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select, text, update
+from sqlalchemy.orm import Session
+from siem_backend.core.config import settings
+from siem_backend.data.event_repository import event_dedup_hash
+from siem_backend.data.models import Event
+
+BATCH_SIZE = 1000
+
+engine = create_engine(settings.database_url, future=True)
+conn = engine.connect()
+
+try:
+    conn.execute(text("ALTER TABLE events ADD COLUMN dedup_hash VARCHAR(32)"))
+    conn.commit()
+    print("✓ Добавлено поле dedup_hash")
+except Exception as e:
+    conn.rollback()
+    if "duplicate column" not in str(e).lower() and "already exists" not in str(e).lower():
+        print(f"✗ Ошибка добавления dedup_hash: {e}")
+    else:
+        print("✓ Поле dedup_hash уже существует")
+
+conn.close()
+
+# Вычисление хэшей существующих событий
+total = 0
+skipped = 0
+with Session(engine) as db:
+    seen = set(db.execute(select(Event.dedup_hash).where(Event.dedup_hash.is_not(None))).scalars())
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(Event.id, Event.ts, Event.message, Event.source_os_id)
+            .where(Event.dedup_hash.is_(None), Event.id > last_id)
+            .order_by(Event.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        values = []
+        for event_id, ts, message, source_os_id in rows:
+            dedup_hash = event_dedup_hash(ts, message, source_os_id)
+            if dedup_hash in seen:
+                skipped += 1
+                continue
+            seen.add(dedup_hash)
+            values.append({"id": event_id, "dedup_hash": dedup_hash})
+        if values:
+            db.execute(update(Event), values)
+        db.commit()
+
+        last_id = rows[-1][0]
+        total += len(rows)
+        print(f"  обработано событий: {total}")
+
+print(f"✓ Хэши вычислены: {total - skipped}, дубликатов без хэша: {skipped}")
+
+conn = engine.connect()
+try:
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_events_dedup_hash ON events (dedup_hash)"))
+    conn.commit()
+    print("✓ Уникальный индекс ix_events_dedup_hash готов")
+except Exception as e:
+    conn.rollback()
+    print(f"✗ Ошибка создания индекса: {e}")
+conn.close()
+
+print("\n=== Миграция завершена ===")
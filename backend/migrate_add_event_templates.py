@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Миграция: Таблица шаблонов сообщений event_templates и поле events.template_id.
+
+Существующие события размечаются шаблонами пакетами по 1000.
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, select, text, update
+from sqlalchemy.orm import Session
+from siem_backend.core.config import settings
+from siem_backend.data.models import Event, EventTemplate
+from siem_backend.services.event_template_service import EventTemplateService
+
+BATCH_SIZE = 1000
+
+engine = create_engine(settings.database_url, future=True)
+
+EventTemplate.__table__.create(bind=engine, checkfirst=True)
+print("✓ Таблица event_templates готова")
+
+conn = engine.connect()
+
+try:
+    conn.execute(text("""
+        ALTER TABLE events ADD COLUMN template_id INTEGER REFERENCES event_templates(id) ON DELETE SET NULL
+    """))
+    conn.commit()
+    print("✓ Добавлено поле template_id")
+except Exception as e:
+    conn.rollback()
+    if "duplicate column" not in str(e).lower() and "already exists" not in str(e).lower():
+        print(f"✗ Ошибка добавления template_id: {e}")
+    else:
+        print("✓ Поле template_id уже существует")
+
+try:
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_events_template_id ON events (template_id)"))
+    conn.commit()
+    print("✓ Индекс ix_events_template_id готов")
+except Exception as e:
+    conn.rollback()
+    print(f"✗ Ошибка создания индекса: {e}")
+
+conn.close()
+
+# Разметка существующих событий
+service = EventTemplateService()
+total = 0
+with Session(engine) as db:
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(Event.id, Event.message)
+            .where(Event.template_id.is_(None), Event.id > last_id)
+            .order_by(Event.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        template_ids = service.assign(db, [message or "" for _, message in rows])
+        db.execute(
+            update(Event),
+            [{"id": event_id, "template_id": template_id} for (event_id, _), template_id in zip(rows, template_ids)],
+        )
+        db.commit()
+
+        last_id = rows[-1][0]
+        total += len(rows)
+        print(f"  размечено событий: {total}")
+
+print(f"✓ Событий размечено шаблонами: {total}")
+print("\n=== Миграция завершена ===")
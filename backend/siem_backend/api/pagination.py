@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import datetime as dt
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import literal, tuple_
+from sqlalchemy.orm import InstrumentedAttribute, Session
+from sqlalchemy.sql import Select
+
+# Заголовки ответа с курсорами соседних страниц
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+PREV_CURSOR_HEADER = "X-Prev-Cursor"
+
+
+def encode_cursor(ts: dt.datetime, row_id: int) -> str:
+    """
+    Непрозрачный курсор позиции в списке.
+
+    Args:
+        ts: Время записи (ключ сортировки)
+        row_id: ID записи (разрешает равные времена)
+
+    Returns:
+        Строка base64url
+    """
+    raw = f"{ts.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[dt.datetime, int]:
+    """
+    Разбирает курсор encode_cursor().
+
+    Raises:
+        HTTPException: 400, если курсор повреждён
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        ts, row_id = raw.rsplit("|", 1)
+        return dt.datetime.fromisoformat(ts), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def fetch_page(
+    db: Session,
+    stmt: Select,
+    ts_column: InstrumentedAttribute,
+    id_column: InstrumentedAttribute,
+    response: Response,
+    *,
+    limit: int,
+    offset: int = 0,
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+) -> List[Any]:
+    """
+    Страница списка от новых записей к старым.
+
+    С курсором after — записи старше курсора, с before — новее него;
+    условие (время, id) < курсор идёт по составному индексу, поэтому
+    дальняя страница стоит столько же, сколько первая. Без курсоров
+    работает прежний offset. Курсоры соседних страниц возвращаются
+    в заголовках X-Next-Cursor (старше) и X-Prev-Cursor (новее).
+
+    Args:
+        db: Сессия БД
+        stmt: Запрос без сортировки и лимита (фильтры уже применены)
+        ts_column: Столбец времени
+        id_column: Столбец ID
+        response: Ответ для заголовков
+        limit: Размер страницы
+        offset: Смещение (только без курсоров)
+        after: Курсор последней записи предыдущей страницы
+        before: Курсор первой записи следующей страницы
+
+    Returns:
+        Записи страницы от новых к старым
+
+    Raises:
+        HTTPException: 400 при конфликте параметров или повреждённом курсоре
+    """
+    if after is not None and before is not None:
+        raise HTTPException(status_code=400, detail="Use either 'after' or 'before', not both")
+    if offset and (after is not None or before is not None):
+        raise HTTPException(status_code=400, detail="'offset' cannot be combined with a cursor")
+
+    key = tuple_(ts_column, id_column)
+
+    def position(token: str):
+        # Типизированные параметры: время хранится в формате столбца
+        ts, row_id = decode_cursor(token)
+        return tuple_(literal(ts, ts_column.type), literal(row_id, id_column.type))
+
+    if before is not None:
+        # Страница новее курсора: читаем по возрастанию и разворачиваем
+        stmt = stmt.where(key > position(before)).order_by(ts_column.asc(), id_column.asc())
+    else:
+        if after is not None:
+            stmt = stmt.where(key < position(after))
+        stmt = stmt.order_by(ts_column.desc(), id_column.desc()).offset(offset)
+    rows = list(db.execute(stmt.limit(limit)).scalars().all())
+    if before is not None:
+        rows.reverse()
+
+    if rows:
+        full = len(rows) == limit
+        has_older = full if before is None else True
+        has_newer = (after is not None or offset > 0) if before is None else full
+        ts_name, id_name = ts_column.key, id_column.key
+        if has_older:
+            last = rows[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, ts_name), getattr(last, id_name))
+        if has_newer:
+            first = rows[0]
+            response.headers[PREV_CURSOR_HEADER] = encode_cursor(getattr(first, ts_name), getattr(first, id_name))
+    return rows
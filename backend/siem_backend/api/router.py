@@ -8,6 +8,7 @@ from siem_backend.api.routes.health import router as health_router
 from siem_backend.api.routes.incidents import router as incidents_router
 from siem_backend.api.routes.notifications import router as notifications_router
 from siem_backend.api.routes.profile import router as profile_router
+from siem_backend.api.routes.stream import router as stream_router
 from siem_backend.api.routes.users import router as users_router
 
 api_router = APIRouter()
@@ -19,4 +20,5 @@ api_router.include_router(events_router, prefix="/events", tags=["events"])
 api_router.include_router(incidents_router, prefix="/incidents", tags=["incidents"])
 api_router.include_router(notifications_router, prefix="/notifications", tags=["notifications"])
 api_router.include_router(profile_router, prefix="/profile", tags=["profile"])
+api_router.include_router(stream_router, prefix="/stream", tags=["stream"])
 api_router.include_router(users_router, tags=["users"])
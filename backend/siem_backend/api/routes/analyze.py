@@ -1,11 +1,18 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Query
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from siem_backend.api.auth import get_current_user
+from siem_backend.api.schemas.analyze import RuleStatsOut, RuleTriggerOut, SystemRunOut
 from siem_backend.data.db import get_db
+from siem_backend.data.models import AnalysisRule, SystemRun
 from siem_backend.data.models_user import User
+from siem_backend.data.reference import references
+from siem_backend.data.rule_trigger_repository import RuleTriggerRepository
+from siem_backend.data.system_run_repository import SystemRunRepository
 from siem_backend.services.incident_service import IncidentService
 
 router = APIRouter()
@@ -25,3 +32,66 @@ def run_analysis(
     """
     found = IncidentService().run_analysis(db, since_minutes=since_minutes)
     return {"incidents_found": found}
+
+
+def _run_out(run: SystemRun) -> SystemRunOut:
+    details = run.details or {}
+    rules = [RuleStatsOut(**entry) for entry in (details.get("rule_stats") or {}).values()]
+    rules.sort(key=lambda entry: entry.wall_ms, reverse=True)
+    return SystemRunOut(
+        id=run.id,
+        started_at=run.started_at,
+        finished_at=run.finished_at,
+        duration_ms=round((run.finished_at - run.started_at).total_seconds() * 1000, 3),
+        status=run.status,
+        mode=details.get("mode"),
+        rules_executed=run.rules_executed,
+        incidents_found=run.incidents_found,
+        watermark=(details.get("watermark") or {}).get("event_id"),
+        rules=rules,
+    )
+
+
+@router.get("/runs", response_model=list[SystemRunOut])
+def list_runs(
+    limit: int = Query(default=20, ge=1, le=200),
+    before_id: Optional[int] = Query(default=None, ge=1),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> list[SystemRunOut]:
+    """
+    Журнал запусков анализа со счётчиками правил.
+
+    Правила в каждом запуске отсортированы по времени выполнения,
+    чтобы самое дорогое было первым. Следующая страница — before_id
+    равный ID последнего запуска в ответе.
+    """
+    return [_run_out(run) for run in SystemRunRepository().list_recent(db, limit=limit, before_id=before_id)]
+
+
+@router.get("/runs/{run_id}/triggers", response_model=list[RuleTriggerOut])
+def list_run_triggers(
+    run_id: int,
+    limit: int = Query(default=500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> list[RuleTriggerOut]:
+    """Срабатывания правил, записанные за время запуска анализа."""
+    run = SystemRunRepository().get_by_id(db, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Analysis run not found")
+
+    references.ensure_loaded(db)
+    triggers = RuleTriggerRepository().list_between(db, run.started_at, run.finished_at, limit=limit)
+    return [
+        RuleTriggerOut(
+            id=trigger.id,
+            rule=references.name(AnalysisRule, trigger.rule_id),
+            incident_id=trigger.incident_id,
+            event_id=trigger.event_id,
+            triggered_at=trigger.triggered_at,
+            severity_at_trigger=trigger.severity_at_trigger,
+            details=trigger.details or {},
+        )
+        for trigger in triggers
+    ]
@@ -1,22 +1,73 @@
 import os
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from siem_backend.api.auth import get_current_user, require_admin
 from siem_backend.data.db import get_db
+from siem_backend.data.log_source_repository import LogSourceRepository
 from siem_backend.data.models_user import User
 from siem_backend.services.collectors.file import FileLogCollector
 from siem_backend.services.collectors.macos import MacOSLogCollector, normalized_event_to_dict
 from siem_backend.services.collectors.mock import MockLogCollector
-from siem_backend.services.event_service import EventService
+from siem_backend.services.collectors.tail import FileCheckpoint
+from siem_backend.services.ingest_queue import IngestQueueFull, IngestTicket, ingest_queue
 from siem_backend.services.system_log_exporter import SystemLogExporter
 
 router = APIRouter()
 
 
+class _Counted:
+    """Обёртка итератора, считающая отданные элементы."""
+
+    def __init__(self, iterable) -> None:
+        self._iterable = iterable
+        self.count = 0
+
+    def __iter__(self):
+        for item in self._iterable:
+            self.count += 1
+            yield item
+
+
+# Сколько ждать фиксации при wait=true
+COMMIT_WAIT_TIMEOUT = 30.0
+
+
+def _enqueue(events, wait: bool, on_commit=None) -> dict:
+    """
+    Ставит события в очередь записи.
+
+    Args:
+        events: Итератор событий
+        wait: Дождаться фиксации событий в БД
+        on_commit: Вызывается писателем после фиксации
+
+    Returns:
+        Поля ответа: собрано, поставлено в очередь, глубина очереди
+
+    Raises:
+        HTTPException: 429, если очередь переполнена
+    """
+    counted = _Counted(events)
+    try:
+        ticket: IngestTicket = ingest_queue.put_many(counted, on_commit=on_commit)
+    except IngestQueueFull:
+        raise HTTPException(status_code=429, detail="Ingest queue is full, retry later")
+
+    result = {
+        "collected_count": counted.count,
+        "queued_count": counted.count,
+        "queue_depth": ingest_queue.stats()["depth"],
+    }
+    if wait:
+        result["committed"] = ticket.wait(COMMIT_WAIT_TIMEOUT) and ticket.error is None
+    return result
+
+
 @router.post("/auto")
 def collect_auto(
+    wait: bool = Query(default=False),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> dict:
@@ -25,6 +76,11 @@ def collect_auto(
     
     Доступно для ВСЕХ авторизованных пользователей,
     чтобы обеспечить обновление данных в реальном времени.
+
+    Читает только строки, дописанные после прошлого вызова: контрольная
+    точка (inode, смещение, незавершённая строка) хранится в LogSource.config.
+    События записываются очередью; ответ возвращается сразу после постановки
+    в очередь (wait=true — после фиксации).
     """
     backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
     file_path = os.path.join(backend_dir, "logs", "system.log")
@@ -32,44 +88,45 @@ def collect_auto(
     if not os.path.exists(file_path):
         return {
             "collected_count": 0,
-            "saved_count": 0,
+            "queued_count": 0,
             "file_path": file_path,
             "error": "Log file not found",
         }
 
-    collector = FileLogCollector(file_path=file_path, max_lines=100)
-    events = collector.collect()
-    saved_count = EventService().save_normalized_events(db, events)
-    
-    return {
-        "collected_count": len(events),
-        "saved_count": saved_count,
-        "file_path": file_path,
-    }
+    sources = LogSourceRepository()
+    checkpoint = FileCheckpoint.from_dict(sources.get_file_checkpoint(db, file_path))
+
+    collector = FileLogCollector(file_path=file_path, max_lines=100, follow=True, checkpoint=checkpoint)
+
+    def save_checkpoint(writer_db: Session) -> None:
+        # Контрольная точка сдвигается только после фиксации событий
+        if collector.checkpoint is not None and collector.checkpoint != checkpoint:
+            sources.save_file_checkpoint(writer_db, file_path, collector.checkpoint.to_dict())
+
+    result = _enqueue(collector.iter_events(), wait, on_commit=save_checkpoint)
+    result["file_path"] = file_path
+    return result
 
 
 @router.post("/test")
 def collect_test(
     last: str = Query(default="2m"),
     max_entries: int = Query(default=50, ge=1, le=500),
-    db: Session = Depends(get_db),
     _ = Depends(require_admin),
 ) -> dict:
     collector = MacOSLogCollector(last=last, max_entries=max_entries)
     events = collector.collect()
-    saved_count = EventService().save_normalized_events(db, events)
-    return {
-        "collected_count": len(events),
-        "saved_count": saved_count,
-        "events": [normalized_event_to_dict(e) for e in events],
-    }
+    # Через очередь: события пишет только её поток, ID фиксируются по порядку
+    result = _enqueue(events, wait=True)
+    result["events"] = [normalized_event_to_dict(e) for e in events]
+    return result
 
 
 @router.post("/file")
 def collect_file(
     file_path: str = Query(default=None),
     max_lines: int = Query(default=100, ge=1, le=5000),
-    db: Session = Depends(get_db),
+    wait: bool = Query(default=False),
     _ = Depends(require_admin),
 ) -> dict:
     if not file_path:
@@ -77,36 +134,29 @@ def collect_file(
         file_path = os.path.join(backend_dir, "logs", "system.log")
     
     collector = FileLogCollector(file_path=file_path, max_lines=max_lines)
-    events = collector.collect()
-    saved_count = EventService().save_normalized_events(db, events)
-    return {
-        "collected_count": len(events),
-        "saved_count": saved_count,
-        "file_path": file_path,
-    }
+    result = _enqueue(collector.iter_events(), wait)
+    result["file_path"] = file_path
+    return result
 
 
 @router.post("/mock")
 def collect_mock(
     event_count: int = Query(default=18, ge=10, le=20),
-    db: Session = Depends(get_db),
     _ = Depends(require_admin),
 ) -> dict:
     collector = MockLogCollector(event_count=event_count)
     events = collector.collect()
-    saved_count = EventService().save_normalized_events(db, events)
-    return {
-        "collected_count": len(events),
-        "saved_count": saved_count,
-        "events": [normalized_event_to_dict(e) for e in events],
-    }
+    # Через очередь: события пишет только её поток, ID фиксируются по порядку
+    result = _enqueue(events, wait=True)
+    result["events"] = [normalized_event_to_dict(e) for e in events]
+    return result
 
 
 @router.post("/system")
 def collect_system(
     last_minutes: int = Query(default=5, ge=1, le=60),
     max_lines: int = Query(default=200, ge=1, le=5000),
-    db: Session = Depends(get_db),
+    wait: bool = Query(default=False),
     _ = Depends(require_admin),
 ) -> dict:
     exporter = SystemLogExporter(output_file="./logs/system.log")
@@ -116,17 +166,11 @@ def collect_system(
         return {
             "exported": False,
             "collected_count": 0,
-            "saved_count": 0,
+            "queued_count": 0,
             "error": "Failed to export system logs",
         }
 
     collector = FileLogCollector(file_path="./logs/system.log", max_lines=max_lines)
-    events = collector.collect()
-
-    saved_count = EventService().save_normalized_events(db, events)
-
-    return {
-        "exported": True,
-        "collected_count": len(events),
-        "saved_count": saved_count,
-    }
+    result = _enqueue(collector.iter_events(), wait)
+    result["exported"] = True
+    return result
@@ -1,65 +1,177 @@
-from typing import Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import select
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, load_only, with_expression
+from sqlalchemy.sql import Select
 
-from siem_backend.api.schemas.events import EventOut
+from siem_backend.api.pagination import fetch_page
+from siem_backend.api.schemas.events import EventOut, EventTemplateOut
 from siem_backend.data.db import get_db
+from siem_backend.data.event_template_repository import EventTemplateRepository
 from siem_backend.data.models import Event, EventType, SeverityLevel, SourceCategoryRef, SourceOS
+from siem_backend.data.reference import references
 from siem_backend.services.event_formatter import format_event_description
 
 router = APIRouter()
 
+# Столбцы Event, нужные каждому полю ответа (id и ts читаются всегда — курсоры)
+FIELD_COLUMNS = {
+    "id": (),
+    "ts": (),
+    "source_os": (Event.source_os_id,),
+    "source_category": (Event.source_category_id,),
+    "event_type": (Event.event_type_id,),
+    "severity": (Event.severity_id,),
+    "message": (Event.message,),
+    "template_id": (Event.template_id,),
+    "description": (Event.event_type_id, Event.source_category_id, Event.severity_id, Event.message),
+    "app": (),
+    "raw_data": (Event.raw_data,),
+}
 
-@router.get("/", response_model=list[EventOut])
+# По умолчанию список отдаёт всё, кроме raw_data (полные данные — GET /events/{id})
+DEFAULT_FIELDS = tuple(name for name in FIELD_COLUMNS if name != "raw_data")
+
+# Первое непустое из process/service/application — то же, что показывает дашборд
+APP_EXPRESSION = func.coalesce(
+    *(func.nullif(Event.raw_data[key].as_string(), "") for key in ("process", "service", "application"))
+)
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """
+    Разбирает параметр fields= (имена полей EventOut через запятую).
+
+    Args:
+        fields: Значение параметра или None
+
+    Returns:
+        Имена полей в порядке схемы (без параметра — DEFAULT_FIELDS)
+
+    Raises:
+        HTTPException: 400, если указано неизвестное поле
+    """
+    if fields is None:
+        return list(DEFAULT_FIELDS)
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - FIELD_COLUMNS.keys())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if not requested:
+        raise HTTPException(status_code=400, detail="'fields' must list at least one field")
+    return [name for name in FIELD_COLUMNS if name in requested]
+
+
+def event_statement(fields: List[str]) -> Select:
+    """
+    Запрос событий, читающий только столбцы заданных полей.
+
+    Args:
+        fields: Имена полей (результат parse_fields)
+
+    Returns:
+        SELECT без фильтров и сортировки
+    """
+    columns = {Event.id, Event.ts}
+    for name in fields:
+        columns.update(FIELD_COLUMNS[name])
+    stmt = select(Event).options(load_only(*columns))
+    if "app" in fields:
+        stmt = stmt.options(with_expression(Event.app, APP_EXPRESSION))
+    return stmt
+
+
+def event_values(row: Event, fields: List[str]) -> Dict[str, Any]:
+    """
+    Значения полей ответа для события (справочники уже загружены).
+
+    Args:
+        row: Событие (загружены столбцы FIELD_COLUMNS для fields)
+        fields: Имена полей
+
+    Returns:
+        Словарь поле -> значение
+    """
+    values: Dict[str, Any] = {}
+    for name in fields:
+        if name == "source_os":
+            values[name] = references.name(SourceOS, row.source_os_id)
+        elif name == "source_category":
+            values[name] = references.name(SourceCategoryRef, row.source_category_id)
+        elif name == "event_type":
+            values[name] = references.name(EventType, row.event_type_id)
+        elif name == "severity":
+            values[name] = references.name(SeverityLevel, row.severity_id)
+        elif name == "description":
+            values[name] = format_event_description(row)
+        elif name == "raw_data":
+            values[name] = row.raw_data or {}
+        else:
+            values[name] = getattr(row, name)
+    return values
+
+
+@router.get("/", response_model=list[EventOut], response_model_exclude_unset=True)
 def list_events(
+    response: Response,
     severity: Optional[Literal["low", "medium", "high", "critical"]] = Query(default=None),
     limit: int = Query(default=50, ge=1, le=500),
     offset: int = Query(default=0, ge=0),
+    after: Optional[str] = Query(default=None, description="Курсор: события старше (X-Next-Cursor)"),
+    before: Optional[str] = Query(default=None, description="Курсор: события новее (X-Prev-Cursor)"),
+    fields: Optional[str] = Query(
+        default=None,
+        description="Поля ответа через запятую (по умолчанию все, кроме raw_data)",
+    ),
     db: Session = Depends(get_db),
 ) -> list[EventOut]:
-    stmt = (
-        select(Event)
-        .options(
-            joinedload(Event.source_os_rel),
-            joinedload(Event.source_category_rel),
-            joinedload(Event.event_type_rel),
-            joinedload(Event.severity_rel),
-        )
-        .order_by(Event.ts.desc())
-        .limit(limit)
-        .offset(offset)
-    )
+    """
+    Список событий от новых к старым.
+
+    Читаются только столбцы запрошенных полей: raw_data (самый тяжёлый
+    столбец) в список не попадает, пока его не запросили явно через
+    fields=raw_data; приложение-источник (app) извлекается из него в SQL.
+    """
+    selected = parse_fields(fields)
+    references.ensure_loaded(db)
+    stmt = event_statement(selected)
     
     if severity is not None:
         # Получаем ID уровня серьёзности
-        severity_stmt = select(SeverityLevel.id).where(SeverityLevel.name == severity)
-        severity_id = db.execute(severity_stmt).scalar_one_or_none()
+        severity_id = references.id(SeverityLevel, severity)
         if severity_id:
             stmt = stmt.where(Event.severity_id == severity_id)
 
-    rows = db.execute(stmt).scalars().unique().all()
-    result: list[EventOut] = []
-    
-    for row in rows:
-        # Получаем названия из связанных объектов
-        source_os_name = row.source_os_rel.name if row.source_os_rel else "unknown"
-        source_category_name = row.source_category_rel.name if row.source_category_rel else "unknown"
-        event_type_name = row.event_type_rel.name if row.event_type_rel else "unknown"
-        severity_name = row.severity_rel.name if row.severity_rel else "unknown"
-        
-        item = EventOut(
-            id=row.id,
-            ts=row.ts,
-            source_os=source_os_name,
-            source_category=source_category_name,
-            event_type=event_type_name,
-            severity=severity_name,
-            message=row.message,
-            description=format_event_description(row),
-            raw_data=row.raw_data or {},
-        )
-        result.append(item)
-
-    return result
+    rows = fetch_page(
+        db, stmt, Event.ts, Event.id, response, limit=limit, offset=offset, after=after, before=before
+    )
+    # Без проверки: значения уже нужных типов, в ответ попадают только заданные поля
+    return [EventOut.model_construct(**event_values(row, selected)) for row in rows]
+
+
+@router.get("/templates", response_model=list[EventTemplateOut])
+def list_event_templates(
+    limit: int = Query(default=50, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_db),
+) -> list[EventTemplateOut]:
+    """Шаблоны сообщений, самые частые первыми."""
+    templates = EventTemplateRepository().list_top(db, limit=limit, offset=offset)
+    return [EventTemplateOut.model_validate(t) for t in templates]
+
+
+@router.get("/{event_id}", response_model=EventOut)
+def get_event(
+    event_id: int,
+    db: Session = Depends(get_db),
+) -> EventOut:
+    """Событие целиком, включая исходные данные raw_data."""
+    stmt = select(Event).where(Event.id == event_id).options(with_expression(Event.app, APP_EXPRESSION))
+    event = db.execute(stmt).scalars().first()
+
+    if event is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    references.ensure_loaded(db)
+    return EventOut(**event_values(event, list(FIELD_COLUMNS)))
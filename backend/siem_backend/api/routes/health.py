@@ -1,8 +1,23 @@
 from fastapi import APIRouter
 
+from siem_backend.services.ingest_queue import ingest_queue
+from siem_backend.services.normalization import classification_cache
+
 router = APIRouter()
 
 
 @router.get("/health")
 def health() -> dict:
     return {"status": "ok"}
+
+
+@router.get("/health/cache")
+def cache_stats() -> dict:
+    """Счётчики кэшей нормализации (попадания, промахи, вытеснения)."""
+    return {"classification": classification_cache.stats()}
+
+
+@router.get("/health/ingest")
+def ingest_stats() -> dict:
+    """Очередь записи событий: глубина, отброшенные события, задержка фиксации."""
+    return {"ingest": ingest_queue.stats()}
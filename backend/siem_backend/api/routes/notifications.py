@@ -2,48 +2,68 @@ from __future__ import annotations
 
 from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy import select
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
 
+from siem_backend.api.pagination import fetch_page
 from siem_backend.api.schemas.notifications import NotificationOut
 from siem_backend.data.db import get_db
 from siem_backend.data.models import Notification, NotificationType, SeverityLevel
+from siem_backend.data.reference import references
 from siem_backend.services.notifications import NotificationService
 
 router = APIRouter()
 
 
+def notification_out(row: Notification) -> NotificationOut:
+    """
+    Уведомление в формате API (справочники уже загружены).
+
+    Args:
+        row: Уведомление
+
+    Returns:
+        Модель ответа
+    """
+    return NotificationOut(
+        id=row.id,
+        created_at=row.created_at,
+        notification_type=references.name(NotificationType, row.notification_type_id),
+        severity=references.name(SeverityLevel, row.severity_id),
+        title=row.title,
+        message=row.message,
+        incident_id=row.incident_id,
+        event_id=row.event_id,
+        channel=row.channel,
+        status=row.status,
+        details=row.details or {},
+    )
+
+
 @router.get("/", response_model=list[NotificationOut])
 def list_notifications(
+    response: Response,
     severity: Optional[Literal["low", "medium", "high", "critical", "warning"]] = Query(default=None),
     notification_type: Optional[str] = Query(default=None),
     channel: Optional[str] = Query(default=None),
     status: Optional[Literal["pending", "sent", "failed"]] = Query(default=None),
     limit: int = Query(default=50, ge=1, le=500),
     offset: int = Query(default=0, ge=0),
+    after: Optional[str] = Query(default=None, description="Курсор: уведомления старше (X-Next-Cursor)"),
+    before: Optional[str] = Query(default=None, description="Курсор: уведомления новее (X-Prev-Cursor)"),
     db: Session = Depends(get_db),
 ) -> list[NotificationOut]:
-    stmt = (
-        select(Notification)
-        .options(
-            joinedload(Notification.notification_type_rel),
-            joinedload(Notification.severity_rel),
-        )
-        .order_by(Notification.created_at.desc())
-        .limit(limit)
-        .offset(offset)
-    )
+    references.ensure_loaded(db)
+    stmt = select(Notification)
 
     if severity is not None:
-        severity_stmt = select(SeverityLevel.id).where(SeverityLevel.name == severity)
-        severity_id = db.execute(severity_stmt).scalar_one_or_none()
+        severity_id = references.id(SeverityLevel, severity)
         if severity_id:
             stmt = stmt.where(Notification.severity_id == severity_id)
 
     if notification_type is not None:
-        type_stmt = select(NotificationType.id).where(NotificationType.name == notification_type)
-        type_id = db.execute(type_stmt).scalar_one_or_none()
+        type_id = references.id(NotificationType, notification_type)
         if type_id:
             stmt = stmt.where(Notification.notification_type_id == type_id)
 
@@ -53,29 +73,12 @@ def list_notifications(
     if status is not None:
         stmt = stmt.where(Notification.status == status)
 
-    rows = db.execute(stmt).scalars().unique().all()
-    
-    result: list[NotificationOut] = []
-    for row in rows:
-        notification_type_name = row.notification_type_rel.name if row.notification_type_rel else "unknown"
-        severity_name = row.severity_rel.name if row.severity_rel else "unknown"
-        
-        item = NotificationOut(
-            id=row.id,
-            created_at=row.created_at,
-            notification_type=notification_type_name,
-            severity=severity_name,
-            title=row.title,
-            message=row.message,
-            incident_id=row.incident_id,
-            event_id=row.event_id,
-            channel=row.channel,
-            status=row.status,
-            details=row.details or {},
-        )
-        result.append(item)
+    rows = fetch_page(
+        db, stmt, Notification.created_at, Notification.id, response,
+        limit=limit, offset=offset, after=after, before=before,
+    )
     
-    return result
+    return [notification_out(row) for row in rows]
 
 
 @router.get("/{notification_id}", response_model=NotificationOut)
@@ -83,35 +86,13 @@ def get_notification(
     notification_id: int,
     db: Session = Depends(get_db),
 ) -> NotificationOut:
-    stmt = (
-        select(Notification)
-        .options(
-            joinedload(Notification.notification_type_rel),
-            joinedload(Notification.severity_rel),
-        )
-        .where(Notification.id == notification_id)
-    )
-    notification = db.execute(stmt).scalar_one_or_none()
+    notification = db.get(Notification, notification_id)
 
     if notification is None:
         raise HTTPException(status_code=404, detail="Notification not found")
 
-    notification_type_name = notification.notification_type_rel.name if notification.notification_type_rel else "unknown"
-    severity_name = notification.severity_rel.name if notification.severity_rel else "unknown"
-
-    return NotificationOut(
-        id=notification.id,
-        created_at=notification.created_at,
-        notification_type=notification_type_name,
-        severity=severity_name,
-        title=notification.title,
-        message=notification.message,
-        incident_id=notification.incident_id,
-        event_id=notification.event_id,
-        channel=notification.channel,
-        status=notification.status,
-        details=notification.details or {},
-    )
+    references.ensure_loaded(db)
+    return notification_out(notification)
 
 
 @router.post("/test", response_model=NotificationOut)
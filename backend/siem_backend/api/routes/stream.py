@@ -0,0 +1,30 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from siem_backend.api.stream import decode_position, event_stream
+
+router = APIRouter()
+
+
+@router.get("/")
+def stream(
+    request: Request,
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+    since: Optional[str] = Query(default=None, description="Позиция потока, если заголовок недоступен"),
+) -> StreamingResponse:
+    """
+    Поток изменений (Server-Sent Events): события event, incident,
+    notification и incidents_resolved с данными в формате списков API.
+
+    Поле id сообщения — позиция потока; при переподключении с
+    Last-Event-ID сначала приходят записи, созданные за время разрыва.
+    """
+    token = last_event_id or since
+    position = decode_position(token) if token else None
+    return StreamingResponse(
+        event_stream(request, position),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import datetime as dt
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class RuleStatsOut(BaseModel):
+    """Счётчики правила за запуск анализа."""
+
+    rule: str
+    mode: str = Field(description="scan, aggregate, window или run")
+    status: str = Field(default="ok", description="ok, timeout или error")
+    wall_ms: float
+    scanned: Optional[int] = Field(default=None, description="Прочитано строк (None — счёт в БД)")
+    matched: Optional[int] = Field(default=None, description="Отобрано строк")
+    candidates: int
+
+
+class SystemRunOut(BaseModel):
+    """Запуск анализа для вывода в API."""
+
+    id: int
+    started_at: dt.datetime
+    finished_at: dt.datetime
+    duration_ms: float
+    status: str
+    mode: Optional[str] = None
+    rules_executed: int
+    incidents_found: int
+    watermark: Optional[int] = Field(default=None, description="Наибольший учтённый ID события")
+    # От самого долгого правила к самому быстрому
+    rules: List[RuleStatsOut] = Field(default_factory=list)
+
+
+class RuleTriggerOut(BaseModel):
+    """Срабатывание правила."""
+
+    id: int
+    rule: str
+    incident_id: Optional[int]
+    event_id: Optional[int]
+    triggered_at: dt.datetime
+    severity_at_trigger: str
+    details: dict = Field(default_factory=dict)
@@ -22,8 +22,25 @@ class EventOut(BaseModel):
     severity: str = Field(description="Уровень серьёзности")
     
     message: str
+    template_id: Optional[int] = Field(default=None, description="ID шаблона сообщения")
     description: str = Field(default="", description="Человеко-читаемое описание")
-    raw_data: dict = Field(default_factory=dict)
+    app: Optional[str] = Field(default=None, description="Приложение-источник из raw_data")
+    raw_data: dict = Field(
+        default_factory=dict,
+        description="Исходные данные (в списке — только при fields=raw_data)",
+    )
+
+
+class EventTemplateOut(BaseModel):
+    """Шаблон сообщений с количеством событий."""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    template: str
+    token_count: int
+    size: int = Field(description="Количество событий с этим шаблоном")
+    updated_at: Optional[dt.datetime] = None
 
 
 class EventCreate(BaseModel):
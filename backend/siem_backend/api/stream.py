@@ -0,0 +1,432 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+from fastapi import HTTPException, Request
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from siem_backend.api.routes.events import event_statement, event_values
+from siem_backend.api.routes.incidents import incident_out
+from siem_backend.api.routes.notifications import notification_out
+from siem_backend.api.schemas.events import EventOut
+from siem_backend.core.config import settings
+from siem_backend.data.db import SessionLocal
+from siem_backend.data.models import Event, Incident, Notification
+from siem_backend.data.reference import references
+from siem_backend.services.stream_bus import ROW_TOPICS, StreamBus, StreamMessage, stream_bus
+
+logger = logging.getLogger(__name__)
+
+# Поля событий в потоке — то, что рисует дашборд (без raw_data)
+STREAM_EVENT_FIELDS = ["id", "ts", "source_os", "source_category", "event_type", "severity", "message", "app"]
+
+TOPIC_MODELS = {"event": Event, "incident": Incident, "notification": Notification}
+
+# Позиция потока: последний отправленный ID по каждой теме ROW_TOPICS
+Position = Dict[str, int]
+
+# Сколько ID под позицией клиента помнится для отбрасывания повторов
+SENT_IDS_WINDOW = 1000
+
+
+@dataclass(frozen=True)
+class StreamFrame:
+    """Сообщение SSE, сериализованное один раз для всех клиентов."""
+
+    event: str
+    data: str
+    # Тема и ID записи; topic=None — сообщение без записи
+    topic: Optional[str] = None
+    row_id: int = 0
+    # Новая запись (сдвигает позицию) или изменение существующей
+    created: bool = False
+
+
+def encode_position(position: Mapping[str, int]) -> str:
+    """
+    Позиция потока для поля id (Last-Event-ID), например "120.45.7".
+
+    Args:
+        position: Последние ID по темам ROW_TOPICS
+
+    Returns:
+        ID событий, инцидентов и уведомлений через точку
+    """
+    return ".".join(str(position.get(topic, 0)) for topic in ROW_TOPICS)
+
+
+def decode_position(token: str) -> Position:
+    """
+    Разбирает позицию encode_position().
+
+    Raises:
+        HTTPException: 400, если позиция повреждена
+    """
+    parts = token.strip().split(".")
+    if len(parts) != len(ROW_TOPICS) or not all(part.isdigit() for part in parts):
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    return {topic: int(part) for topic, part in zip(ROW_TOPICS, parts)}
+
+
+def format_frame(frame: StreamFrame, position: Mapping[str, int]) -> str:
+    """Текст сообщения SSE."""
+    return f"id: {encode_position(position)}\nevent: {frame.event}\ndata: {frame.data}\n\n"
+
+
+def load_frames(
+    db: Session,
+    topic: str,
+    *,
+    ids: Sequence[int] = (),
+    after: Optional[int] = None,
+    limit: Optional[int] = None,
+    created: bool = True,
+) -> List[StreamFrame]:
+    """
+    Сообщения по записям темы: по списку ID или все новее after.
+
+    Args:
+        db: Сессия БД (справочники уже загружены)
+        topic: Тема из ROW_TOPICS
+        ids: ID записей (живой поток)
+        after: Последний отправленный ID (догон по Last-Event-ID)
+        limit: Предел записей при догоне
+        created: Новые записи или изменения существующих
+
+    Returns:
+        Сообщения по возрастанию ID
+    """
+    model = TOPIC_MODELS[topic]
+    stmt = event_statement(STREAM_EVENT_FIELDS) if topic == "event" else select(model)
+    if after is not None:
+        stmt = stmt.where(model.id > after)
+    else:
+        stmt = stmt.where(model.id.in_(list(ids)))
+    stmt = stmt.order_by(model.id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    frames = []
+    for row in db.execute(stmt).scalars().all():
+        if topic == "event":
+            item = EventOut.model_construct(**event_values(row, STREAM_EVENT_FIELDS))
+            data = item.model_dump_json(exclude_unset=True)
+        elif topic == "incident":
+            data = incident_out(row).model_dump_json()
+        else:
+            data = notification_out(row).model_dump_json()
+        frames.append(StreamFrame(event=topic, data=data, topic=topic, row_id=row.id, created=created))
+    return frames
+
+
+def head_position(db: Session) -> Position:
+    """Последние ID по темам: позиция клиента, который подключается без Last-Event-ID."""
+    return {
+        topic: db.execute(select(func.max(model.id))).scalar() or 0
+        for topic, model in TOPIC_MODELS.items()
+    }
+
+
+def replay(db: Session, position: Mapping[str, int], limit: int) -> Tuple[List[StreamFrame], Optional[Position]]:
+    """
+    Записи, созданные после позиции клиента.
+
+    Если по какой-то теме их больше limit, догон не выполняется: клиент
+    получает reset и перечитывает списки с текущей позиции.
+
+    Args:
+        db: Сессия БД
+        position: Позиция клиента
+        limit: Предел записей на тему
+
+    Returns:
+        (сообщения по темам, позиция для reset или None)
+    """
+    references.ensure_loaded(db)
+    frames: List[StreamFrame] = []
+    for topic in ROW_TOPICS:
+        found = load_frames(db, topic, after=position.get(topic, 0), limit=limit + 1)
+        if len(found) > limit:
+            return [], head_position(db)
+        frames.extend(found)
+    return frames, None
+
+
+class StreamCursor:
+    """
+    Позиция клиента и недавно отправленные ему ID по темам.
+
+    ID выдаются при вставке, а публикуются после фиксации, поэтому два
+    писателя (очередь записи и /collect/test) публикуют их не по порядку.
+    Повтор определяется по множеству отправленных ID, а не по позиции:
+    запись с ID ниже позиции, ещё не отправленная, тоже уходит клиенту.
+    Множество держит ID в полосе SENT_IDS_WINDOW под позицией; более
+    давние запоздавшие записи отправляются как новые (клиент отбрасывает
+    повторы по ID).
+    """
+
+    def __init__(self, position: Mapping[str, int]) -> None:
+        self.position: Position = {topic: position.get(topic, 0) for topic in ROW_TOPICS}
+        self._sent: Dict[str, Set[int]] = {topic: set() for topic in ROW_TOPICS}
+
+    def advance(self, frame: StreamFrame) -> bool:
+        """
+        Отмечает отправку записи и сдвигает позицию.
+
+        Returns:
+            False, если запись уже отправлена (пришла и из БД, и из шины)
+        """
+        if not frame.created:
+            return True
+        sent = self._sent[frame.topic]
+        if frame.row_id in sent:
+            return False
+        sent.add(frame.row_id)
+        if frame.row_id > self.position[frame.topic]:
+            self.position[frame.topic] = frame.row_id
+        if len(sent) > 2 * SENT_IDS_WINDOW:
+            floor = self.position[frame.topic] - SENT_IDS_WINDOW
+            self._sent[frame.topic] = {row_id for row_id in sent if row_id > floor}
+        return True
+
+    def reset(self, position: Mapping[str, int]) -> None:
+        """Переходит на новую позицию (после reset клиент перечитывает списки)."""
+        self.position = {topic: position.get(topic, 0) for topic in ROW_TOPICS}
+        for sent in self._sent.values():
+            sent.clear()
+
+
+class StreamClient:
+    """Очередь подключённого клиента (живёт в цикле событий его запроса)."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue_size: int) -> None:
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Очередь переполнилась: клиент получит reset и перечитает списки
+        self.lagging = False
+
+    def offer(self, frames: List[StreamFrame]) -> None:
+        """Кладёт пачку сообщений в очередь (в потоке цикла событий)."""
+        if self.lagging:
+            return
+        try:
+            self.queue.put_nowait(frames)
+        except asyncio.QueueFull:
+            self.lagging = True
+
+    def reset(self) -> None:
+        """Очищает очередь перед догоном из БД."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.lagging = False
+
+
+class StreamHub:
+    """
+    Раздача изменений из шины подключённым SSE-клиентам.
+
+    Обработчик шины только ставит сообщение в очередь, а записи читает
+    и сериализует поток хаба — писатель событий не ждёт чтения для
+    дашбордов. Накопившиеся сообщения одной темы читаются одним запросом,
+    независимо от числа клиентов; без клиентов хаб отписан от шины.
+    Медленный клиент не тормозит остальных: при переполнении его очередь
+    сбрасывается, и он получает reset.
+    """
+
+    def __init__(
+        self,
+        bus: Optional[StreamBus] = None,
+        session_factory: Optional[Callable[[], Session]] = None,
+        queue_size: Optional[int] = None,
+    ) -> None:
+        self._bus = bus or stream_bus
+        self._session_factory = session_factory or SessionLocal
+        self._queue_size = queue_size or settings.stream_queue_size
+        self._lock = threading.Lock()
+        self._clients: List[StreamClient] = []
+        # Сообщения шины ждут потока хаба: публикующий писатель не читает БД
+        self._pending: "queue.Queue[StreamMessage]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    def connect(self, loop: asyncio.AbstractEventLoop) -> StreamClient:
+        """
+        Регистрирует клиента (первый клиент подписывает хаб на шину).
+
+        Args:
+            loop: Цикл событий, в котором клиент читает очередь
+
+        Returns:
+            Клиент с очередью сообщений
+        """
+        client = StreamClient(loop, self._queue_size)
+        with self._lock:
+            self._clients.append(client)
+            if len(self._clients) == 1:
+                self._bus.subscribe(self._on_message)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="stream-hub", daemon=True)
+                self._worker.start()
+        return client
+
+    def disconnect(self, client: StreamClient) -> None:
+        """
+        Удаляет клиента (последний отписывает хаб от шины).
+
+        Args:
+            client: Клиент из connect()
+        """
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+            if not self._clients:
+                self._bus.unsubscribe(self._on_message)
+
+    def run_with_session(self, func: Callable[[Session], object]) -> object:
+        """Выполняет func в отдельной сессии БД."""
+        db = self._session_factory()
+        try:
+            return func(db)
+        finally:
+            db.close()
+
+    def _on_message(self, message: StreamMessage) -> None:
+        """Обработчик шины (в потоке публикации): только ставит сообщение в очередь хаба."""
+        self._pending.put(message)
+
+    def _run(self) -> None:
+        """Поток хаба: забирает накопившиеся сообщения и раздаёт их клиентам."""
+        while True:
+            messages = [self._pending.get()]
+            while True:
+                try:
+                    messages.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._deliver(messages)
+            except Exception:
+                logger.exception("Stream hub failed to deliver %d messages", len(messages))
+
+    def _deliver(self, messages: Sequence[StreamMessage]) -> None:
+        """Читает и сериализует записи один раз и раскладывает пачку по очередям клиентов."""
+        with self._lock:
+            clients = list(self._clients)
+        if not clients:
+            return
+
+        # Сообщения одной темы объединяются: одна выборка на тему за пачку
+        rows: Dict[Tuple[str, bool], Set[int]] = {}
+        order: List[object] = []
+        for message in messages:
+            if message.topic not in ROW_TOPICS:
+                order.append(message)
+                continue
+            group = (message.topic, message.created)
+            if group not in rows:
+                rows[group] = set()
+                order.append(group)
+            rows[group].update(message.ids)
+
+        def load(db: Optional[Session]) -> List[StreamFrame]:
+            if db is not None:
+                references.ensure_loaded(db)
+            frames: List[StreamFrame] = []
+            for item in order:
+                if isinstance(item, StreamMessage):
+                    frames.append(StreamFrame(event=item.topic, data=json.dumps(item.data)))
+                else:
+                    topic, created = item
+                    frames.extend(load_frames(db, topic, ids=sorted(rows[item]), created=created))
+            return frames
+
+        frames = self.run_with_session(load) if rows else load(None)
+        if not frames:
+            return
+
+        for client in clients:
+            try:
+                client.loop.call_soon_threadsafe(client.offer, frames)
+            except RuntimeError:
+                # Цикл событий клиента уже закрыт
+                pass
+
+
+stream_hub = StreamHub()
+
+
+async def event_stream(
+    request: Request,
+    position: Optional[Position],
+    hub: Optional[StreamHub] = None,
+    heartbeat_seconds: Optional[float] = None,
+    replay_limit: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """
+    Поток SSE одного клиента.
+
+    Клиент подписывается до чтения БД, поэтому записи, созданные во время
+    догона по Last-Event-ID, не теряются; пришедшие и из БД, и из шины
+    отбрасываются по отправленным ID (StreamCursor). Догоняются только новые записи — смены
+    статуса за время разрыва не воспроизводятся. После догона приходит
+    ready (или reset, если пропущено слишком много и клиенту нужно
+    перечитать списки); дальше — живые изменения и комментарии-пинги.
+
+    Args:
+        request: Запрос (проверка отключения клиента)
+        position: Позиция из Last-Event-ID; None — только новые изменения
+        hub: Хаб (по умолчанию общий)
+        heartbeat_seconds: Период пингов
+        replay_limit: Предел догона на тему
+
+    Yields:
+        Сообщения SSE
+    """
+    hub = hub or stream_hub
+    heartbeat_seconds = heartbeat_seconds or settings.stream_heartbeat_seconds
+    replay_limit = replay_limit or settings.stream_replay_limit
+
+    client = hub.connect(asyncio.get_running_loop())
+    try:
+        yield f"retry: {int(heartbeat_seconds * 1000)}\n\n"
+        if position is None:
+            position = await run_in_threadpool(hub.run_with_session, head_position)
+            frames, head = [], None
+        else:
+            start = dict(position)
+            frames, head = await run_in_threadpool(hub.run_with_session, lambda db: replay(db, start, replay_limit))
+            position = head or start
+        cursor = StreamCursor(position)
+        for frame in frames:
+            if cursor.advance(frame):
+                yield format_frame(frame, cursor.position)
+        yield format_frame(StreamFrame(event="ready" if head is None else "reset", data="{}"), cursor.position)
+
+        while True:
+            if client.lagging:
+                # Сброшенные сообщения (и смены статуса среди них) не восстановить
+                # из БД по ID — клиент перечитывает списки
+                client.reset()
+                cursor.reset(await run_in_threadpool(hub.run_with_session, head_position))
+                yield format_frame(StreamFrame(event="reset", data="{}"), cursor.position)
+
+            try:
+                frames = await asyncio.wait_for(client.queue.get(), timeout=heartbeat_seconds)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+
+            for frame in frames:
+                if cursor.advance(frame):
+                    yield format_frame(frame, cursor.position)
+    finally:
+        hub.disconnect(client)
@@ -18,6 +18,40 @@ class Settings(BaseSettings):
     db_pool_timeout: int = 30
     db_pool_recycle: int = 1800  # 30 минут
 
+    # Очередь записи событий (один поток-писатель)
+    ingest_queue_size: int = 50000
+    ingest_batch_size: int = 5000
+    ingest_flush_ms: int = 200
+    ingest_overflow: str = "block"  # block | drop_oldest | reject
+    ingest_block_timeout: float = 5.0
+    # Пакеты от этого размера на PostgreSQL загружаются через COPY FROM STDIN
+    # вместо INSERT ... ON CONFLICT ... RETURNING (0 — COPY выключен)
+    ingest_copy_threshold: int = 0
+
+    # Пороговые правила анализа считаются агрегатными запросами в БД
+    analysis_sql_aggregates: bool = True
+    # Анализ только новых событий с водяным знаком в SystemRun
+    analysis_incremental: bool = True
+    # Полоса перекрытия под водяным знаком (в ID событий): её перечитывает
+    # каждый инкрементальный запуск, чтобы учесть строки, зафиксированные
+    # позже строк с большими ID. События пишет один поток очереди записи,
+    # поэтому полоса нужна только для сторонних писателей и держится узкой
+    analysis_watermark_overlap: int = 100
+    # Предел ключей группировки (пользователей, служб) в окнах одного правила
+    analysis_max_keys: int = 10000
+    # Параллельный запуск правил: потоков в пуле (0 или 1 — выключен) и срок на правило
+    analysis_parallel_workers: int = 0
+    analysis_rule_timeout: float = 30.0
+    # Потоковый анализ событий из очереди записи и период снимков его окон
+    analysis_streaming: bool = True
+    analysis_snapshot_seconds: float = 60.0
+
+    # Поток изменений (SSE /stream): очередь клиента в пачках, предел догона
+    # по Last-Event-ID на тему и период пингов
+    stream_queue_size: int = 256
+    stream_replay_limit: int = 500
+    stream_heartbeat_seconds: float = 15.0
+
     telegram_bot_token: Optional[str] = None
     telegram_chat_id: Optional[str] = None
 
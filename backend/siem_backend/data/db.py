@@ -72,13 +72,16 @@ def init_db() -> None:
     Инициализирует базу данных:
     - Создаёт все таблицы
     - Инициализирует справочные данные
+    - Загружает реестр справочников
     """
     Base.metadata.create_all(bind=engine)
 
     db = SessionLocal()
     try:
         from siem_backend.data.initial_data import init_reference_data
+        from siem_backend.data.reference import references
         init_reference_data(db)
+        references.load(db)
     finally:
         db.close()
 
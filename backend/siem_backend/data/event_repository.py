@@ -1,51 +1,110 @@
 from __future__ import annotations
 
-from typing import Sequence, Set, Tuple
+import hashlib
+import io
+import json
+from typing import Any, Dict, Iterable, Optional, Sequence, Set
 
 import datetime as dt
-from sqlalchemy import select
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Session
 
-from siem_backend.data.models import Event, SourceOS
+from siem_backend.core.config import settings
+from siem_backend.data.models import Event
+
+# Столбцы, которые заполняет пакетная вставка (id выдаёт БД)
+EVENT_COLUMNS = (
+    "ts",
+    "source_os_id",
+    "source_category_id",
+    "event_type_id",
+    "severity_id",
+    "message",
+    "template_id",
+    "raw_data",
+    "dedup_hash",
+)
+
+# Начиная с этого размера пакета на PostgreSQL используется COPY FROM STDIN (0 — никогда)
+COPY_THRESHOLD = settings.ingest_copy_threshold
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def event_dedup_hash(ts: dt.datetime, message: Optional[str], source_os_id: int) -> str:
+    """
+    Хэш дедупликации события: время с точностью до секунды, ОС источника и сообщение.
+
+    Args:
+        ts: Время события (naive UTC или с часовым поясом)
+        message: Текст сообщения
+        source_os_id: ID ОС источника
+
+    Returns:
+        blake2b-хэш (32 hex-символа)
+    """
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    key = f"{ts.replace(microsecond=0).isoformat()}\x1f{source_os_id}\x1f{message or ''}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _copy_value(value: Any) -> str:
+    """Значение поля в текстовом формате COPY."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, dt.datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    return str(value).translate(_COPY_ESCAPES)
 
 
 class EventRepository:
     """Репозиторий для работы с событиями."""
     
-    def get_existing_signatures(
-        self, db: Session, since: dt.datetime, until: dt.datetime
-    ) -> Set[Tuple[dt.datetime, str, str]]:
+    def existing_hashes(self, db: Session, hashes: Iterable[str]) -> Set[str]:
         """
-        Получает существующие сигнатуры событий за период.
+        Возвращает хэши, уже присутствующие в БД (проверка по уникальному индексу).
         
         Args:
             db: Сессия БД
-            since: Начало периода
-            until: Конец периода
+            hashes: Хэши дедупликации проверяемых событий
             
         Returns:
-            Множество кортежей (timestamp, message, source_os_name)
+            Множество найденных хэшей
+        """
+        hashes = list(hashes)
+        if not hashes:
+            return set()
+        stmt = select(Event.dedup_hash).where(Event.dedup_hash.in_(hashes))
+        return set(db.execute(stmt).scalars())
+
+    def latest_ts_by_type(
+        self, db: Session, event_type_ids: Iterable[int], since: dt.datetime
+    ) -> Dict[int, dt.datetime]:
+        """
+        Время последнего события каждого типа не раньше since (один запрос с GROUP BY).
+
+        Args:
+            db: Сессия БД
+            event_type_ids: ID типов событий
+            since: Нижняя граница времени
+
+        Returns:
+            ID типа события -> время последнего события (типы без событий отсутствуют)
         """
-        stmt = select(Event.ts, Event.message, Event.source_os_id).where(
-            Event.ts >= since,
-            Event.ts <= until,
+        event_type_ids = list(event_type_ids)
+        if not event_type_ids:
+            return {}
+        stmt = (
+            select(Event.event_type_id, func.max(Event.ts))
+            .where(Event.event_type_id.in_(event_type_ids))
+            .where(Event.ts >= since)
+            .group_by(Event.event_type_id)
         )
-        rows = db.execute(stmt).all()
-        
-        # Кэшируем названия ОС
-        os_ids = {row[2] for row in rows if row[2] is not None}
-        os_cache = {}
-        if os_ids:
-            os_stmt = select(SourceOS.id, SourceOS.name).where(SourceOS.id.in_(os_ids))
-            for os_id, os_name in db.execute(os_stmt).all():
-                os_cache[os_id] = os_name
-        
-        out: Set[Tuple[dt.datetime, str, str]] = set()
-        for ts, message, source_os_id in rows:
-            key_ts = ts.replace(microsecond=0) if hasattr(ts, "replace") else ts
-            source_os_name = os_cache.get(source_os_id, "unknown") if source_os_id else "unknown"
-            out.add((key_ts, message or "", source_os_name))
-        return out
+        return {type_id: ts for type_id, ts in db.execute(stmt).all()}
 
     def add_many(self, db: Session, events: Sequence[Event]) -> int:
         """
@@ -63,3 +122,93 @@ class EventRepository:
         db.add_all(list(events))
         db.commit()
         return len(events)
+
+    def insert_many(self, db: Session, rows: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Пакетно вставляет события, минуя unit of work ORM, и фиксирует транзакцию.
+
+        Строки с уже существующим dedup_hash пропускаются самой БД.
+        Пакет вставляется одним INSERT ... RETURNING; на PostgreSQL при
+        заданном COPY_THRESHOLD (settings.ingest_copy_threshold) пакеты
+        от этого размера загружаются через COPY FROM STDIN.
+
+        Args:
+            db: Сессия БД
+            rows: Словари со значениями столбцов EVENT_COLUMNS
+
+        Returns:
+            ID вставленных событий по их dedup_hash
+        """
+        if not rows:
+            return {}
+        if COPY_THRESHOLD and len(rows) >= COPY_THRESHOLD and db.get_bind().dialect.name == "postgresql":
+            inserted = self.copy_rows(db, rows)
+        else:
+            inserted = self.insert_rows(db, rows)
+        db.commit()
+        return inserted
+
+    def insert_rows(self, db: Session, rows: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Вставляет строки одним executemany (insertmanyvalues) без фиксации.
+
+        Дубликаты отбрасываются через ON CONFLICT DO NOTHING (PostgreSQL)
+        или INSERT OR IGNORE (SQLite).
+
+        Args:
+            db: Сессия БД
+            rows: Словари со значениями столбцов EVENT_COLUMNS
+
+        Returns:
+            ID вставленных событий по их dedup_hash
+        """
+        table = Event.__table__
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(table).on_conflict_do_nothing(index_elements=[table.c.dedup_hash])
+        elif dialect == "sqlite":
+            stmt = insert(table).prefix_with("OR IGNORE")
+        else:
+            stmt = insert(table)
+        stmt = stmt.returning(table.c.dedup_hash, table.c.id)
+        return dict(db.execute(stmt, list(rows)).all())
+
+    def copy_rows(self, db: Session, rows: Sequence[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Загружает строки через COPY FROM STDIN (только PostgreSQL) без фиксации.
+
+        COPY не поддерживает ON CONFLICT, поэтому строки сначала копируются
+        во временную таблицу, а затем переносятся в events одним
+        INSERT ... SELECT ... ON CONFLICT DO NOTHING. Временная таблица
+        создаётся с ON COMMIT DROP: она не переживает транзакцию, даже если
+        перенос не дошёл до DROP (при ошибке её снимает откат).
+
+        Args:
+            db: Сессия БД
+            rows: Словари со значениями столбцов EVENT_COLUMNS
+
+        Returns:
+            ID вставленных событий по их dedup_hash
+        """
+        columns = ", ".join(EVENT_COLUMNS)
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_value(row.get(column)) for column in EVENT_COLUMNS))
+            buffer.write("\n")
+        buffer.seek(0)
+
+        db.execute(text(
+            f"CREATE TEMP TABLE events_copy ON COMMIT DROP AS SELECT {columns} FROM events WITH NO DATA"
+        ))
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY events_copy ({columns}) FROM STDIN", buffer)
+        finally:
+            cursor.close()
+        inserted = dict(db.execute(text(
+            f"INSERT INTO events ({columns}) SELECT {columns} FROM events_copy "
+            "ON CONFLICT (dedup_hash) DO NOTHING RETURNING dedup_hash, id"
+        )).all())
+        # Повторный вызов в той же транзакции создаёт таблицу заново
+        db.execute(text("DROP TABLE events_copy"))
+        return inserted
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import datetime as dt
+from typing import Dict, List
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from siem_backend.data.models import EventTemplate
+
+
+class EventTemplateRepository:
+    """Репозиторий шаблонов сообщений."""
+
+    def list_all(self, db: Session) -> List[EventTemplate]:
+        return list(db.execute(select(EventTemplate).order_by(EventTemplate.id)).scalars().all())
+
+    def list_top(self, db: Session, limit: int = 50, offset: int = 0) -> List[EventTemplate]:
+        stmt = (
+            select(EventTemplate)
+            .order_by(EventTemplate.size.desc(), EventTemplate.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        return list(db.execute(stmt).scalars().all())
+
+    def add(self, db: Session, template: str, token_count: int) -> EventTemplate:
+        """
+        Добавляет шаблон и получает его ID (без commit).
+
+        Args:
+            db: Сессия БД
+            template: Текст шаблона
+            token_count: Количество токенов
+
+        Returns:
+            Сохранённый шаблон
+        """
+        item = EventTemplate(template=template, token_count=token_count, size=0)
+        db.add(item)
+        db.flush()
+        return item
+
+    def apply_changes(self, db: Session, templates: Dict[int, str], counts: Dict[int, int]) -> None:
+        """
+        Обновляет тексты изменённых шаблонов и счётчики сообщений (без commit).
+
+        Args:
+            db: Сессия БД
+            templates: ID шаблона -> новый текст
+            counts: ID шаблона -> сколько сообщений добавлено
+        """
+        now = dt.datetime.utcnow()
+        for template_id in set(templates) | set(counts):
+            values = {"updated_at": now, "size": EventTemplate.size + counts.get(template_id, 0)}
+            if template_id in templates:
+                values["template"] = templates[template_id]
+            db.execute(update(EventTemplate).where(EventTemplate.id == template_id).values(**values))
@@ -1,10 +1,11 @@
-from typing import Sequence, Set, Tuple
+from typing import Optional, Sequence, Set, Tuple
 
 import datetime as dt
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 
 from siem_backend.data.models import Incident, IncidentType
+from siem_backend.data.reference import references
 
 
 class IncidentRepository:
@@ -31,13 +32,8 @@ class IncidentRepository:
         )
         rows = db.execute(stmt).all()
         
-        # Получаем названия типов инцидентов
-        type_ids = {row[1] for row in rows if row[1] is not None}
-        type_cache = {}
-        if type_ids:
-            type_stmt = select(IncidentType.id, IncidentType.name).where(IncidentType.id.in_(type_ids))
-            for type_id, type_name in db.execute(type_stmt).all():
-                type_cache[type_id] = type_name
+        # Названия типов инцидентов — из реестра справочников
+        type_cache = references.ensure_loaded(db).names(IncidentType)
         
         result = set()
         for eid, type_id in rows:
@@ -86,5 +82,47 @@ class IncidentRepository:
         if not type_ids:
             return set()
         
-        type_stmt = select(IncidentType.name).where(IncidentType.id.in_(type_ids))
-        return {row[0] for row in db.execute(type_stmt).all()}
+        type_names = references.ensure_loaded(db).names(IncidentType)
+        return {type_names[type_id] for type_id in type_ids if type_id in type_names}
+
+    def resolve_open(
+        self,
+        db: Session,
+        incident_type_ids: Sequence[int],
+        detected_before: dt.datetime,
+        resolved_at: dt.datetime,
+        resolved_by: str,
+        notes: Optional[str] = None,
+    ) -> int:
+        """
+        Закрывает открытые инциденты заданных типов одним UPDATE.
+
+        Args:
+            db: Сессия БД
+            incident_type_ids: ID типов инцидентов
+            detected_before: Закрываются только инциденты, обнаруженные раньше
+            resolved_at: Время закрытия
+            resolved_by: Кто закрыл
+            notes: Комментарий к закрытию
+
+        Returns:
+            Количество закрытых инцидентов
+        """
+        if not incident_type_ids:
+            return 0
+        stmt = (
+            update(Incident)
+            .where(Incident.incident_type_id.in_(list(incident_type_ids)))
+            .where(Incident.detected_at < detected_before)
+            .where(Incident.status != "resolved")
+            .values(
+                status="resolved",
+                resolved_at=resolved_at,
+                resolved_by=resolved_by,
+                resolution_notes=notes,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        resolved = db.execute(stmt).rowcount
+        db.commit()
+        return resolved
@@ -15,6 +15,7 @@ from siem_backend.data.models import (
     SourceCategoryRef,
     SourceOS,
 )
+from siem_backend.data.reference import references
 
 
 def _ensure_by_name(
@@ -269,6 +270,8 @@ def init_reference_data(db: Session) -> None:
 
     if created_total:
         db.commit()
+        # Справочники изменились — реестр перечитается при следующем обращении
+        references.invalidate()
     else:
         # на всякий случай откатываем транзакцию без изменений
         db.rollback()
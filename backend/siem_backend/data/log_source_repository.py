@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from siem_backend.data.models import LogSource
+
+FILE_LOG_SOURCE = "file_log"
+
+
+class LogSourceRepository:
+    """Репозиторий источников логов и их контрольных точек чтения."""
+
+    def get_by_name(self, db: Session, name: str) -> Optional[LogSource]:
+        stmt = select(LogSource).where(LogSource.name == name)
+        return db.execute(stmt).scalar_one_or_none()
+
+    def get_file_checkpoint(
+        self, db: Session, file_path: str, source_name: str = FILE_LOG_SOURCE
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Получает контрольную точку чтения файла из LogSource.config.
+
+        Args:
+            db: Сессия БД
+            file_path: Абсолютный путь к файлу логов
+            source_name: Имя источника логов
+
+        Returns:
+            Словарь контрольной точки или None
+        """
+        source = self.get_by_name(db, source_name)
+        if source is None:
+            return None
+        checkpoints = (source.config or {}).get("checkpoints") or {}
+        return checkpoints.get(file_path)
+
+    def save_file_checkpoint(
+        self,
+        db: Session,
+        file_path: str,
+        checkpoint: Dict[str, Any],
+        source_name: str = FILE_LOG_SOURCE,
+    ) -> None:
+        """
+        Сохраняет контрольную точку чтения файла в LogSource.config.
+
+        Args:
+            db: Сессия БД
+            file_path: Абсолютный путь к файлу логов
+            checkpoint: Словарь контрольной точки
+            source_name: Имя источника логов
+        """
+        source = self.get_by_name(db, source_name)
+        if source is None:
+            source = LogSource(name=source_name, source_type="file", config={})
+            db.add(source)
+
+        # JSON-колонка отслеживается по присваиванию — собираем новый словарь
+        config = dict(source.config or {})
+        checkpoints = dict(config.get("checkpoints") or {})
+        checkpoints[file_path] = checkpoint
+        config["checkpoints"] = checkpoints
+        source.config = config
+        db.commit()
@@ -4,8 +4,8 @@ import datetime as dt
 
 from typing import Optional
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, event
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text, event
+from sqlalchemy.orm import Mapped, mapped_column, query_expression, relationship
 from sqlalchemy.types import JSON
 
 from siem_backend.data.schemas import Base
@@ -137,6 +137,31 @@ class NotificationType(Base):
 # =============================================================================
 
 
+class EventTemplate(Base):
+    """Шаблоны сообщений событий (переменные части заменены на <*>)."""
+
+    __tablename__ = "event_templates"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    template: Mapped[str] = mapped_column(Text, nullable=False)
+    token_count: Mapped[int] = mapped_column(Integer, index=True, default=0)
+    size: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=dt.datetime.utcnow,
+    )
+    updated_at: Mapped[dt.datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=dt.datetime.utcnow,
+        onupdate=dt.datetime.utcnow,
+    )
+
+    events: Mapped[list["Event"]] = relationship("Event", back_populates="template_rel")
+
+    def __repr__(self) -> str:
+        return f"<EventTemplate(id={self.id}, template={self.template!r})>"
+
+
 class Event(Base):
     """События безопасности (нормализованная структура)."""
     
@@ -172,10 +197,25 @@ class Event(Base):
     )
 
     message: Mapped[str] = mapped_column(Text)
+
+    # Шаблон сообщения (майнер шаблонов), NULL — не определён
+    template_id: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        ForeignKey("event_templates.id", ondelete="SET NULL"),
+        index=True,
+        nullable=True,
+    )
     
     # ⚠️ raw_data оставлен только для отладки/аудита
     raw_data: Mapped[dict] = mapped_column(JSON, default=dict)
 
+    # Приложение-источник (process/service/application из raw_data): вычисляется
+    # в запросе через with_expression(), чтобы списки не читали raw_data целиком
+    app: Mapped[Optional[str]] = query_expression()
+
+    # Хэш дедупликации (время до секунды + ОС + сообщение), NULL — не вычислен
+    dedup_hash: Mapped[Optional[str]] = mapped_column(String(32), unique=True, index=True, nullable=True)
+
     # ✅ Отношения для удобных JOIN
     source_os_rel: Mapped["SourceOS"] = relationship("SourceOS", back_populates="events")
     source_category_rel: Mapped["SourceCategoryRef"] = relationship(
@@ -184,6 +224,7 @@ class Event(Base):
     )
     event_type_rel: Mapped["EventType"] = relationship("EventType", back_populates="events")
     severity_rel: Mapped["SeverityLevel"] = relationship("SeverityLevel", back_populates="events")
+    template_rel: Mapped[Optional["EventTemplate"]] = relationship("EventTemplate", back_populates="events")
 
     def __repr__(self) -> str:
         return f"<Event(id={self.id}, ts={self.ts}, severity={self.severity_rel.name if self.severity_rel else 'unknown'})>"
@@ -457,3 +498,22 @@ Incident.notification_rel = relationship(
     "Notification",
     back_populates="incident_rel"
 )
+
+
+# =============================================================================
+# СОСТАВНЫЕ ИНДЕКСЫ
+# =============================================================================
+
+# Курсорная пагинация списков: ORDER BY (время, id) DESC и WHERE (время, id) < курсор
+Index("ix_events_ts_id", Event.ts.desc(), Event.id.desc())
+Index("ix_incidents_detected_at_id", Incident.detected_at.desc(), Incident.id.desc())
+Index("ix_notifications_created_at_id", Notification.created_at.desc(), Notification.id.desc())
+
+# Правила анализа: event_type_id = ? AND ts BETWEEN ? AND ?
+Index("ix_events_event_type_id_ts", Event.event_type_id, Event.ts)
+# Список событий с фильтром серьёзности и сортировкой по (ts, id)
+Index("ix_events_severity_id_ts", Event.severity_id, Event.ts, Event.id)
+# Открытые инциденты по времени (автозакрытие, списки по статусу)
+Index("ix_incidents_status_detected_at", Incident.status, Incident.detected_at)
+# Список уведомлений с фильтром статуса
+Index("ix_notifications_status_created_at", Notification.status, Notification.created_at, Notification.id)
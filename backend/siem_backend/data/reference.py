@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import threading
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from siem_backend.data.models import (
+    AnalysisRule,
+    EventType,
+    IncidentType,
+    NotificationType,
+    SeverityLevel,
+    SourceCategoryRef,
+    SourceOS,
+)
+
+# Справочники, которые держит реестр
+REFERENCE_MODELS = (
+    SourceOS, SourceCategoryRef, EventType, SeverityLevel, IncidentType, NotificationType, AnalysisRule,
+)
+
+_Maps = Dict[type, Tuple[Mapping[str, int], Mapping[int, str]]]
+
+
+class ReferenceRegistry:
+    """
+    Общий для процесса реестр справочников: карты имя → ID и ID → имя.
+
+    Загружается один раз (init_db() или первый ensure_loaded()) и читается
+    без обращения к БД. После изменения справочников реестр нужно
+    сбросить через invalidate() — следующий ensure_loaded() загрузит его заново.
+    Снимок карт заменяется целиком, поэтому чтение потокобезопасно без блокировки.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._maps: Optional[_Maps] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._maps is not None
+
+    def load(self, db: Session) -> None:
+        """
+        Загружает все справочники из БД.
+
+        Args:
+            db: Сессия БД
+        """
+        rows = {
+            model: {name: ref_id for ref_id, name in db.execute(select(model.id, model.name)).all()}
+            for model in REFERENCE_MODELS
+        }
+        self.replace(rows)
+
+    def ensure_loaded(self, db: Session) -> "ReferenceRegistry":
+        """
+        Загружает справочники, если реестр пуст.
+
+        Args:
+            db: Сессия БД
+
+        Returns:
+            Сам реестр
+        """
+        if self._maps is None:
+            with self._lock:
+                if self._maps is None:
+                    self.load(db)
+        return self
+
+    def replace(self, rows: Mapping[type, Mapping[str, int]]) -> None:
+        """
+        Заменяет содержимое реестра.
+
+        Args:
+            rows: Карты имя → ID по моделям справочников
+        """
+        maps: _Maps = {}
+        for model in REFERENCE_MODELS:
+            ids = dict(rows.get(model, {}))
+            names = {ref_id: name for name, ref_id in ids.items()}
+            maps[model] = (MappingProxyType(ids), MappingProxyType(names))
+        self._maps = maps
+
+    def invalidate(self) -> None:
+        """Сбрасывает реестр (справочники изменились)."""
+        self._maps = None
+
+    def _get(self, model: type) -> Tuple[Mapping[str, int], Mapping[int, str]]:
+        maps = self._maps
+        if maps is None:
+            return MappingProxyType({}), MappingProxyType({})
+        return maps[model]
+
+    def id(self, model: type, name: Optional[str], default: Optional[str] = None) -> Optional[int]:
+        """
+        ID записи справочника по имени.
+
+        Args:
+            model: Модель справочника
+            name: Имя записи
+            default: Имя, используемое, если name не найдено
+
+        Returns:
+            ID или None
+        """
+        ids = self._get(model)[0]
+        ref_id = ids.get(name)
+        if ref_id is None and default is not None:
+            ref_id = ids.get(default)
+        return ref_id
+
+    def resolve(self, model: type, name: Optional[str], default: Optional[str] = None) -> int:
+        """
+        ID записи справочника для сохранения: по имени, затем по имени
+        по умолчанию, затем первый доступный ID (1 для пустого справочника).
+
+        Args:
+            model: Модель справочника
+            name: Имя записи
+            default: Имя по умолчанию
+
+        Returns:
+            ID записи
+        """
+        ref_id = self.id(model, name, default)
+        if ref_id is not None:
+            return ref_id
+        return min(self._get(model)[1], default=1)
+
+    def name(self, model: type, ref_id: Optional[int], default: str = "unknown") -> str:
+        """
+        Имя записи справочника по ID.
+
+        Args:
+            model: Модель справочника
+            ref_id: ID записи
+            default: Значение, если ID не найден
+
+        Returns:
+            Имя записи
+        """
+        return self._get(model)[1].get(ref_id, default)
+
+    def ids(self, model: type) -> Mapping[str, int]:
+        """Карта имя → ID справочника (только чтение)."""
+        return self._get(model)[0]
+
+    def names(self, model: type) -> Mapping[int, str]:
+        """Карта ID → имя справочника (только чтение)."""
+        return self._get(model)[1]
+
+
+references = ReferenceRegistry()
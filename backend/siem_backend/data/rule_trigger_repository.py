@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import datetime as dt
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from siem_backend.data.models import RuleTrigger
+
+
+class RuleTriggerRepository:
+    """Репозиторий журнала срабатываний правил."""
+
+    def add_many(self, db: Session, rows: Sequence[Dict[str, Any]]) -> int:
+        """
+        Записывает срабатывания одним пакетным INSERT.
+
+        Args:
+            db: Сессия БД
+            rows: Строки для вставки (rule_id, incident_id, event_id, ...)
+
+        Returns:
+            Количество записанных срабатываний
+        """
+        if not rows:
+            return 0
+        db.execute(insert(RuleTrigger), list(rows))
+        db.commit()
+        return len(rows)
+
+    def list_between(
+        self, db: Session, since: dt.datetime, until: dt.datetime, limit: int = 1000
+    ) -> List[RuleTrigger]:
+        """
+        Срабатывания за период.
+
+        Args:
+            db: Сессия БД
+            since: Начало периода
+            until: Конец периода
+            limit: Максимум записей
+
+        Returns:
+            Срабатывания по возрастанию ID
+        """
+        stmt = (
+            select(RuleTrigger)
+            .where(RuleTrigger.triggered_at >= since)
+            .where(RuleTrigger.triggered_at <= until)
+            .order_by(RuleTrigger.id)
+            .limit(limit)
+        )
+        return list(db.execute(stmt).scalars().all())
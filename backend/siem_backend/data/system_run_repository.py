@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from siem_backend.data.models import SystemRun
+
+
+class SystemRunRepository:
+    """Репозиторий журнала запусков анализа."""
+
+    def get_last(
+        self, db: Session, status: str = "completed", modes: Optional[Sequence[str]] = None
+    ) -> Optional[SystemRun]:
+        """
+        Последний завершившийся запуск с заданным статусом.
+
+        Args:
+            db: Сессия БД
+            status: Статус запуска
+            modes: Допустимые режимы запуска (details["mode"]); None — любые
+
+        Returns:
+            Запуск или None
+        """
+        stmt = select(SystemRun).where(SystemRun.status == status)
+        if modes is not None:
+            stmt = stmt.where(SystemRun.details["mode"].as_string().in_(list(modes)))
+        # Снимок потокового анализа обновляется на месте: свежесть — по finished_at
+        stmt = stmt.order_by(SystemRun.finished_at.desc(), SystemRun.id.desc()).limit(1)
+        return db.execute(stmt).scalar_one_or_none()
+
+    def list_recent(self, db: Session, limit: int = 20, before_id: Optional[int] = None) -> List[SystemRun]:
+        """
+        Последние запуски от новых к старым.
+
+        Args:
+            db: Сессия БД
+            limit: Максимум записей
+            before_id: Только запуски с ID меньше заданного (следующая страница)
+
+        Returns:
+            Список запусков
+        """
+        stmt = select(SystemRun)
+        if before_id is not None:
+            stmt = stmt.where(SystemRun.id < before_id)
+        stmt = stmt.order_by(SystemRun.id.desc()).limit(limit)
+        return list(db.execute(stmt).scalars().all())
+
+    def get_by_id(self, db: Session, run_id: int) -> Optional[SystemRun]:
+        return db.get(SystemRun, run_id)
+
+    def add(self, db: Session, run: SystemRun) -> SystemRun:
+        db.add(run)
+        db.commit()
+        db.refresh(run)
+        return run
+
+    def save_state(self, db: Session, run: SystemRun, replace: bool = False) -> SystemRun:
+        """
+        Сохраняет запуск с состоянием окон (details["windows"]).
+
+        Состояние читает только get_last(), поэтому полное состояние
+        хранит лишь последний запуск режима: у предыдущего окна удаляются
+        в той же транзакции. С replace предыдущий запуск режима
+        перезаписывается — для снимков потокового анализа, у которых нет
+        своей истории.
+
+        Args:
+            db: Сессия БД
+            run: Новый запуск (details["mode"] — режим)
+            replace: Обновить прежнюю запись режима вместо новой
+
+        Returns:
+            Сохранённый запуск
+        """
+        previous = self.get_last(db, status=run.status, modes=[run.details["mode"]])
+        if previous is not None and replace:
+            previous.started_at = run.started_at
+            previous.finished_at = run.finished_at
+            previous.rules_executed = run.rules_executed
+            previous.incidents_found = run.incidents_found
+            previous.details = run.details
+            run = previous
+        else:
+            if previous is not None and "windows" in (previous.details or {}):
+                previous.details = {key: value for key, value in previous.details.items() if key != "windows"}
+            db.add(run)
+        db.commit()
+        db.refresh(run)
+        return run
@@ -1,17 +1,33 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from siem_backend.api.router import api_router
 from siem_backend.core.config import settings
 from siem_backend.core.logging import configure_logging
-from siem_backend.data.db import init_db
+from siem_backend.data.db import SessionLocal, init_db
 from siem_backend.services import scheduler  # Запускает фоновый планировщик
+from siem_backend.services.analysis_engine import streaming_engine
+from siem_backend.services.ingest_queue import ingest_queue
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Дописываем очередь событий и сохраняем окна потокового анализа
+    ingest_queue.shutdown()
+    db = SessionLocal()
+    try:
+        streaming_engine.snapshot(db)
+    finally:
+        db.close()
 
 
 def create_app() -> FastAPI:
     configure_logging(settings.log_level)
     init_db()
 
-    app = FastAPI(title=settings.app_name)
+    app = FastAPI(title=settings.app_name, lifespan=lifespan)
     app.include_router(api_router, prefix=settings.api_prefix)
     return app
 
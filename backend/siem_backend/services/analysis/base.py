@@ -2,16 +2,233 @@ from __future__ import annotations
 
 import datetime as dt
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
 
+from sqlalchemy import func, or_, select
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import ColumnElement
 
+from siem_backend.data.models import Event, EventType
+from siem_backend.data.reference import references
+from siem_backend.services.analysis.keys import UNKNOWN_KEY, GroupKey
 from siem_backend.services.analysis.types import IncidentCandidate
+from siem_backend.services.keyword_matcher import KeywordMatcher
 
 
 class BaseRule(ABC):
+    """
+    Правило анализа событий.
+
+    Правило объявляет типы событий (event_types), отбирает события
+    по сообщению (accepts) и строит кандидатов по отобранным (evaluate).
+    RuleEngine читает окно событий один раз и раздаёт строки правилам
+    по типу события; run() — самостоятельный запуск с собственной выборкой.
+    Правила, которые выражаются агрегатным запросом, переопределяют aggregate().
+    """
+
     name: str
+    # Типы событий, которые читает правило
+    event_types: Tuple[str, ...] = ()
+
+    @staticmethod
+    def _event_type_id(db: Session, name: str) -> int:
+        """ID типа события из реестра справочников (1, если тип не найден)."""
+        return references.ensure_loaded(db).id(EventType, name) or 1
+
+    def accepts(self, message: str) -> bool:
+        """
+        Отбирает событие по тексту сообщения.
+
+        Args:
+            message: Сообщение в нижнем регистре
+
+        Returns:
+            True, если событие учитывается правилом
+        """
+        return True
 
     @abstractmethod
+    def evaluate(
+        self, matched: Sequence[Any], *, since: dt.datetime, until: dt.datetime
+    ) -> List[IncidentCandidate]:
+        """
+        Строит кандидатов в инциденты по отобранным событиям.
+
+        Args:
+            matched: Отобранные события (строки с полями id, ts, event_type_id, message)
+            since: Начало окна
+            until: Конец окна
+
+        Returns:
+            Кандидаты в инциденты
+        """
+        raise NotImplementedError
+
+    def aggregate(
+        self, db: Session, *, since: dt.datetime, until: dt.datetime
+    ) -> Optional[List[IncidentCandidate]]:
+        """
+        Выполняет правило агрегатным запросом в БД.
+
+        Returns:
+            Кандидаты или None, если правило так не выражается
+        """
+        return None
+
     def run(self, db: Session, *, since: dt.datetime, until: dt.datetime) -> List[IncidentCandidate]:
+        type_ids = [self._event_type_id(db, event_type) for event_type in self.event_types]
+
+        stmt = (
+            select(Event)
+            .where(Event.ts >= since)
+            .where(Event.ts <= until)
+            .where(Event.event_type_id.in_(type_ids))
+        )
+        events = db.execute(stmt).scalars().all()
+
+        matched = [e for e in events if self.accepts((e.message or "").lower())]
+        return self.evaluate(matched, since=since, until=until)
+
+
+class ThresholdRule(BaseRule):
+    """
+    Пороговое правило: события типов event_types с ключевым словом
+    в сообщении, не меньше threshold за окно — в целом или по каждому
+    ключу группировки group_by (пользователь, хост, служба).
+
+    Выполняется в Python (accepts/evaluate) или одним агрегатным запросом:
+    COUNT(*), MAX(id) с ILIKE по ключевым словам, GROUP BY ключу и
+    HAVING по порогу. Кандидатов в обоих случаях строит candidates().
+    """
+
+    keywords: Sequence[str] = ()
+    group_by: Optional[GroupKey] = None
+    _matcher: KeywordMatcher
+    _threshold: int = 1
+
+    def accepts(self, message: str) -> bool:
+        return self._matcher.search(message)
+
+    def key_of(self, message: str, raw_data: Optional[Mapping[str, Any]] = None) -> str:
+        """
+        Ключ группировки события (UNKNOWN_KEY без group_by).
+
+        Args:
+            message: Сообщение в нижнем регистре
+            raw_data: Исходные данные события или строка выборки с полем ключа
+        """
+        if self.group_by is None:
+            return UNKNOWN_KEY
+        return self.group_by.extract(message, raw_data)
+
+    def event_key(self, event: Any) -> str:
+        """Ключ группировки события ORM или строки выборки."""
+        if self.group_by is None:
+            return UNKNOWN_KEY
+        return self.group_by.extract((event.message or "").lower(), _raw_data(event))
+
+    def key_columns(self) -> List[ColumnElement]:
+        """Столбцы выборки, нужные для ключа (поле raw_data под своим именем)."""
+        if self.group_by is None or self.group_by.raw_field is None:
+            return []
+        return [self.group_by.column().label(self.group_by.raw_field)]
+
+    def evaluate(
+        self, matched: Sequence[Any], *, since: dt.datetime, until: dt.datetime
+    ) -> List[IncidentCandidate]:
+        groups: Dict[str, List[int]] = {}
+        for event in matched:
+            key = self.event_key(event)
+            group = groups.setdefault(key, [0, 0])
+            group[0] += 1
+            group[1] = event.id
+
+        results: List[IncidentCandidate] = []
+        for key, (count, last_event_id) in groups.items():
+            results.extend(self.candidates(count, last_event_id, since=since, until=until, key=key))
+        return results
+
+    @abstractmethod
+    def candidates(
+        self,
+        count: int,
+        last_event_id: Optional[int],
+        *,
+        since: dt.datetime,
+        until: dt.datetime,
+        key: str = UNKNOWN_KEY,
+    ) -> List[IncidentCandidate]:
+        """
+        Строит кандидатов по числу совпавших событий.
+
+        Args:
+            count: Число совпавших событий
+            last_event_id: ID последнего из них
+            since: Начало окна
+            until: Конец окна
+            key: Ключ группировки
+
+        Returns:
+            Кандидаты в инциденты (пусто, если порог не достигнут)
+        """
         raise NotImplementedError
+
+    def _scope(self, key: str) -> str:
+        """Уточнение описания для ключа: " for user admin" или пусто."""
+        if self.group_by is None or key == UNKNOWN_KEY:
+            return ""
+        return f" for {self.group_by.name} {key}"
+
+    def _key_details(self, key: str) -> Dict[str, Any]:
+        """Поля details для ключа группировки."""
+        if self.group_by is None:
+            return {}
+        return {"group_by": self.group_by.name, "key": key}
+
+    def aggregate_statement(self, db: Session, *, since: dt.datetime, until: dt.datetime) -> Select:
+        """
+        Агрегатный запрос правила: COUNT(*), MAX(id) по совпавшим событиям окна;
+        с group_by — по ключам, только достигшим порога.
+        """
+        type_ids = [self._event_type_id(db, event_type) for event_type in self.event_types]
+        columns = [func.count(Event.id), func.max(Event.id)]
+        if self.group_by is not None:
+            columns.append(self.group_by.column())
+        stmt = (
+            select(*columns)
+            .where(Event.ts >= since)
+            .where(Event.ts <= until)
+            .where(Event.event_type_id.in_(type_ids))
+        )
+        if self.keywords:
+            stmt = stmt.where(or_(*(Event.message.icontains(kw, autoescape=True) for kw in self.keywords)))
+        if self.group_by is not None:
+            key = self.group_by.column()
+            stmt = stmt.group_by(key).having(func.count(Event.id) >= self._threshold)
+        return stmt
+
+    def aggregate(
+        self, db: Session, *, since: dt.datetime, until: dt.datetime
+    ) -> Optional[List[IncidentCandidate]]:
+        if self.group_by is not None and not self.group_by.sql_expressible:
+            return None
+
+        stmt = self.aggregate_statement(db, since=since, until=until)
+        if self.group_by is None:
+            # Без GROUP BY запрос возвращает одну строку; порог проверяет candidates()
+            count, last_event_id = db.execute(stmt).one()
+            return self.candidates(count, last_event_id, since=since, until=until)
+
+        results: List[IncidentCandidate] = []
+        for count, last_event_id, key in db.execute(stmt):
+            results.extend(self.candidates(count, last_event_id, since=since, until=until, key=key))
+        return results
+
+
+def _raw_data(event: Any) -> Optional[Mapping[str, Any]]:
+    """raw_data события ORM или поля строки выборки (ключ из raw_data выбран под своим именем)."""
+    raw_data = getattr(event, "raw_data", None)
+    if raw_data is not None:
+        return raw_data
+    return getattr(event, "_mapping", None)
@@ -1,24 +1,435 @@
 from __future__ import annotations
 
 import datetime as dt
-from typing import Iterable, List, Sequence
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
+from sqlalchemy import func, select, text
 from sqlalchemy.orm import Session
 
-from siem_backend.services.analysis.base import BaseRule
-from siem_backend.services.analysis.types import IncidentCandidate
+from siem_backend.core.config import settings
+from siem_backend.data.db import SessionLocal
+from siem_backend.data.models import Event
+from siem_backend.services.analysis.base import BaseRule, ThresholdRule
+from siem_backend.services.analysis.types import IncidentCandidate, RuleStats
+from siem_backend.services.analysis.windows import KeyedWindows
+
+logger = logging.getLogger(__name__)
+
+# Размер порции строк при потоковом чтении окна
+SCAN_YIELD_PER = 1000
+
+RuleStatsMap = Dict[str, RuleStats]
+
+# Как часто SQLite проверяет срок запроса (в инструкциях виртуальной машины)
+SQLITE_PROGRESS_STEPS = 10000
+
+
+@contextmanager
+def _statement_deadline(db: Session, deadline: float) -> Iterator[None]:
+    """
+    Прерывает запросы сессии, не уложившиеся в срок правила.
+
+    PostgreSQL: statement_timeout на транзакцию (SET LOCAL). SQLite:
+    обработчик прогресса соединения прерывает запрос после deadline
+    (по time.monotonic()). Другие БД срока не получают.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        timeout_ms = max(1, int((deadline - time.monotonic()) * 1000))
+        db.execute(text(f"SET LOCAL statement_timeout = {timeout_ms}"))
+        yield
+    elif dialect == "sqlite":
+        raw = db.connection().connection.driver_connection
+        raw.set_progress_handler(lambda: int(time.monotonic() > deadline), SQLITE_PROGRESS_STEPS)
+        try:
+            yield
+        finally:
+            raw.set_progress_handler(None, 0)
+    else:
+        yield
+
+
+def _elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
+def _stats_for(rules: Sequence[BaseRule], stats: Optional[RuleStatsMap]) -> RuleStatsMap:
+    """Словарь счётчиков с записью для каждого правила."""
+    stats = {} if stats is None else stats
+    for rule in rules:
+        stats.setdefault(rule.name, RuleStats(rule.name))
+    return stats
 
 
 class RuleEngine:
-    def __init__(self, rules: Sequence[BaseRule]) -> None:
+    """
+    Запуск правил анализа за один проход по окну событий.
+
+    Окно [since, until] читается одним запросом лёгкими строками
+    (id, ts, event_type_id, message) порциями по SCAN_YIELD_PER, и каждая строка
+    передаётся правилам, подписанным на её тип события. Новое правило
+    добавляет только работу CPU, а не ещё одно чтение таблицы.
+    Правила без event_types запускаются отдельно через run().
+
+    В режиме aggregate правила, которые выражаются агрегатным запросом
+    (BaseRule.aggregate), считаются в БД, остальные — общим проходом.
+
+    В параллельном режиме (workers > 1) каждое правило выполняется
+    самостоятельно (aggregate() или run()) в пуле потоков запуска со своей
+    сессией из session_factory. Правилу даётся rule_timeout секунд на старт
+    в очереди пула и столько же на выполнение; запросы правила прерываются
+    по сроку в самой БД. Правило, не уложившееся в срок или упавшее,
+    пропускается с записью в журнал; его результат и счётчики, пришедшие
+    позже срока, отбрасываются. Зависшее правило держит только поток
+    своего запуска — следующие запуски получают новый пул.
+
+    По каждому правилу собираются счётчики RuleStats: время, прочитанные
+    и отобранные строки, число кандидатов (параметр stats у run()).
+    """
+
+    def __init__(
+        self,
+        rules: Sequence[BaseRule],
+        aggregate: Optional[bool] = None,
+        workers: Optional[int] = None,
+        rule_timeout: Optional[float] = None,
+        session_factory: Optional[Callable[[], Session]] = None,
+        watermark_overlap: Optional[int] = None,
+    ) -> None:
         self._rules = list(rules)
+        self._aggregate = settings.analysis_sql_aggregates if aggregate is None else aggregate
+        self._workers = settings.analysis_parallel_workers if workers is None else workers
+        self._rule_timeout = settings.analysis_rule_timeout if rule_timeout is None else rule_timeout
+        self._session_factory = session_factory or SessionLocal
+        self._watermark_overlap = (
+            settings.analysis_watermark_overlap if watermark_overlap is None else watermark_overlap
+        )
+
+    def run(
+        self,
+        db: Session,
+        *,
+        since: dt.datetime,
+        until: dt.datetime,
+        stats: Optional[RuleStatsMap] = None,
+    ) -> List[IncidentCandidate]:
+        """
+        Запускает правила по окну [since, until].
+
+        Args:
+            db: Сессия БД
+            since: Начало окна
+            until: Конец окна
+            stats: Словарь для счётчиков правил по имени правила (заполняется на месте)
+
+        Returns:
+            Кандидаты в инциденты
+        """
+        return self._dispatch(db, self._rules, _stats_for(self._rules, stats), since=since, until=until)
+
+    def _dispatch(
+        self,
+        db: Session,
+        rules: Sequence[BaseRule],
+        stats: RuleStatsMap,
+        *,
+        since: dt.datetime,
+        until: dt.datetime,
+    ) -> List[IncidentCandidate]:
+        """Параллельный запуск, если он включён и правил больше одного, иначе общий проход."""
+        if self._workers > 1 and len(rules) > 1:
+            return self._run_parallel(rules, stats, since=since, until=until)
+        return self._run(db, rules, stats, since=since, until=until)
+
+    def _run(
+        self,
+        db: Session,
+        rules: Sequence[BaseRule],
+        stats: RuleStatsMap,
+        *,
+        since: dt.datetime,
+        until: dt.datetime,
+    ) -> List[IncidentCandidate]:
+        aggregated: Dict[int, List[IncidentCandidate]] = {}
+        if self._aggregate:
+            for rule in rules:
+                started = time.perf_counter()
+                found = rule.aggregate(db, since=since, until=until)
+                stats[rule.name].wall_ms += _elapsed_ms(started)
+                if found is not None:
+                    aggregated[id(rule)] = found
+                    stats[rule.name].mode = "aggregate"
+
+        scanned = [rule for rule in rules if rule.event_types and id(rule) not in aggregated]
+        matched: Dict[int, List] = {id(rule): [] for rule in scanned}
+        for rule, row in self._scan(db, scanned, stats, Event.ts >= since, Event.ts <= until):
+            matched[id(rule)].append(row)
+
+        results: List[IncidentCandidate] = []
+        for rule in rules:
+            entry = stats[rule.name]
+            started = time.perf_counter()
+            if id(rule) in aggregated:
+                found = aggregated[id(rule)]
+            elif rule.event_types:
+                found = rule.evaluate(matched[id(rule)], since=since, until=until)
+            else:
+                entry.mode = "run"
+                found = rule.run(db, since=since, until=until)
+            entry.wall_ms += _elapsed_ms(started)
+            entry.candidates += len(found)
+            results.extend(found)
+        return results
+
+    def run_incremental(
+        self,
+        db: Session,
+        *,
+        since: dt.datetime,
+        until: dt.datetime,
+        after_id: int,
+        windows: Dict[str, KeyedWindows],
+        stats: Optional[RuleStatsMap] = None,
+    ) -> Tuple[List[IncidentCandidate], int]:
+        """
+        Инкрементальный запуск: читаются только события с ID больше after_id.
+
+        Пороговые правила (ThresholdRule) добавляют совпадения в скользящие
+        окна своих ключей группировки и оцениваются по ним; остальные правила
+        выполняются по полному окну, как в run().
+
+        ID выдаются при вставке, а видны после фиксации: строка другого
+        писателя с меньшим ID может зафиксироваться после чтения MAX(id).
+        Приложение пишет события одним потоком очереди записи (IngestQueue),
+        транзакции которого фиксируются по порядку, так что такие строки
+        дают только сторонние писатели. Для них каждый запуск перечитывает
+        узкую полосу из watermark_overlap ID под after_id, пропуская ID,
+        уже учтённые в окнах (KeyedWindows.recent); строка, зафиксированная
+        позже, чем через watermark_overlap ID после своего, теряется.
+        Число прочитанных строк — новые события плюс не больше полосы.
+
+        Args:
+            db: Сессия БД
+            since: Начало окна
+            until: Конец окна
+            after_id: Водяной знак — наибольший ID, разобранный прошлым запуском
+            windows: Окна пороговых правил по имени правила (дополняются на месте)
+            stats: Словарь для счётчиков правил (scanned — новые строки и полоса перекрытия)
+
+        Returns:
+            (кандидаты в инциденты, новый водяной знак)
+        """
+        stats = _stats_for(self._rules, stats)
+        watermark = db.execute(select(func.max(Event.id))).scalar() or 0
+        windowed = [rule for rule in self._rules if isinstance(rule, ThresholdRule)]
+        for rule in windowed:
+            windows.setdefault(rule.name, KeyedWindows(settings.analysis_max_keys))
+            stats[rule.name].mode = "window"
+            stats[rule.name].scanned = stats[rule.name].matched = 0
+
+        if watermark > after_id:
+            low = max(0, after_id - self._watermark_overlap)
+            conditions = (Event.id > low, Event.id <= watermark, Event.ts >= since)
+            for rule, row in self._scan(db, windowed, stats, *conditions):
+                keyed = windows[rule.name]
+                if row.id not in keyed.recent:
+                    keyed.add(rule.event_key(row), row.ts, row.id)
+            for rule in windowed:
+                windows[rule.name].forget(watermark - self._watermark_overlap)
 
-    def run(self, db: Session, *, since: dt.datetime, until: dt.datetime) -> List[IncidentCandidate]:
         results: List[IncidentCandidate] = []
-        for rule in self._rules:
-            results.extend(rule.run(db, since=since, until=until))
+        for rule in windowed:
+            started = time.perf_counter()
+            found: List[IncidentCandidate] = []
+            for key, (count, last_event_id) in windows[rule.name].totals(since).items():
+                found.extend(rule.candidates(count, last_event_id, since=since, until=until, key=key))
+            stats[rule.name].wall_ms += _elapsed_ms(started)
+            stats[rule.name].candidates += len(found)
+            results.extend(found)
+
+        others = [rule for rule in self._rules if not isinstance(rule, ThresholdRule)]
+        results.extend(self._dispatch(db, others, stats, since=since, until=until))
+        return results, max(watermark, after_id)
+
+    def _run_parallel(
+        self, rules: Sequence[BaseRule], stats: RuleStatsMap, *, since: dt.datetime, until: dt.datetime
+    ) -> List[IncidentCandidate]:
+        """
+        Выполняет правила в пуле потоков и объединяет результаты в порядке правил.
+
+        Args:
+            rules: Правила
+            stats: Счётчики правил
+            since: Начало окна
+            until: Конец окна
+
+        Returns:
+            Кандидаты правил, уложившихся в срок
+        """
+        executor = ThreadPoolExecutor(
+            max_workers=min(self._workers, len(rules)), thread_name_prefix="rule-worker"
+        )
+        started: Dict[int, float] = {}
+        submitted = time.monotonic()
+        try:
+            futures: Dict[Future, BaseRule] = {
+                executor.submit(self._run_rule, rule, started, since=since, until=until): rule
+                for rule in rules
+            }
+            timed_out = self._wait(futures, started, submitted, stats)
+        finally:
+            # Не ждём зависших правил: их результат уже не нужен
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        results: List[IncidentCandidate] = []
+        for future, rule in futures.items():
+            if future in timed_out:
+                continue
+            try:
+                found, entry = future.result()
+            except Exception:
+                stats[rule.name].status = "error"
+                logger.exception("Rule %s failed", rule.name)
+                continue
+            stats[rule.name].mode = entry.mode
+            stats[rule.name].wall_ms += entry.wall_ms
+            stats[rule.name].candidates += len(found)
+            results.extend(found)
         return results
 
+    def _wait(
+        self, futures: Dict[Future, BaseRule], started: Dict[int, float], submitted: float, stats: RuleStatsMap
+    ) -> Set[Future]:
+        """
+        Ждёт правила до их сроков.
+
+        Returns:
+            Задачи, не уложившиеся в срок (их результат не используется)
+        """
+        pending = set(futures)
+        timed_out: Set[Future] = set()
+        while pending:
+            now = time.monotonic()
+            deadlines = []
+            for future in list(pending):
+                rule = futures[future]
+                began = started.get(id(rule))
+                deadline = (began if began is not None else submitted) + self._rule_timeout
+                # Не стартовавшее правило снимается из очереди; выполняющееся
+                # прерывается сроком запроса в БД, а его результат больше не ждём
+                if now >= deadline and (began is not None or future.cancel()):
+                    pending.discard(future)
+                    timed_out.add(future)
+                    stats[rule.name].status = "timeout"
+                    logger.warning(
+                        "Rule %s timed out after %.1f s (%s)",
+                        rule.name, self._rule_timeout, "running" if began is not None else "queued",
+                    )
+                else:
+                    deadlines.append(deadline)
+            if not pending:
+                break
+            wait(pending, timeout=max(0.0, min(deadlines) - now), return_when=FIRST_COMPLETED)
+            pending = {future for future in pending if not future.done()}
+        return timed_out
+
+    def _run_rule(
+        self,
+        rule: BaseRule,
+        started: Dict[int, float],
+        *,
+        since: dt.datetime,
+        until: dt.datetime,
+    ) -> Tuple[List[IncidentCandidate], RuleStats]:
+        """
+        Выполняет одно правило в потоке пула со своей сессией.
+
+        Счётчики пишутся в свой RuleStats: в общий словарь их переносит
+        _run_parallel, только если правило уложилось в срок.
+        """
+        began_at = started[id(rule)] = time.monotonic()
+        began = time.perf_counter()
+        entry = RuleStats(rule.name)
+        db = self._session_factory()
+        try:
+            with _statement_deadline(db, began_at + self._rule_timeout):
+                if self._aggregate:
+                    found = rule.aggregate(db, since=since, until=until)
+                    if found is not None:
+                        entry.mode = "aggregate"
+                        return found, entry
+                entry.mode = "run"
+                return rule.run(db, since=since, until=until), entry
+        finally:
+            db.close()
+            entry.wall_ms = _elapsed_ms(began)
+
+    def _scan(
+        self, db: Session, rules: Sequence[BaseRule], stats: RuleStatsMap, *conditions
+    ) -> Iterator[Tuple[BaseRule, object]]:
+        """
+        Один проход по событиям: пары (правило, строка) для принятых правилом строк.
+
+        Пары выдаются порциями по SCAN_YIELD_PER строк: внутри порции —
+        по правилам, строки одного правила идут в порядке выборки.
+
+        Args:
+            db: Сессия БД
+            rules: Правила с event_types
+            stats: Счётчики правил (прочитано, отобрано, время отбора)
+            conditions: Условия выборки событий
+        """
+        # Таблица маршрутизации: ID типа события -> (правило, счётчики)
+        routes: Dict[int, List[Tuple[BaseRule, RuleStats]]] = {}
+        for rule in rules:
+            entry = stats[rule.name]
+            entry.scanned = entry.scanned or 0
+            entry.matched = entry.matched or 0
+            for event_type in rule.event_types:
+                routes.setdefault(rule._event_type_id(db, event_type), []).append((rule, entry))
+        if not routes:
+            return
+
+        # Поля raw_data для ключей группировки выбираются отдельными столбцами
+        key_columns = {}
+        for rule in rules:
+            if isinstance(rule, ThresholdRule):
+                for column in rule.key_columns():
+                    key_columns.setdefault(column.name, column)
+
+        stmt = (
+            select(Event.id, Event.ts, Event.event_type_id, Event.message, *key_columns.values())
+            .where(*conditions)
+            .where(Event.event_type_id.in_(list(routes)))
+            .execution_options(yield_per=SCAN_YIELD_PER)
+        )
+        rows = iter(db.execute(stmt))
+        while True:
+            chunk = list(islice(rows, SCAN_YIELD_PER))
+            if not chunk:
+                return
+            # Строки порции раскладываются по правилам; отбор правила
+            # замеряется одним таймером на порцию, а не на каждую строку
+            routed: Dict[int, Tuple[BaseRule, RuleStats, List[Tuple[object, str]]]] = {}
+            for row in chunk:
+                message = (row.message or "").lower()
+                for rule, entry in routes.get(row.event_type_id, ()):
+                    routed.setdefault(id(rule), (rule, entry, []))[2].append((row, message))
+            for rule, entry, pairs in routed.values():
+                accepts = rule.accepts
+                started = time.perf_counter()
+                accepted = [row for row, message in pairs if accepts(message)]
+                entry.wall_ms += _elapsed_ms(started)
+                entry.scanned += len(pairs)
+                entry.matched += len(accepted)
+                for row in accepted:
+                    yield rule, row
+
     @property
     def rules(self) -> Iterable[BaseRule]:
         return tuple(self._rules)
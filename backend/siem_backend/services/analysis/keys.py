@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional, Pattern
+
+from sqlalchemy import func
+from sqlalchemy.sql.elements import ColumnElement
+
+from siem_backend.data.models import Event
+
+# Ключ событий, у которых значение не найдено
+UNKNOWN_KEY = ""
+
+
+@dataclass(frozen=True)
+class GroupKey:
+    """
+    Ключ группировки правила: поле raw_data и/или выражение по сообщению.
+
+    Значение поля raw_data проверяется первым, затем выражение (первая
+    группа по сообщению в нижнем регистре). Ключ приводится к нижнему регистру.
+    Ключ только из raw_data вычисляется и в SQL (column()), поэтому правило
+    с таким ключом остаётся агрегатным запросом.
+    """
+
+    name: str
+    raw_field: Optional[str] = None
+    pattern: Optional[Pattern[str]] = None
+
+    @property
+    def sql_expressible(self) -> bool:
+        return self.raw_field is not None and self.pattern is None
+
+    def column(self) -> ColumnElement:
+        """Выражение ключа в SQL (только для ключа из raw_data)."""
+        return func.lower(func.coalesce(Event.raw_data[self.raw_field].as_string(), UNKNOWN_KEY))
+
+    def extract(self, message: str, raw_data: Optional[Mapping[str, Any]] = None) -> str:
+        """
+        Значение ключа события.
+
+        Args:
+            message: Сообщение в нижнем регистре
+            raw_data: Исходные данные события (или строка выборки с полем raw_field)
+
+        Returns:
+            Ключ или UNKNOWN_KEY
+        """
+        if self.raw_field is not None and raw_data is not None:
+            value = raw_data.get(self.raw_field)
+            if value:
+                return str(value).lower()
+        if self.pattern is not None:
+            match = self.pattern.search(message)
+            if match:
+                return match.group(1)
+        return UNKNOWN_KEY
+
+
+# Пользователь из сообщений вида "failed password for [invalid] [user] admin"
+USER_KEY = GroupKey("user", pattern=re.compile(r"\bfor (?:invalid )?(?:user )?([\w.@-]+)"))
+SERVICE_KEY = GroupKey("service", raw_field="service")
+HOST_KEY = GroupKey("host", raw_field="host")
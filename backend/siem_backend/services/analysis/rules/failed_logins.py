@@ -1,64 +1,41 @@
 import datetime as dt
-from typing import Dict, List
+from typing import List, Optional
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
-
-from siem_backend.data.models import Event, EventType, SeverityLevel
-from siem_backend.services.analysis.base import BaseRule
+from siem_backend.services.analysis.base import ThresholdRule
+from siem_backend.services.analysis.keys import UNKNOWN_KEY, USER_KEY
 from siem_backend.services.analysis.types import IncidentCandidate
+from siem_backend.services.keyword_matcher import KeywordMatcher
 
 
-class MultipleFailedLoginsRule(BaseRule):
+class MultipleFailedLoginsRule(ThresholdRule):
     """Правило обнаружения множественных неудачных попыток входа."""
     
     name = "multiple_failed_logins"
 
+    keywords = [
+        "failed password",
+        "failed login attempt",
+        "authentication failure",
+        "invalid password",
+        "login failed",
+    ]
+    event_types = ("authentication",)
+    group_by = USER_KEY
+    _matcher = KeywordMatcher([(name, keywords)])
+
     def __init__(self, threshold: int = 5, window_minutes: int = 5) -> None:
         self._threshold = threshold
         self._window_minutes = window_minutes
-        
-        # Кэш для справочников
-        self._event_type_cache: Dict[str, int] = {}
-
-    def _get_event_type_id(self, db: Session, name: str) -> int:
-        """Получает ID типа события по названию."""
-        if name not in self._event_type_cache:
-            stmt = select(EventType.id).where(EventType.name == name)
-            result = db.execute(stmt).scalar_one_or_none()
-            if result:
-                self._event_type_cache[name] = result
-            else:
-                return 1  # Default ID
-        return self._event_type_cache.get(name, 1)
-
-    def run(self, db: Session, *, since: dt.datetime, until: dt.datetime) -> List[IncidentCandidate]:
-        # Получаем ID типа события "authentication"
-        auth_type_id = self._get_event_type_id(db, "authentication")
-        
-        stmt = (
-            select(Event)
-            .where(Event.ts >= since)
-            .where(Event.ts <= until)
-            .where(Event.event_type_id == auth_type_id)
-        )
-        events = db.execute(stmt).scalars().all()
 
-        keywords = [
-            "failed password",
-            "failed login attempt",
-            "authentication failure",
-            "invalid password",
-            "login failed",
-        ]
-
-        matched: List[Event] = []
-        for e in events:
-            msg = (e.message or "").lower()
-            if any(k in msg for k in keywords):
-                matched.append(e)
-
-        count = len(matched)
+    def candidates(
+        self,
+        count: int,
+        last_event_id: Optional[int],
+        *,
+        since: dt.datetime,
+        until: dt.datetime,
+        key: str = UNKNOWN_KEY,
+    ) -> List[IncidentCandidate]:
         if count < self._threshold:
             return []
 
@@ -66,10 +43,8 @@ class MultipleFailedLoginsRule(BaseRule):
         if count >= max(self._threshold * 2, 10):
             severity = "critical"
 
-        last_event_id = matched[-1].id if matched else None
-
         description = (
-            f"Multiple failed login attempts detected: {count} events within last "
+            f"Multiple failed login attempts detected{self._scope(key)}: {count} events within last "
             f"{int((until - since).total_seconds() // 60)} minutes."
         )
 
@@ -86,7 +61,8 @@ class MultipleFailedLoginsRule(BaseRule):
                     "window_minutes": self._window_minutes,
                     "since": since.isoformat(),
                     "until": until.isoformat(),
-                    "keywords": keywords,
+                    "keywords": list(self.keywords),
+                    **self._key_details(key),
                 },
             )
         ]
@@ -1,63 +1,40 @@
 import datetime as dt
-from typing import Dict, List
+from typing import List, Optional
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
-
-from siem_backend.data.models import Event, EventType
-from siem_backend.services.analysis.base import BaseRule
+from siem_backend.services.analysis.base import ThresholdRule
+from siem_backend.services.analysis.keys import SERVICE_KEY, UNKNOWN_KEY
 from siem_backend.services.analysis.types import IncidentCandidate
+from siem_backend.services.keyword_matcher import KeywordMatcher
 
 
-class ServiceCrashOrRestartRule(BaseRule):
+class ServiceCrashOrRestartRule(ThresholdRule):
     """Правило обнаружения сбоев или перезапусков служб."""
     
     name = "service_crash_or_restart"
 
+    keywords = [
+        "crash",
+        "terminated",
+        "panic",
+        "exited",
+        "restart",
+    ]
+    event_types = ("service",)
+    group_by = SERVICE_KEY
+    _matcher = KeywordMatcher([(name, keywords)])
+
     def __init__(self, threshold: int = 1) -> None:
         self._threshold = threshold
-        
-        # Кэш для справочников
-        self._event_type_cache: Dict[str, int] = {}
-
-    def _get_event_type_id(self, db: Session, name: str) -> int:
-        """Получает ID типа события по названию."""
-        if name not in self._event_type_cache:
-            stmt = select(EventType.id).where(EventType.name == name)
-            result = db.execute(stmt).scalar_one_or_none()
-            if result:
-                self._event_type_cache[name] = result
-            else:
-                return 1
-        return self._event_type_cache.get(name, 1)
-
-    def run(self, db: Session, *, since: dt.datetime, until: dt.datetime) -> List[IncidentCandidate]:
-        # Получаем ID типа события "service"
-        service_type_id = self._get_event_type_id(db, "service")
-        
-        stmt = (
-            select(Event)
-            .where(Event.ts >= since)
-            .where(Event.ts <= until)
-            .where(Event.event_type_id == service_type_id)
-        )
-        events = db.execute(stmt).scalars().all()
-
-        keywords = [
-            "crash",
-            "terminated",
-            "panic",
-            "exited",
-            "restart",
-        ]
-
-        matched: List[Event] = []
-        for e in events:
-            msg = (e.message or "").lower()
-            if any(k in msg for k in keywords):
-                matched.append(e)
 
-        count = len(matched)
+    def candidates(
+        self,
+        count: int,
+        last_event_id: Optional[int],
+        *,
+        since: dt.datetime,
+        until: dt.datetime,
+        key: str = UNKNOWN_KEY,
+    ) -> List[IncidentCandidate]:
         if count < self._threshold:
             return []
 
@@ -71,8 +48,7 @@ class ServiceCrashOrRestartRule(BaseRule):
         elif count >= 3:
             severity = "low"
 
-        last_event_id = matched[-1].id if matched else None
-        description = f"Service crash/restart indicators detected: {count} events."
+        description = f"Service crash/restart indicators detected{self._scope(key)}: {count} events."
 
         return [
             IncidentCandidate(
@@ -86,7 +62,8 @@ class ServiceCrashOrRestartRule(BaseRule):
                     "threshold": self._threshold,
                     "since": since.isoformat(),
                     "until": until.isoformat(),
-                    "keywords": keywords,
+                    "keywords": list(self.keywords),
+                    **self._key_details(key),
                 },
             )
         ]
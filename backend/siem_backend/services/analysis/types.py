@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import datetime as dt
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from typing import Any, Dict, Optional
 
 
@@ -13,3 +13,24 @@ class IncidentCandidate:
     detected_at: dt.datetime
     event_id: Optional[int]
     details: Dict[str, Any]
+
+
+@dataclass
+class RuleStats:
+    """Счётчики правила за один запуск анализа (SystemRun.details["rule_stats"])."""
+
+    rule: str
+    # scan — общий проход, aggregate — запрос в БД, window — скользящие окна, run — своя выборка
+    mode: str = "scan"
+    # ok | timeout | error
+    status: str = "ok"
+    wall_ms: float = 0.0
+    # Прочитано и отобрано строк (None, если считалось в БД)
+    scanned: Optional[int] = None
+    matched: Optional[int] = None
+    candidates: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["wall_ms"] = round(self.wall_ms, 3)
+        return data
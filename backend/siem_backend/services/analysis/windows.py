@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import calendar
+import datetime as dt
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Версия формата состояния окон в SystemRun.details
+WINDOW_STATE_VERSION = 3
+# Режимы запусков, сохраняющих состояние окон (полный запуск его не пишет)
+WINDOW_STATE_MODES = ("incremental", "streaming")
+# Сколько ключей группировки держит окно правила по умолчанию
+DEFAULT_MAX_KEYS = 10000
+
+
+def _minute(ts: dt.datetime) -> int:
+    """Номер минуты от эпохи (наивное время считается UTC)."""
+    return calendar.timegm(ts.utctimetuple()) // 60
+
+
+class SlidingWindowCounter:
+    """
+    Скользящее окно совпадений правила по минутным корзинам.
+
+    Корзина хранит число совпавших событий и наибольший ID за минуту.
+    Состояние переживает запуски анализа (SystemRun.details), поэтому
+    порог, пересекающий границу запусков, всё равно срабатывает.
+    Граница окна округляется вниз до минуты.
+    """
+
+    def __init__(self, buckets: Optional[Dict[int, List[int]]] = None) -> None:
+        self._buckets: Dict[int, List[int]] = buckets or {}
+        # Серьёзность последнего срабатывания (потоковый анализ, не сохраняется)
+        self.fired: Optional[str] = None
+
+    def add(self, ts: dt.datetime, event_id: int) -> None:
+        """
+        Учитывает совпавшее событие.
+
+        Args:
+            ts: Время события
+            event_id: ID события
+        """
+        bucket = self._buckets.get(_minute(ts))
+        if bucket is None:
+            self._buckets[_minute(ts)] = [1, event_id]
+        else:
+            bucket[0] += 1
+            if event_id > bucket[1]:
+                bucket[1] = event_id
+
+    def evict(self, since: dt.datetime) -> None:
+        """Удаляет корзины старше начала окна."""
+        first = _minute(since)
+        for minute in [m for m in self._buckets if m < first]:
+            del self._buckets[minute]
+
+    def total(self) -> Tuple[int, Optional[int]]:
+        """
+        Итог по окну.
+
+        Returns:
+            (число совпадений, наибольший ID или None)
+        """
+        count = sum(bucket[0] for bucket in self._buckets.values())
+        last_id = max((bucket[1] for bucket in self._buckets.values()), default=None)
+        return count, last_id
+
+    def to_list(self) -> List[List[int]]:
+        """Состояние для JSON: [[минута, число, наибольший ID], ...]."""
+        return [[minute, count, last_id] for minute, (count, last_id) in sorted(self._buckets.items())]
+
+    @classmethod
+    def from_list(cls, rows: List[List[int]]) -> "SlidingWindowCounter":
+        return cls({minute: [count, last_id] for minute, count, last_id in rows})
+
+    def __bool__(self) -> bool:
+        return bool(self._buckets)
+
+
+class KeyedWindows:
+    """
+    Скользящие окна правила по ключам группировки (пользователь, хост, служба).
+
+    Память ограничена max_keys: при переполнении вытесняется ключ,
+    к которому дольше всех не было событий (LRU). Ключи с опустевшим
+    окном удаляются при evict().
+
+    recent — ID учтённых событий в полосе перекрытия под водяным знаком:
+    инкрементальный запуск перечитывает эту полосу и пропускает уже
+    учтённые ID (см. RuleEngine.run_incremental).
+    """
+
+    def __init__(self, max_keys: int = DEFAULT_MAX_KEYS) -> None:
+        self._max_keys = max_keys
+        self._windows: "OrderedDict[str, SlidingWindowCounter]" = OrderedDict()
+        self.evicted = 0
+        self.recent: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def window(self, key: str) -> SlidingWindowCounter:
+        """
+        Окно ключа (создаётся при первом обращении).
+
+        Args:
+            key: Ключ группировки
+
+        Returns:
+            Окно ключа
+        """
+        window = self._windows.get(key)
+        if window is not None:
+            self._windows.move_to_end(key)
+            return window
+        window = self._windows[key] = SlidingWindowCounter()
+        if len(self._windows) > self._max_keys:
+            self._windows.popitem(last=False)
+            self.evicted += 1
+        return window
+
+    def add(self, key: str, ts: dt.datetime, event_id: int) -> SlidingWindowCounter:
+        """Учитывает совпавшее событие в окне ключа."""
+        window = self.window(key)
+        window.add(ts, event_id)
+        self.recent.add(event_id)
+        return window
+
+    def forget(self, below: int) -> None:
+        """Забывает ID учтённых событий не выше below (ниже полосы перекрытия)."""
+        self.recent = {event_id for event_id in self.recent if event_id > below}
+
+    def evict(self, since: dt.datetime) -> None:
+        """Удаляет устаревшие корзины и ключи с пустым окном."""
+        for key in list(self._windows):
+            window = self._windows[key]
+            window.evict(since)
+            if not window:
+                del self._windows[key]
+
+    def totals(self, since: dt.datetime) -> Dict[str, Tuple[int, Optional[int]]]:
+        """
+        Итоги по ключам после вытеснения устаревших корзин.
+
+        Returns:
+            Ключ -> (число совпадений, наибольший ID)
+        """
+        self.evict(since)
+        return {key: window.total() for key, window in self._windows.items()}
+
+    def to_dict(self) -> Dict[str, List[List[int]]]:
+        """Состояние для JSON в порядке от давних ключей к свежим."""
+        return {key: window.to_list() for key, window in self._windows.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, List[List[int]]], max_keys: int = DEFAULT_MAX_KEYS) -> "KeyedWindows":
+        windows = cls(max_keys)
+        for key, rows in data.items():
+            windows._windows[key] = SlidingWindowCounter.from_list(rows)
+        return windows
+
+
+def window_state(
+    *,
+    mode: str,
+    window_minutes: int,
+    rule_names: List[str],
+    watermark: int,
+    until: dt.datetime,
+    windows: Dict[str, KeyedWindows],
+) -> Dict[str, Any]:
+    """
+    Состояние окон для SystemRun.details.
+
+    Args:
+        mode: Режим запуска (incremental, streaming)
+        window_minutes: Длина окна в минутах
+        rule_names: Имена правил (отсортированные)
+        watermark: Наибольший учтённый ID события
+        until: Конец окна
+        windows: Окна правил
+
+    Returns:
+        Словарь состояния
+    """
+    return {
+        "version": WINDOW_STATE_VERSION,
+        "mode": mode,
+        "window_minutes": window_minutes,
+        "rules": rule_names,
+        "watermark": {"event_id": watermark, "ts": until.isoformat()},
+        "windows": {name: keyed.to_dict() for name, keyed in windows.items()},
+        "recent": {name: sorted(keyed.recent) for name, keyed in windows.items()},
+    }
+
+
+def restore_windows(
+    details: Optional[Dict[str, Any]],
+    *,
+    window_minutes: int,
+    rule_names: List[str],
+    max_keys: int = DEFAULT_MAX_KEYS,
+) -> Optional[Tuple[int, Dict[str, KeyedWindows]]]:
+    """
+    Восстанавливает окна из SystemRun.details.
+
+    Args:
+        details: Состояние прошлого запуска
+        window_minutes: Ожидаемая длина окна
+        rule_names: Ожидаемые имена правил
+        max_keys: Предел ключей на правило
+
+    Returns:
+        (водяной знак, окна) или None, если состояние не подходит
+    """
+    state = details or {}
+    if (
+        state.get("version") != WINDOW_STATE_VERSION
+        or state.get("window_minutes") != window_minutes
+        or state.get("rules") != rule_names
+    ):
+        return None
+    watermark = state.get("watermark", {}).get("event_id", 0)
+    windows = {
+        name: KeyedWindows.from_dict(data, max_keys) for name, data in state.get("windows", {}).items()
+    }
+    for name, ids in state.get("recent", {}).items():
+        if name in windows:
+            windows[name].recent = set(ids)
+    return watermark, windows
@@ -1,8 +1,28 @@
 from __future__ import annotations
 
+import datetime as dt
+import threading
+import time
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
 
+from sqlalchemy.orm import Session
+
+from siem_backend.core.config import settings
+from siem_backend.data.models import EventType, SystemRun
+from siem_backend.data.reference import references
+from siem_backend.data.system_run_repository import SystemRunRepository
+from siem_backend.services.analysis.base import ThresholdRule
+from siem_backend.services.analysis.engine import RuleEngine
+from siem_backend.services.analysis.keys import UNKNOWN_KEY
+from siem_backend.services.analysis.types import IncidentCandidate
+from siem_backend.services.analysis.windows import (
+    WINDOW_STATE_MODES,
+    KeyedWindows,
+    restore_windows,
+    window_state,
+)
+from siem_backend.services.incident_service import IncidentService
 from siem_backend.services.normalization import NormalizedEvent
 
 
@@ -15,10 +35,259 @@ class AnalysisResult:
 
 
 class AnalysisEngine:
-    def analyze(self, event: NormalizedEvent) -> AnalysisResult:
+    """
+    Потоковый анализ: события проходят через правила сразу после сохранения.
+
+    Пороговые правила держат скользящие окна в памяти, поэтому инцидент
+    создаётся в момент, когда событие достигает порога, а не при следующем
+    плановом запуске. Окна ведутся по ключам группировки правила (пользователь,
+    служба) с вытеснением простаивающих ключей. Инцидент создаётся при
+    достижении порога ключом и при смене серьёзности; пока порог держится,
+    повторов нет.
+
+    Состояние окон раз в snapshot_seconds сохраняется в SystemRun в формате
+    инкрементального анализа (одна запись режима streaming, обновляемая
+    на месте). После перезапуска окна восстанавливаются из последнего
+    снимка и догоняются по событиям новее его водяного знака.
+    """
+
+    def __init__(
+        self,
+        incident_service: Optional[IncidentService] = None,
+        window_minutes: int = 60,
+        snapshot_seconds: float = 60.0,
+        max_keys: int = 10000,
+        runs: Optional[SystemRunRepository] = None,
+        watermark_overlap: int = 100,
+    ) -> None:
+        self._incidents = incident_service or IncidentService()
+        self._rules = [rule for rule in self._incidents.rules if isinstance(rule, ThresholdRule)]
+        self._rule_names = sorted(rule.name for rule in self._incidents.rules)
+        self._window_minutes = window_minutes
+        self._snapshot_seconds = snapshot_seconds
+        self._max_keys = max_keys
+        self._runs = runs or SystemRunRepository()
+        self._watermark_overlap = watermark_overlap
+
+        self._lock = threading.Lock()
+        self._started = False
+        self._windows: Dict[str, KeyedWindows] = {rule.name: KeyedWindows(max_keys) for rule in self._rules}
+        self._routes: Dict[int, List[ThresholdRule]] = {}
+        self._watermark = 0
+        self._last_snapshot = time.monotonic()
+        self._found_since_snapshot = 0
+
+    # ------------------------------------------------------------------
+    # Поток событий
+    # ------------------------------------------------------------------
+
+    def observe(self, db: Session, rows: Iterable[Tuple[Mapping[str, Any], int]]) -> int:
+        """
+        Пропускает сохранённые события через правила.
+
+        Args:
+            db: Сессия БД (события уже зафиксированы)
+            rows: Пары (строка события для вставки, ID сохранённого события)
+
+        Returns:
+            Количество созданных инцидентов
+        """
+        with self._lock:
+            if not self._started:
+                self._start(db)
+
+            candidates: List[IncidentCandidate] = []
+            for row, event_id in sorted(rows, key=lambda pair: pair[1]):
+                # Уже учтено при догоне после восстановления
+                if event_id <= self._watermark:
+                    continue
+                self._watermark = event_id
+                candidates.extend(self._observe(
+                    row["ts"], row["event_type_id"], row["message"], row.get("raw_data"), event_id
+                ))
+
+            found = self._incidents.save_candidates(db, candidates) if candidates else 0
+            self._found_since_snapshot += found
+            if time.monotonic() - self._last_snapshot >= self._snapshot_seconds:
+                self._snapshot(db)
+            return found
+
+    def analyze(self, event: NormalizedEvent, event_id: Optional[int] = None) -> AnalysisResult:
+        """
+        Пропускает одно событие через окна правил (без записи в БД).
+
+        Args:
+            event: Нормализованное событие
+            event_id: ID сохранённого события
+
+        Returns:
+            Результат анализа: сработавшее правило или отсутствие инцидента
+        """
+        ts = dt.datetime.fromisoformat(event.ts.replace("Z", "+00:00"))
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(dt.timezone.utc).replace(tzinfo=None)
+        event_type_id = references.id(EventType, event.event_type) or 0
+        with self._lock:
+            candidates = self._observe(ts, event_type_id, event.message, event.raw_data, event_id or 0)
+        if not candidates:
+            return AnalysisResult(
+                is_incident=False,
+                incident_type=None,
+                severity=event.severity,
+                recommendation=None,
+            )
         return AnalysisResult(
-            is_incident=False,
-            incident_type=None,
-            severity=event.severity,
+            is_incident=True,
+            incident_type=candidates[0].incident_type,
+            severity=candidates[0].severity,
             recommendation=None,
         )
+
+    def _observe(
+        self,
+        ts: dt.datetime,
+        event_type_id: int,
+        message: Optional[str],
+        raw_data: Optional[Mapping[str, Any]],
+        event_id: int,
+    ) -> List[IncidentCandidate]:
+        """Добавляет событие в окна ключей подписанных правил и проверяет пороги (под блокировкой)."""
+        if not self._routes:
+            self._routes = self._route_table()
+        rules = self._routes.get(event_type_id)
+        if not rules:
+            return []
+
+        until = dt.datetime.utcnow()
+        since = until - dt.timedelta(minutes=self._window_minutes)
+        if ts < since:
+            return []
+
+        text = (message or "").lower()
+        fired: List[IncidentCandidate] = []
+        for rule in rules:
+            if not rule.accepts(text):
+                continue
+            key = rule.key_of(text, raw_data)
+            window = self._windows[rule.name].add(key, ts, event_id)
+            window.evict(since)
+            count, last_event_id = window.total()
+            found = rule.candidates(count, last_event_id, since=since, until=until, key=key)
+
+            # Только достижение порога или смена серьёзности
+            severity = found[0].severity if found else None
+            if severity != window.fired:
+                window.fired = severity
+                fired.extend(found)
+        return fired
+
+    def claim(self, candidates: Iterable[IncidentCandidate]) -> List[IncidentCandidate]:
+        """
+        Отбирает кандидатов пакетного запуска, которых потоковый анализ не выдавал.
+
+        Пороговый кандидат отбрасывается, если окно его ключа уже сработало
+        с той же серьёзностью; оставшиеся отмечаются в окнах, чтобы поток
+        их не повторил. Пока поток не запущен, кандидаты не меняются.
+
+        Args:
+            candidates: Кандидаты планового запуска или /analyze/run
+
+        Returns:
+            Кандидаты для сохранения
+        """
+        with self._lock:
+            if not self._started:
+                return list(candidates)
+            kept: List[IncidentCandidate] = []
+            for candidate in candidates:
+                keyed = self._windows.get(candidate.incident_type)
+                if keyed is not None:
+                    window = keyed.window(candidate.details.get("key", UNKNOWN_KEY))
+                    if window.fired == candidate.severity:
+                        continue
+                    window.fired = candidate.severity
+                kept.append(candidate)
+            return kept
+
+    # ------------------------------------------------------------------
+    # Состояние
+    # ------------------------------------------------------------------
+
+    def _route_table(self) -> Dict[int, List[ThresholdRule]]:
+        """Таблица маршрутизации: ID типа события -> правила (справочники уже загружены)."""
+        routes: Dict[int, List[ThresholdRule]] = {}
+        for rule in self._rules:
+            for event_type in rule.event_types:
+                routes.setdefault(references.id(EventType, event_type) or 1, []).append(rule)
+        return routes
+
+    def _start(self, db: Session) -> None:
+        """Восстанавливает окна из последнего снимка и догоняет новые события."""
+        references.ensure_loaded(db)
+        self._routes = self._route_table()
+
+        last_run = self._runs.get_last(db, modes=WINDOW_STATE_MODES)
+        restored = restore_windows(
+            last_run.details if last_run is not None else None,
+            window_minutes=self._window_minutes,
+            rule_names=self._rule_names,
+            max_keys=self._max_keys,
+        )
+        after_id, windows = restored if restored is not None else (0, {})
+
+        until = dt.datetime.utcnow()
+        since = until - dt.timedelta(minutes=self._window_minutes)
+        engine = RuleEngine(self._rules, watermark_overlap=self._watermark_overlap)
+        candidates, self._watermark = engine.run_incremental(
+            db, since=since, until=until, after_id=after_id, windows=windows
+        )
+        self._windows = windows
+        for candidate in candidates:
+            key = candidate.details.get("key", UNKNOWN_KEY)
+            self._windows[candidate.incident_type].window(key).fired = candidate.severity
+        self._found_since_snapshot = self._incidents.save_candidates(db, candidates) if candidates else 0
+        self._started = True
+
+    def _snapshot(self, db: Session) -> None:
+        """Сохраняет состояние окон в SystemRun (под блокировкой)."""
+        now = dt.datetime.utcnow()
+        # Заодно удаляем ключи, окна которых опустели
+        since = now - dt.timedelta(minutes=self._window_minutes)
+        for keyed in self._windows.values():
+            keyed.evict(since)
+            keyed.forget(self._watermark - self._watermark_overlap)
+        self._runs.save_state(db, SystemRun(
+            started_at=now,
+            finished_at=now,
+            status="completed",
+            rules_executed=len(self._rule_names),
+            incidents_found=self._found_since_snapshot,
+            details=window_state(
+                mode="streaming",
+                window_minutes=self._window_minutes,
+                rule_names=self._rule_names,
+                watermark=self._watermark,
+                until=now,
+                windows=self._windows,
+            ),
+        ), replace=True)
+        self._last_snapshot = time.monotonic()
+        self._found_since_snapshot = 0
+
+    def snapshot(self, db: Session) -> None:
+        """
+        Сохраняет состояние окон (хук завершения приложения).
+
+        Args:
+            db: Сессия БД
+        """
+        with self._lock:
+            if self._started:
+                self._snapshot(db)
+
+
+streaming_engine = AnalysisEngine(
+    snapshot_seconds=settings.analysis_snapshot_seconds,
+    max_keys=settings.analysis_max_keys,
+    watermark_overlap=settings.analysis_watermark_overlap,
+)
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 from siem_backend.services.normalization import NormalizedEvent
 
 
 class LogCollector(ABC):
     @abstractmethod
-    def collect(self) -> list[NormalizedEvent]:
+    def iter_events(self) -> Iterator[NormalizedEvent]:
+        """Отдаёт события по мере чтения источника, не накапливая их."""
         raise NotImplementedError
+
+    def collect(self) -> list[NormalizedEvent]:
+        return list(self.iter_events())
@@ -1,10 +1,11 @@
 import datetime as dt
 import json
 import subprocess
+import tempfile
 from dataclasses import asdict
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 
-from siem_backend.services.normalization import NormalizedEvent
+from siem_backend.services.normalization import EventClassifier, NormalizedEvent
 from siem_backend.services.collectors.base import LogCollector
 
 
@@ -19,7 +20,7 @@ class MacOSLogCollector(LogCollector):
         self._max_entries = max_entries
         self._predicate = predicate
 
-    def collect(self) -> list[NormalizedEvent]:
+    def iter_events(self) -> Iterator[NormalizedEvent]:
         cmd = [
             "log",
             "show",
@@ -33,30 +34,42 @@ class MacOSLogCollector(LogCollector):
         if self._predicate:
             cmd.extend(["--predicate", self._predicate])
 
-        proc = subprocess.run(cmd, capture_output=True, text=True)
-        if proc.returncode != 0:
-            raise RuntimeError(proc.stderr.strip() or "macOS log command failed")
-
-        events: list[NormalizedEvent] = []
-        for line in proc.stdout.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-
+        # Вывод читается построчно: записи не накапливаются в памяти целиком.
+        # stderr уходит во временный файл, чтобы заполненный канал не блокировал процесс.
+        with tempfile.TemporaryFile(mode="w+") as stderr:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, text=True)
+            exhausted = False
             try:
-                record = json.loads(line)
-            except json.JSONDecodeError:
-                continue
-
-            normalized = self._normalize_record(record)
-            if normalized is None:
-                continue
-
-            events.append(normalized)
-            if len(events) >= self._max_entries:
-                break
-
-        return events
+                emitted = 0
+                for line in proc.stdout:
+                    line = line.strip()
+                    if not line:
+                        continue
+
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+
+                    normalized = self._normalize_record(record)
+                    if normalized is None:
+                        continue
+
+                    yield normalized
+                    emitted += 1
+                    if emitted >= self._max_entries:
+                        break
+                else:
+                    exhausted = True
+            finally:
+                if not exhausted and proc.poll() is None:
+                    proc.kill()
+                proc.stdout.close()
+                proc.wait()
+
+            if exhausted and proc.returncode != 0:
+                stderr.seek(0)
+                raise RuntimeError(stderr.read().strip() or "macOS log command failed")
 
     def _normalize_record(self, record: dict[str, Any]) -> Optional[NormalizedEvent]:
         ts = record.get("timestamp")
@@ -88,6 +101,7 @@ class MacOSLogCollector(LogCollector):
         return NormalizedEvent(
             ts=ts_iso,
             source_os="macos",
+            source_category=EventClassifier.classify_source_category(msg, raw_data, "macos"),
             event_type="macos_unified_log",
             severity=severity,
             message=msg,
@@ -2,10 +2,10 @@ from __future__ import annotations
 
 import datetime as dt
 import socket
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 from siem_backend.services.collectors.base import LogCollector
-from siem_backend.services.normalization import NormalizedEvent
+from siem_backend.services.normalization import EventClassifier, NormalizedEvent
 
 
 class MockLogCollector(LogCollector):
@@ -16,7 +16,7 @@ class MockLogCollector(LogCollector):
         self._event_count = event_count
         self._host = host or socket.gethostname()
 
-    def collect(self) -> List[NormalizedEvent]:
+    def iter_events(self) -> Iterator[NormalizedEvent]:
         count = self._event_count
         now = dt.datetime.utcnow()
 
@@ -56,7 +56,6 @@ class MockLogCollector(LogCollector):
             ]
         )
 
-        events: List[NormalizedEvent] = []
         for i in range(count):
             category, severity, message = templates[i % len(templates)]
             ts = (now - dt.timedelta(seconds=(count - i))).replace(microsecond=0).isoformat() + "Z"
@@ -68,15 +67,12 @@ class MockLogCollector(LogCollector):
                 "category": category,
             }
 
-            events.append(
-                NormalizedEvent(
-                    ts=ts,
-                    source_os="mock",
-                    event_type=category,
-                    severity=severity,
-                    message=message,
-                    raw_data=raw_data,
-                )
+            yield NormalizedEvent(
+                ts=ts,
+                source_os="mock",
+                source_category=EventClassifier.classify_source_category(message, raw_data, "mock"),
+                event_type=category,
+                severity=severity,
+                message=message,
+                raw_data=raw_data,
             )
-
-        return events
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import codecs
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+READ_CHUNK_SIZE = 1024 * 1024
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class FileCheckpoint:
+    """Позиция чтения файла логов между вызовами сборщика."""
+
+    inode: int
+    offset: int
+    partial: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"inode": self.inode, "offset": self.offset, "partial": self.partial}
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional["FileCheckpoint"]:
+        if not data:
+            return None
+        try:
+            return cls(
+                inode=int(data["inode"]),
+                offset=int(data["offset"]),
+                partial=str(data.get("partial") or ""),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+
+def _find_rotated_file(path: Path, inode: int) -> Optional[Path]:
+    """
+    Ищет переименованный при ротации файл (system.log.1, system.log-20240101 и т.п.).
+
+    Args:
+        path: Текущий путь к файлу логов
+        inode: inode файла из контрольной точки
+
+    Returns:
+        Путь к ротированному файлу или None
+    """
+    try:
+        candidates = list(path.parent.iterdir())
+    except OSError:
+        return None
+
+    for candidate in candidates:
+        if candidate == path or not candidate.name.startswith(path.name):
+            continue
+        try:
+            if candidate.is_file() and candidate.stat().st_ino == inode:
+                return candidate
+        except OSError:
+            continue
+    return None
+
+
+def _iter_from(path: Path, offset: int, partial: str, final: bool, state: Dict[str, Any]) -> Iterator[List[str]]:
+    """
+    Читает байты файла начиная с offset и отдаёт целые строки пакетами по чанку.
+
+    После исчерпания в state записываются новое смещение ("offset")
+    и незавершённая строка ("partial").
+
+    Args:
+        path: Путь к файлу
+        offset: Смещение в байтах, с которого начинается чтение
+        partial: Незавершённая строка, оставшаяся с прошлого чтения
+        final: Файл больше не будет дописываться (хвост считается целой строкой)
+        state: Словарь для итогового смещения и незавершённой строки
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = partial
+
+    with path.open("rb") as f:
+        f.seek(offset)
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            offset += len(chunk)
+            buffer += decoder.decode(chunk)
+            parts = buffer.split("\n")
+            buffer = parts.pop()
+            if parts:
+                yield parts
+
+    # Неполный многобайтовый символ в конце файла не считаем прочитанным
+    pending, _ = decoder.getstate()
+    offset -= len(pending)
+
+    if final and buffer:
+        yield [buffer]
+        buffer = ""
+
+    state["offset"] = offset
+    state["partial"] = buffer
+
+
+class AppendedLines:
+    """
+    Строки, дописанные в файл после контрольной точки, пакетами по чанку.
+
+    Обрабатывает:
+    - усечение файла (размер меньше смещения) — чтение с начала;
+    - ротацию с переименованием (сменился inode) — дочитывается старый файл,
+      если он найден рядом, затем новый файл читается с начала.
+
+    Контрольная точка (checkpoint) сдвигается только после полного обхода.
+    """
+
+    def __init__(self, file_path: str, checkpoint: Optional[FileCheckpoint]) -> None:
+        self._path = Path(file_path)
+        self.checkpoint = checkpoint
+
+    def __iter__(self) -> Iterator[List[str]]:
+        path = self._path
+        checkpoint = self.checkpoint
+        try:
+            stat = path.stat()
+        except OSError:
+            return
+
+        offset = 0
+        partial = ""
+
+        if checkpoint is not None:
+            if checkpoint.inode == stat.st_ino:
+                if stat.st_size >= checkpoint.offset:
+                    offset = checkpoint.offset
+                    partial = checkpoint.partial
+            else:
+                rotated = _find_rotated_file(path, checkpoint.inode)
+                if rotated is not None:
+                    try:
+                        yield from _iter_from(rotated, checkpoint.offset, checkpoint.partial, True, {})
+                    except OSError:
+                        pass
+
+        state: Dict[str, Any] = {}
+        try:
+            yield from _iter_from(path, offset, partial, False, state)
+        except OSError:
+            return
+
+        self.checkpoint = FileCheckpoint(inode=stat.st_ino, offset=state["offset"], partial=state["partial"])
+
+
+def read_appended_lines(
+    file_path: str, checkpoint: Optional[FileCheckpoint]
+) -> Tuple[List[str], Optional[FileCheckpoint]]:
+    """
+    Читает строки, дописанные в файл после контрольной точки (см. AppendedLines).
+
+    Args:
+        file_path: Путь к файлу логов
+        checkpoint: Контрольная точка прошлого чтения
+
+    Returns:
+        Кортеж (новые строки, обновлённая контрольная точка)
+    """
+    reader = AppendedLines(file_path, checkpoint)
+    lines: List[str] = []
+    for batch in reader:
+        lines.extend(batch)
+    return lines, reader.checkpoint
+
+
+def read_last_lines(file_path: str, max_lines: int, block_size: int = TAIL_BLOCK_SIZE) -> List[str]:
+    """
+    Читает последние max_lines строк, двигаясь от конца файла блоками.
+
+    Файл не загружается целиком: память ограничена размером хвоста
+    из max_lines строк плюс один блок.
+
+    Args:
+        file_path: Путь к файлу
+        max_lines: Количество строк
+        block_size: Размер блока чтения в байтах
+
+    Returns:
+        Строки без символа перевода строки (как readlines()[-max_lines:])
+    """
+    if max_lines <= 0:
+        return []
+
+    with open(file_path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        if position == 0:
+            return []
+
+        f.seek(position - 1)
+        ends_with_newline = f.read(1) == b"\n"
+        # Завершающий перевод строки не отделяет новую строку
+        needed = max_lines + (1 if ends_with_newline else 0)
+
+        blocks: List[bytes] = []
+        newlines = 0
+        while position > 0 and newlines < needed:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            block = f.read(size)
+            blocks.append(block)
+            newlines += block.count(b"\n")
+
+    data = b"".join(reversed(blocks))
+    lines = data.split(b"\n")
+    if ends_with_newline:
+        lines.pop()
+    if position > 0:
+        # Первый фрагмент — обрезанная строка, её начало осталось левее
+        lines = lines[1:]
+
+    return [ln.decode("utf-8", errors="replace") for ln in lines[-max_lines:]]
+
+
+def checkpoint_at_end(file_path: str) -> Optional[FileCheckpoint]:
+    """Контрольная точка на текущем конце файла."""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return FileCheckpoint(inode=stat.st_ino, offset=stat.st_size)
@@ -1,7 +1,7 @@
-from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from siem_backend.data.models import Event, Incident, EventType, IncidentType, SeverityLevel, SourceCategoryRef
+from siem_backend.data.reference import references
 
 
 def format_event_description(event: Event, db: Session = None) -> str:
@@ -10,32 +10,17 @@ def format_event_description(event: Event, db: Session = None) -> str:
     
     Args:
         event: Событие
-        db: Сессия БД (опционально, для получения названий справочников)
+        db: Сессия БД (опционально, для загрузки реестра справочников)
         
     Returns:
         Описание события
     """
-    # Получаем названия из связанных объектов или через БД
-    event_type_name = ""
-    if event.event_type_rel:
-        event_type_name = event.event_type_rel.name
-    elif db:
-        stmt = select(EventType.name).where(EventType.id == event.event_type_id)
-        event_type_name = db.execute(stmt).scalar_one_or_none() or ""
-    
-    category_name = ""
-    if event.source_category_rel:
-        category_name = event.source_category_rel.name
-    elif db:
-        stmt = select(SourceCategoryRef.name).where(SourceCategoryRef.id == event.source_category_id)
-        category_name = db.execute(stmt).scalar_one_or_none() or ""
-    
-    severity_name = ""
-    if event.severity_rel:
-        severity_name = event.severity_rel.name
-    elif db:
-        stmt = select(SeverityLevel.name).where(SeverityLevel.id == event.severity_id)
-        severity_name = db.execute(stmt).scalar_one_or_none() or ""
+    # Названия справочников — из реестра
+    if db is not None:
+        references.ensure_loaded(db)
+    event_type_name = references.name(EventType, event.event_type_id, default="")
+    category_name = references.name(SourceCategoryRef, event.source_category_id, default="")
+    severity_name = references.name(SeverityLevel, event.severity_id, default="")
     
     event_type = event_type_name.lower()
     category = category_name.lower()
@@ -99,25 +84,16 @@ def format_incident_friendly_description(incident: Incident, db: Session = None)
     
     Args:
         incident: Инцидент
-        db: Сессия БД (опционально, для получения названий справочников)
+        db: Сессия БД (опционально, для загрузки реестра справочников)
         
     Returns:
         Описание инцидента
     """
-    # Получаем названия из связанных объектов или через БД
-    incident_type_name = ""
-    if incident.incident_type_rel:
-        incident_type_name = incident.incident_type_rel.name
-    elif db:
-        stmt = select(IncidentType.name).where(IncidentType.id == incident.incident_type_id)
-        incident_type_name = db.execute(stmt).scalar_one_or_none() or ""
-    
-    severity_name = ""
-    if incident.severity_rel:
-        severity_name = incident.severity_rel.name
-    elif db:
-        stmt = select(SeverityLevel.name).where(SeverityLevel.id == incident.severity_id)
-        severity_name = db.execute(stmt).scalar_one_or_none() or ""
+    # Названия справочников — из реестра
+    if db is not None:
+        references.ensure_loaded(db)
+    incident_type_name = references.name(IncidentType, incident.incident_type_id, default="")
+    severity_name = references.name(SeverityLevel, incident.severity_id, default="")
     
     itype = incident_type_name.lower()
     severity = severity_name.lower()
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 import datetime as dt
-from typing import Dict, List, Optional, Tuple
+import logging
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from siem_backend.data.event_repository import EventRepository
+from siem_backend.data.event_repository import EventRepository, event_dedup_hash
 from siem_backend.data.models import (
     Event, 
     EventType, 
@@ -14,8 +16,18 @@ from siem_backend.data.models import (
     SourceCategoryRef, 
     SourceOS
 )
+from siem_backend.data.reference import references
+from siem_backend.services.event_template_service import EventTemplateService
 from siem_backend.services.normalization import NormalizedEvent
 from siem_backend.services.notifications import NotificationService
+from siem_backend.services.stream_bus import StreamBus, stream_bus
+
+if TYPE_CHECKING:
+    from siem_backend.services.analysis_engine import AnalysisEngine
+
+logger = logging.getLogger(__name__)
+
+SAVE_CHUNK_SIZE = 500
 
 
 class EventService:
@@ -25,172 +37,150 @@ class EventService:
         self,
         repo: Optional[EventRepository] = None,
         notification_service: Optional[NotificationService] = None,
+        template_service: Optional[EventTemplateService] = None,
+        analysis_engine: Optional["AnalysisEngine"] = None,
+        bus: Optional[StreamBus] = None,
     ) -> None:
         self._repo = repo or EventRepository()
         self._notification_service = notification_service or NotificationService()
-        
-        # Кэш справочников для производительности
-        self._source_os_cache: Dict[str, int] = {}
-        self._source_category_cache: Dict[str, int] = {}
-        self._event_type_cache: Dict[str, int] = {}
-        self._severity_cache: Dict[str, int] = {}
+        self._template_service = template_service or EventTemplateService()
+        # Потоковый анализ сохранённых событий (очередь записи)
+        self._analysis_engine = analysis_engine
+        self._bus = bus or stream_bus
 
-    def _load_reference_cache(self, db: Session) -> None:
-        """Загружает кэш справочников."""
-        if not self._source_os_cache:
-            for item in db.execute(select(SourceOS)).scalars().all():
-                self._source_os_cache[item.name] = item.id
-        
-        if not self._source_category_cache:
-            for item in db.execute(select(SourceCategoryRef)).scalars().all():
-                self._source_category_cache[item.name] = item.id
-        
-        if not self._event_type_cache:
-            for item in db.execute(select(EventType)).scalars().all():
-                self._event_type_cache[item.name] = item.id
+    def save_normalized_events(self, db: Session, events: Iterable[NormalizedEvent]) -> int:
+        """
+        Сохраняет нормализованные события в БД.
         
-        if not self._severity_cache:
-            for item in db.execute(select(SeverityLevel)).scalars().all():
-                self._severity_cache[item.name] = item.id
+        Args:
+            db: Сессия БД
+            events: Нормализованные события
+            
+        Returns:
+            Количество сохранённых событий
+        """
+        return self.save_normalized_event_stream(db, events)
 
-    def _get_or_create_ref_id(
-        self, 
-        db: Session, 
-        model, 
-        cache: Dict[str, int], 
-        name: str,
-        default_name: Optional[str] = None
+    def save_normalized_event_stream(
+        self,
+        db: Session,
+        events: Iterable[NormalizedEvent],
+        chunk_size: int = SAVE_CHUNK_SIZE,
     ) -> int:
         """
-        Получает ID справочника по имени из кэша или БД.
-        
+        Сохраняет поток событий пакетами фиксированного размера.
+
+        Каждый пакет нормализуется, проверяется на дубликаты, сохраняется
+        и фиксируется отдельно — пиковая память не зависит от длины потока.
+
         Args:
             db: Сессия БД
-            model: Модель справочника
-            cache: Кэш справочника
-            name: Имя для поиска
-            default_name: Имя по умолчанию, если не найдено
-            
+            events: Итерируемый источник событий (например, collector.iter_events())
+            chunk_size: Размер пакета
+
         Returns:
-            ID записи в справочнике
+            Количество сохранённых событий
         """
-        # Проверяем кэш
-        if name in cache:
-            return cache[name]
-        
-        # Ищем в БД
-        stmt = select(model).where(model.name == name)
-        item = db.execute(stmt).scalar_one_or_none()
-        
-        if item:
-            cache[name] = item.id
-            return item.id
-        
-        # Если не найдено и есть default_name — используем его
-        if default_name and default_name in cache:
-            return cache[default_name]
-        
-        # Возвращаем первый доступный ID из справочника
-        stmt = select(model).limit(1)
-        item = db.execute(stmt).scalar_one_or_none()
-        if item:
-            return item.id
-            
-        # Если справочник пуст — возвращаем 1 (будет использован при вставке)
-        return 1
+        references.ensure_loaded(db)
+
+        saved_count = 0
+        iterator = iter(events)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                break
+            saved_count += self._save_chunk(db, chunk)
+        return saved_count
 
-    def save_normalized_events(self, db: Session, events: List[NormalizedEvent]) -> int:
+    def _save_chunk(self, db: Session, events: List[NormalizedEvent]) -> int:
         """
-        Сохраняет нормализованные события в БД.
-        
+        Сохраняет один пакет событий.
+
         Args:
             db: Сессия БД
-            events: Список нормализованных событий
-            
+            events: Пакет нормализованных событий
+
         Returns:
             Количество сохранённых событий
         """
-        # Загружаем кэш справочников
-        self._load_reference_cache(db)
-        
-        to_save = [self._to_model(db, e) for e in events]
-        if not to_save:
-            return 0
-            
-        since = min(e.ts for e in to_save)
-        until = max(e.ts for e in to_save)
-        existing = self._repo.get_existing_signatures(db, since, until)
-        
-        unique: List[Event] = []
-        for e in to_save:
-            key_ts = e.ts.replace(microsecond=0) if hasattr(e.ts, "replace") else e.ts
-            key = (key_ts, e.message or "", e.source_os_rel.name if e.source_os_rel else "")
-            if key not in existing:
-                unique.append(e)
-                existing.add(key)
+        to_save = [self._to_row(e) for e in events]
+
+        # Дубликаты внутри пакета и уже сохранённые события (по уникальному индексу)
+        batch: Dict[str, Dict[str, Any]] = {}
+        for row in to_save:
+            batch.setdefault(row["dedup_hash"], row)
+        existing = self._repo.existing_hashes(db, batch)
+        unique = [row for dedup_hash, row in batch.items() if dedup_hash not in existing]
                 
         if not unique:
             return 0
-            
-        saved_count = self._repo.add_many(db, unique)
+
+        template_ids = self._template_service.assign(db, [row["message"] or "" for row in unique])
+        for row, template_id in zip(unique, template_ids):
+            row["template_id"] = template_id
+
+        try:
+            inserted = self._repo.insert_many(db, unique)
+        except Exception:
+            # ID новых шаблонов откатились вместе с транзакцией
+            EventTemplateService.invalidate()
+            raise
+        self._bus.publish("event", list(inserted.values()))
         
-        # Уведомления о критических событиях
-        for event_model in unique:
-            severity_name = db.execute(
-                select(SeverityLevel.name).where(SeverityLevel.id == event_model.severity_id)
-            ).scalar_one_or_none()
-            
-            if severity_name == "critical":
-                try:
-                    self._notification_service.notify_critical_event(db, event_model)
-                except Exception:
-                    pass
+        # Уведомления о критических событиях — одной пачкой
+        critical_id = references.id(SeverityLevel, "critical")
+        critical_ids = [
+            inserted[row["dedup_hash"]]
+            for row in unique
+            if row["severity_id"] == critical_id and row["dedup_hash"] in inserted
+        ]
+        if critical_ids:
+            stmt = select(Event).where(Event.id.in_(critical_ids)).order_by(Event.id)
+            try:
+                self._notification_service.notify_critical_events(db, db.execute(stmt).scalars().all())
+            except Exception:
+                db.rollback()
+
+        if self._analysis_engine is not None:
+            try:
+                self._analysis_engine.observe(
+                    db, [(row, inserted[row["dedup_hash"]]) for row in unique if row["dedup_hash"] in inserted]
+                )
+            except Exception:
+                db.rollback()
+                logger.exception("Streaming analysis failed")
                     
-        return saved_count
+        return len(inserted)
 
-    def _to_model(self, db: Session, event: NormalizedEvent) -> Event:
+    def _to_row(self, event: NormalizedEvent) -> Dict[str, Any]:
         """
-        Преобразует нормализованное событие в модель БД.
+        Преобразует нормализованное событие в строку для пакетной вставки.
         
         Args:
-            db: Сессия БД
             event: Нормализованное событие
             
         Returns:
-            Модель события для сохранения в БД
+            Словарь значений столбцов таблицы events
         """
         ts = self._parse_ts(event.ts)
         
         # Получаем ID справочников
-        source_os_id = self._get_or_create_ref_id(
-            db, SourceOS, self._source_os_cache, 
-            event.source_os, default_name="mock"
-        )
-        
-        source_category_id = self._get_or_create_ref_id(
-            db, SourceCategoryRef, self._source_category_cache,
-            event.source_category, default_name="os"
-        )
-        
-        event_type_id = self._get_or_create_ref_id(
-            db, EventType, self._event_type_cache,
-            event.event_type, default_name="system"
-        )
-        
-        severity_id = self._get_or_create_ref_id(
-            db, SeverityLevel, self._severity_cache,
-            event.severity, default_name="low"
-        )
+        source_os_id = references.resolve(SourceOS, event.source_os, default="mock")
+        source_category_id = references.resolve(SourceCategoryRef, event.source_category, default="os")
+        event_type_id = references.resolve(EventType, event.event_type, default="system")
+        severity_id = references.resolve(SeverityLevel, event.severity, default="low")
         
-        return Event(
-            ts=ts,
-            source_os_id=source_os_id,
-            source_category_id=source_category_id,
-            event_type_id=event_type_id,
-            severity_id=severity_id,
-            message=event.message,
-            raw_data=event.raw_data,
-        )
+        return {
+            "ts": ts,
+            "source_os_id": source_os_id,
+            "source_category_id": source_category_id,
+            "event_type_id": event_type_id,
+            "severity_id": severity_id,
+            "message": event.message,
+            "template_id": None,
+            "raw_data": event.raw_data or {},
+            "dedup_hash": event_dedup_hash(ts, event.message, source_os_id),
+        }
 
     def _parse_ts(self, ts: str) -> dt.datetime:
         """
@@ -231,8 +221,7 @@ class EventService:
         Returns:
             Список событий
         """
-        self._load_reference_cache(db)
-        severity_id = self._severity_cache.get(severity_name.lower())
+        severity_id = references.ensure_loaded(db).id(SeverityLevel, severity_name.lower())
         
         if not severity_id:
             return []
@@ -258,11 +247,7 @@ class EventService:
         Returns:
             Название уровня серьёзности
         """
-        if event.severity_rel:
-            return event.severity_rel.name
-            
-        stmt = select(SeverityLevel.name).where(SeverityLevel.id == event.severity_id)
-        return db.execute(stmt).scalar_one_or_none() or "unknown"
+        return references.ensure_loaded(db).name(SeverityLevel, event.severity_id)
 
     def get_event_type_name(self, db: Session, event: Event) -> str:
         """
@@ -275,11 +260,7 @@ class EventService:
         Returns:
             Название типа события
         """
-        if event.event_type_rel:
-            return event.event_type_rel.name
-            
-        stmt = select(EventType.name).where(EventType.id == event.event_type_id)
-        return db.execute(stmt).scalar_one_or_none() or "unknown"
+        return references.ensure_loaded(db).name(EventType, event.event_type_id)
 
     def get_source_os_name(self, db: Session, event: Event) -> str:
         """
@@ -292,8 +273,4 @@ class EventService:
         Returns:
             Название ОС
         """
-        if event.source_os_rel:
-            return event.source_os_rel.name
-            
-        stmt = select(SourceOS.name).where(SourceOS.id == event.source_os_id)
-        return db.execute(stmt).scalar_one_or_none() or "unknown"
+        return references.ensure_loaded(db).name(SourceOS, event.source_os_id)
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from siem_backend.data.event_template_repository import EventTemplateRepository
+from siem_backend.services.template_miner import TemplateMiner
+
+
+class EventTemplateService:
+    """
+    Привязка сообщений к шаблонам с сохранением шаблонов в БД.
+
+    Дерево майнера общее для процесса и восстанавливается из таблицы
+    event_templates при первом обращении.
+    """
+
+    _miner: Optional[TemplateMiner] = None
+    _lock = threading.Lock()
+
+    def __init__(self, repo: Optional[EventTemplateRepository] = None) -> None:
+        self._repo = repo or EventTemplateRepository()
+
+    def assign(self, db: Session, messages: Sequence[str]) -> List[int]:
+        """
+        Определяет ID шаблона для каждого сообщения.
+
+        Новые шаблоны добавляются в БД, изменённые обновляются;
+        фиксация транзакции остаётся за вызывающим кодом.
+
+        Args:
+            db: Сессия БД
+            messages: Тексты сообщений
+
+        Returns:
+            ID шаблонов в порядке сообщений
+        """
+        cls = type(self)
+        with cls._lock:
+            try:
+                miner = self._get_miner(db)
+                ids: List[int] = []
+                changed: Dict[int, str] = {}
+                counts: Dict[int, int] = {}
+                for message in messages:
+                    cluster, is_changed = miner.add_message(message)
+                    if cluster.template_id is None:
+                        cluster.template_id = self._repo.add(db, cluster.template, len(cluster.tokens)).id
+                    elif is_changed:
+                        changed[cluster.template_id] = cluster.template
+                    counts[cluster.template_id] = counts.get(cluster.template_id, 0) + 1
+                    ids.append(cluster.template_id)
+                self._repo.apply_changes(db, changed, counts)
+            except Exception:
+                cls._miner = None
+                raise
+        return ids
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Сбрасывает дерево (например, после отката транзакции) — оно перечитается из БД."""
+        with cls._lock:
+            cls._miner = None
+
+    def _get_miner(self, db: Session) -> TemplateMiner:
+        cls = type(self)
+        if cls._miner is None:
+            miner = TemplateMiner()
+            for item in self._repo.list_all(db):
+                miner.load(item.id, item.template, item.size or 0)
+            cls._miner = miner
+        return cls._miner
@@ -1,21 +1,55 @@
 import datetime as dt
 import logging
+import threading
 from typing import Any, Dict, List, Optional, Tuple
 
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from siem_backend.core.config import settings
+from siem_backend.data.event_repository import EventRepository
 from siem_backend.data.incident_repository import IncidentRepository
-from siem_backend.data.models import Event, Incident, IncidentType, SeverityLevel
+from siem_backend.data.models import (
+    AnalysisRule,
+    Event,
+    EventType,
+    Incident,
+    IncidentType,
+    SeverityLevel,
+    SystemRun,
+)
+from siem_backend.data.reference import references
+from siem_backend.data.rule_trigger_repository import RuleTriggerRepository
+from siem_backend.data.system_run_repository import SystemRunRepository
 from siem_backend.services.analysis.base import BaseRule
 from siem_backend.services.analysis.engine import RuleEngine
 from siem_backend.services.analysis.rules.failed_logins import MultipleFailedLoginsRule
 from siem_backend.services.analysis.rules.network_errors import RepeatedNetworkErrorsRule
 from siem_backend.services.analysis.rules.service_crash import ServiceCrashOrRestartRule
+from siem_backend.services.analysis.types import IncidentCandidate, RuleStats
+from siem_backend.services.analysis.windows import WINDOW_STATE_MODES, restore_windows, window_state
 from siem_backend.services.notifications import NotificationService
+from siem_backend.services.stream_bus import StreamBus, saved_ids, stream_bus
 
 logger = logging.getLogger(__name__)
 
+# Инкрементальные запуски (планировщик, /analyze/run) идут по одному:
+# каждый продолжает водяной знак предыдущего
+_analysis_lock = threading.Lock()
+
+
+def _streaming_engine() -> Optional[Any]:
+    """Потоковый анализ писателя, если он включён (его окна уже выдают пороговые инциденты)."""
+    if not settings.analysis_streaming:
+        return None
+    from siem_backend.services.analysis_engine import streaming_engine
+    return streaming_engine
+
+
+def _rule_stats(stats: Dict[str, RuleStats]) -> Dict[str, Dict[str, Any]]:
+    """Счётчики правил для SystemRun.details."""
+    return {name: entry.to_dict() for name, entry in stats.items()}
+
 
 class IncidentService:
     """Сервис для работы с инцидентами."""
@@ -25,83 +59,141 @@ class IncidentService:
         repo: Optional[IncidentRepository] = None,
         engine: Optional[RuleEngine] = None,
         notification_service: Optional[NotificationService] = None,
+        runs: Optional[SystemRunRepository] = None,
+        triggers: Optional[RuleTriggerRepository] = None,
+        events: Optional[EventRepository] = None,
+        bus: Optional[StreamBus] = None,
+        streaming: Optional[Any] = None,
     ) -> None:
         self._repo = repo or IncidentRepository()
         self._engine = engine or RuleEngine(self._default_rules())
         self._notification_service = notification_service or NotificationService()
-        
-        # Кэш справочников
-        self._incident_type_cache: Dict[str, int] = {}
-        self._severity_cache: Dict[str, int] = {}
-
-    def _load_reference_cache(self, db: Session) -> None:
-        """Загружает кэш справочников."""
-        if not self._incident_type_cache:
-            for item in db.execute(select(IncidentType)).scalars().all():
-                self._incident_type_cache[item.name] = item.id
-        
-        if not self._severity_cache:
-            for item in db.execute(select(SeverityLevel)).scalars().all():
-                self._severity_cache[item.name] = item.id
+        self._runs = runs or SystemRunRepository()
+        self._triggers = triggers or RuleTriggerRepository()
+        self._events = events or EventRepository()
+        self._bus = bus or stream_bus
+        self._streaming = streaming
 
-    def _get_ref_id(
-        self, 
-        db: Session, 
-        model, 
-        cache: Dict[str, int], 
-        name: str,
-        default_name: Optional[str] = None
-    ) -> int:
+    def run_analysis(self, db: Session, since_minutes: int = 60, incremental: Optional[bool] = None) -> int:
         """
-        Получает ID справочника по имени из кэша или БД.
+        Запускает анализ событий на наличие инцидентов.
+
+        В инкрементальном режиме читаются только события новее водяного
+        знака из последнего SystemRun, а пороговые правила продолжают
+        скользящие окна, сохранённые там же.
+
+        Каждый запуск с новыми событиями записывается в SystemRun со
+        счётчиками правил в details["rule_stats"].
+
+        При включённом потоковом анализе пороговые кандидаты сверяются с его
+        окнами (AnalysisEngine.claim): порог, о котором поток уже создал
+        инцидент, повторно не сохраняется.
         
         Args:
             db: Сессия БД
-            model: Модель справочника
-            cache: Кэш справочника
-            name: Имя для поиска
-            default_name: Имя по умолчанию
+            since_minutes: Период анализа в минутах
+            incremental: Инкрементальный режим (по умолчанию из настроек)
             
         Returns:
-            ID записи в справочнике
+            Количество найденных инцидентов
         """
-        if name in cache:
-            return cache[name]
-        
-        stmt = select(model).where(model.name == name)
-        item = db.execute(stmt).scalar_one_or_none()
-        
-        if item:
-            cache[name] = item.id
-            return item.id
-        
-        if default_name and default_name in cache:
-            return cache[default_name]
-        
-        stmt = select(model).limit(1)
-        item = db.execute(stmt).scalar_one_or_none()
-        if item:
-            return item.id
-            
-        return 1
-
-    def run_analysis(self, db: Session, since_minutes: int = 60) -> int:
+        references.ensure_loaded(db)
+        if incremental is None:
+            incremental = settings.analysis_incremental
+        if incremental:
+            with _analysis_lock:
+                return self._run_incremental(db, since_minutes)
+
+        started_at = dt.datetime.utcnow()
+        until = started_at
+        since = until - dt.timedelta(minutes=since_minutes)
+        stats: Dict[str, RuleStats] = {}
+        candidates = self._claim(self._engine.run(db, since=since, until=until, stats=stats))
+        found = self.save_candidates(db, candidates)
+        self._runs.add(db, SystemRun(
+            started_at=started_at,
+            finished_at=dt.datetime.utcnow(),
+            status="completed",
+            rules_executed=len(stats),
+            incidents_found=found,
+            details={"mode": "full", "window_minutes": since_minutes, "rule_stats": _rule_stats(stats)},
+        ))
+        return found
+
+    def _run_incremental(self, db: Session, since_minutes: int) -> int:
         """
-        Запускает анализ событий на наличие инцидентов.
-        
+        Инкрементальный анализ с водяным знаком в SystemRun.
+
         Args:
             db: Сессия БД
-            since_minutes: Период анализа в минутах
-            
+            since_minutes: Длина окна в минутах
+
         Returns:
             Количество найденных инцидентов
         """
-        self._load_reference_cache(db)
-        
-        until = dt.datetime.utcnow()
+        started_at = dt.datetime.utcnow()
+        until = started_at
         since = until - dt.timedelta(minutes=since_minutes)
+        rule_names = sorted(rule.name for rule in self._engine.rules)
+
+        # Состояние прошлого запуска годится, если окно и набор правил те же
+        last_run = self._runs.get_last(db, modes=WINDOW_STATE_MODES)
+        restored = restore_windows(
+            last_run.details if last_run is not None else None,
+            window_minutes=since_minutes,
+            rule_names=rule_names,
+            max_keys=settings.analysis_max_keys,
+        )
+        resumed = restored is not None
+        after_id, windows = restored if restored is not None else (0, {})
+
+        stats: Dict[str, RuleStats] = {}
+        candidates, watermark = self._engine.run_incremental(
+            db, since=since, until=until, after_id=after_id, windows=windows, stats=stats
+        )
+        if resumed and watermark == after_id:
+            # Новых событий нет: кандидаты те же, что в прошлый раз
+            return 0
+
+        found = self.save_candidates(db, self._claim(candidates))
+        # Окна хранит только последний запуск; у предыдущего они удаляются
+        self._runs.save_state(db, SystemRun(
+            started_at=started_at,
+            finished_at=dt.datetime.utcnow(),
+            status="completed",
+            rules_executed=len(rule_names),
+            incidents_found=found,
+            details={
+                **window_state(
+                    mode="incremental",
+                    window_minutes=since_minutes,
+                    rule_names=rule_names,
+                    watermark=watermark,
+                    until=until,
+                    windows=windows,
+                ),
+                "rule_stats": _rule_stats(stats),
+            },
+        ))
+        return found
+
+    def _claim(self, candidates: List[IncidentCandidate]) -> List[IncidentCandidate]:
+        """Убирает пороговых кандидатов, уже выданных потоковым анализом."""
+        streaming = self._streaming or _streaming_engine()
+        return streaming.claim(candidates) if streaming is not None else candidates
+
+    def save_candidates(self, db: Session, candidates: List[IncidentCandidate]) -> int:
+        """
+        Сохраняет новых кандидатов как инциденты, записывает срабатывания
+        правил (RuleTrigger) и рассылает уведомления.
+
+        Args:
+            db: Сессия БД
+            candidates: Кандидаты в инциденты
 
-        candidates = self._engine.run(db, since=since, until=until)
+        Returns:
+            Количество сохранённых инцидентов
+        """
         event_ids = [c.event_id for c in candidates if c.event_id is not None]
         existing_pairs = self._repo.get_existing_event_type_pairs(db, event_ids)
         new_candidates = [
@@ -118,10 +210,12 @@ class IncidentService:
             events = db.execute(stmt).scalars().all()
             event_by_id = {e.id: e for e in events if e.id is not None}
 
-        incidents = [self._to_model(db, c, event_by_id.get(c.event_id or -1)) for c in new_candidates]
+        incidents = [self._to_model(c, event_by_id.get(c.event_id or -1)) for c in new_candidates]
         if not incidents:
             return 0
         saved_count = self._repo.add_many(db, incidents)
+        self._save_triggers(db, new_candidates, incidents)
+        self._bus.publish("incident", saved_ids(incidents))
 
         for incident in incidents:
             try:
@@ -131,6 +225,31 @@ class IncidentService:
 
         return saved_count
 
+    def _save_triggers(
+        self, db: Session, candidates: List[IncidentCandidate], incidents: List[Incident]
+    ) -> None:
+        """Записывает срабатывания правил для сохранённых инцидентов одним INSERT."""
+        triggered_at = dt.datetime.utcnow()
+        rows = []
+        for candidate, incident in zip(candidates, incidents):
+            rule_id = references.id(AnalysisRule, candidate.incident_type)
+            if rule_id is None:
+                continue
+            rows.append({
+                "rule_id": rule_id,
+                "incident_id": incident.id,
+                "event_id": candidate.event_id,
+                "triggered_at": triggered_at,
+                "severity_at_trigger": candidate.severity,
+                "details": dict(candidate.details or {}),
+            })
+        self._triggers.add_many(db, rows)
+
+    @property
+    def rules(self) -> List[BaseRule]:
+        """Правила анализа сервиса."""
+        return list(self._engine.rules)
+
     def _default_rules(self) -> List[BaseRule]:
         """Возвращает правила анализа по умолчанию."""
         return [
@@ -141,7 +260,6 @@ class IncidentService:
 
     def _to_model(
         self, 
-        db: Session, 
         candidate, 
         event: Optional[Event] = None
     ) -> Incident:
@@ -149,7 +267,6 @@ class IncidentService:
         Преобразует кандидата в инцидент в модель БД.
         
         Args:
-            db: Сессия БД
             candidate: Кандидат в инциденты
             event: Связанное событие (опционально)
             
@@ -172,15 +289,10 @@ class IncidentService:
                 details.setdefault("application", application)
 
         # Получаем ID справочников
-        incident_type_id = self._get_ref_id(
-            db, IncidentType, self._incident_type_cache,
-            candidate.incident_type, default_name="service_crash_or_restart"
-        )
-        
-        severity_id = self._get_ref_id(
-            db, SeverityLevel, self._severity_cache,
-            candidate.severity, default_name="low"
+        incident_type_id = references.resolve(
+            IncidentType, candidate.incident_type, default="service_crash_or_restart"
         )
+        severity_id = references.resolve(SeverityLevel, candidate.severity, default="low")
 
         return Incident(
             detected_at=candidate.detected_at,
@@ -195,8 +307,10 @@ class IncidentService:
         """
         Автоматическое закрытие инцидентов без новых событий.
 
-        Если за последние N минут не было новых событий того же типа,
-        инцидент помечается как решённый.
+        Если за последние N минут не было новых событий тех типов, которые
+        читает правило инцидента, открытые инциденты этого типа помечаются
+        как решённые. Два запроса независимо от числа открытых инцидентов:
+        последние события по типам (GROUP BY) и один UPDATE.
 
         Args:
             db: Сессия базы данных
@@ -205,47 +319,50 @@ class IncidentService:
         Returns:
             Количество закрытых инцидентов
         """
-        self._load_reference_cache(db)
-        cutoff = dt.datetime.utcnow() - dt.timedelta(minutes=minutes)
+        references.ensure_loaded(db)
+        now = dt.datetime.utcnow()
+        cutoff = now - dt.timedelta(minutes=minutes)
 
-        # Находим активные инциденты, созданные до cutoff
-        stmt = select(Incident).where(
-            Incident.detected_at < cutoff,
-            Incident.status != "resolved"
+        event_types = self._event_types_by_incident_type()
+        if not event_types:
+            return 0
+
+        # Типы событий, по которым были события после cutoff
+        latest = self._events.latest_ts_by_type(
+            db, {type_id for type_ids in event_types.values() for type_id in type_ids}, since=cutoff
         )
-        inactive_incidents = db.execute(stmt).scalars().all()
-
-        resolved_count = 0
-        for incident in inactive_incidents:
-            # Получаем название типа инцидента для поиска событий
-            incident_type_name = db.execute(
-                select(IncidentType.name).where(IncidentType.id == incident.incident_type_id)
-            ).scalar_one_or_none()
-            
-            if not incident_type_name:
-                continue
-            
-            # Проверяем, были ли новые события для этого типа инцидента
-            event_stmt = select(Event).where(
-                Event.ts >= cutoff,
-                Event.event_type_id == incident.incident_type_id
-            )
-            new_events = db.execute(event_stmt).scalars().first()
-
-            # Если новых событий нет — закрываем инцидент
-            if not new_events:
-                incident.status = "resolved"
-                incident.resolved_at = dt.datetime.utcnow()
-                incident.resolved_by = "auto"
-                incident.resolution_notes = "Auto-resolved: no new events in {} minutes".format(minutes)
-                resolved_count += 1
+        inactive_types = [
+            incident_type_id
+            for incident_type_id, type_ids in event_types.items()
+            if not any(type_id in latest for type_id in type_ids)
+        ]
 
+        resolved_count = self._repo.resolve_open(
+            db,
+            inactive_types,
+            detected_before=cutoff,
+            resolved_at=now,
+            resolved_by="auto",
+            notes="Auto-resolved: no new events in {} minutes".format(minutes),
+        )
         if resolved_count > 0:
-            db.commit()
             logger.info(f"Auto-resolved {resolved_count} inactive incidents")
+            # ID закрытых UPDATE не возвращает: клиенты перечитывают список
+            self._bus.publish("incidents_resolved", count=resolved_count)
 
         return resolved_count
 
+    def _event_types_by_incident_type(self) -> Dict[int, List[int]]:
+        """ID типа инцидента -> ID типов событий, которые читает его правило."""
+        mapping: Dict[int, List[int]] = {}
+        for rule in self.rules:
+            incident_type_id = references.id(IncidentType, rule.name)
+            type_ids = [references.id(EventType, name) for name in rule.event_types]
+            type_ids = [type_id for type_id in type_ids if type_id is not None]
+            if incident_type_id is not None and type_ids:
+                mapping.setdefault(incident_type_id, []).extend(type_ids)
+        return mapping
+
     def resolve_incident(
         self,
         db: Session,
@@ -276,6 +393,7 @@ class IncidentService:
 
         db.commit()
         db.refresh(incident)
+        self._bus.publish("incident", [incident.id], created=False)
 
         logger.info(f"Incident {incident_id} resolved by {username}")
 
@@ -309,6 +427,7 @@ class IncidentService:
 
         db.commit()
         db.refresh(incident)
+        self._bus.publish("incident", [incident.id], created=False)
 
         logger.info(f"Incident {incident_id} reopened by {username}")
 
@@ -325,11 +444,7 @@ class IncidentService:
         Returns:
             Название типа инцидента
         """
-        if incident.incident_type_rel:
-            return incident.incident_type_rel.name
-            
-        stmt = select(IncidentType.name).where(IncidentType.id == incident.incident_type_id)
-        return db.execute(stmt).scalar_one_or_none() or "unknown"
+        return references.ensure_loaded(db).name(IncidentType, incident.incident_type_id)
 
     def get_incident_severity_name(self, db: Session, incident: Incident) -> str:
         """
@@ -342,11 +457,7 @@ class IncidentService:
         Returns:
             Название уровня серьёзности
         """
-        if incident.severity_rel:
-            return incident.severity_rel.name
-            
-        stmt = select(SeverityLevel.name).where(SeverityLevel.id == incident.severity_id)
-        return db.execute(stmt).scalar_one_or_none() or "unknown"
+        return references.ensure_loaded(db).name(SeverityLevel, incident.severity_id)
 
     def get_incidents_with_details(
         self,
@@ -369,17 +480,17 @@ class IncidentService:
         Returns:
             Список инцидентов
         """
-        self._load_reference_cache(db)
+        references.ensure_loaded(db)
         
         stmt = select(Incident).order_by(Incident.detected_at.desc()).limit(limit).offset(offset)
 
         if severity_name:
-            severity_id = self._severity_cache.get(severity_name.lower())
+            severity_id = references.id(SeverityLevel, severity_name.lower())
             if severity_id:
                 stmt = stmt.where(Incident.severity_id == severity_id)
 
         if incident_type_name:
-            incident_type_id = self._incident_type_cache.get(incident_type_name)
+            incident_type_id = references.id(IncidentType, incident_type_name)
             if incident_type_id:
                 stmt = stmt.where(Incident.incident_type_id == incident_type_id)
 
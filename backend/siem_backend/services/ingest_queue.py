@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Union
+
+from sqlalchemy.orm import Session
+
+from siem_backend.core.config import settings
+from siem_backend.services.normalization import NormalizedEvent
+
+logger = logging.getLogger(__name__)
+
+# Политики переполнения очереди
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_REJECT = "reject"
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_REJECT)
+
+# Сколько событий производитель кладёт в очередь за один захват блокировки
+ENQUEUE_CHUNK_SIZE = 500
+
+
+class IngestQueueFull(Exception):
+    """Очередь записи переполнена (политика reject или истёк тайм-аут block)."""
+
+
+class IngestTicket:
+    """Отметка в очереди: срабатывает после фиксации всех событий, поставленных до неё."""
+
+    def __init__(self, on_commit: Optional[Callable[[Session], None]] = None) -> None:
+        self._on_commit = on_commit
+        self._done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ждёт фиксации событий.
+
+        Args:
+            timeout: Тайм-аут в секундах
+
+        Returns:
+            True, если события зафиксированы (или запись завершилась ошибкой)
+        """
+        return self._done.wait(timeout)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def _complete(self, db: Optional[Session], error: Optional[BaseException] = None) -> None:
+        if error is None and self._on_commit is not None and db is not None:
+            try:
+                self._on_commit(db)
+            except Exception as e:
+                logger.exception("Ingest commit callback failed")
+                error = e
+        self.error = error
+        self._done.set()
+
+
+_Item = Union[NormalizedEvent, IngestTicket]
+
+
+def _default_service() -> Any:
+    """EventService писателя; с потоковым анализом, если он включён."""
+    from siem_backend.services.event_service import EventService
+
+    if settings.analysis_streaming:
+        from siem_backend.services.analysis_engine import streaming_engine
+        return EventService(analysis_engine=streaming_engine)
+    return EventService()
+
+
+class IngestQueue:
+    """
+    Ограниченная очередь записи событий с одним потоком-писателем.
+
+    Производители (эндпоинты сбора) только ставят события в очередь.
+    Писатель собирает события всех производителей в транзакции
+    до batch_size строк или max_delay секунд и сохраняет их через EventService.
+    Отметки (IngestTicket) срабатывают после фиксации предшествующих им
+    событий — так контрольная точка файла сдвигается только после записи.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 50000,
+        batch_size: int = 5000,
+        max_delay: float = 0.2,
+        overflow: str = OVERFLOW_BLOCK,
+        block_timeout: float = 5.0,
+        session_factory: Optional[Callable[[], Session]] = None,
+        service_factory: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self._maxsize = maxsize
+        self._batch_size = batch_size
+        self._max_delay = max_delay
+        self._overflow = overflow
+        self._block_timeout = block_timeout
+        self._session_factory = session_factory
+        self._service_factory = service_factory
+
+        self._items: Deque[_Item] = deque()
+        self._depth = 0  # событий в очереди (без отметок)
+        self._busy = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        self._enqueued = 0
+        self._dropped = 0
+        self._rejected = 0
+        self._saved = 0
+        self._batches = 0
+        self._errors = 0
+        self._last_batch_size = 0
+        self._last_commit_ms = 0.0
+        self._total_commit_ms = 0.0
+
+    # ------------------------------------------------------------------
+    # Производители
+    # ------------------------------------------------------------------
+
+    def put_many(
+        self,
+        events: Iterable[NormalizedEvent],
+        on_commit: Optional[Callable[[Session], None]] = None,
+    ) -> IngestTicket:
+        """
+        Ставит события в очередь.
+
+        Args:
+            events: События
+            on_commit: Вызывается в потоке писателя (с его сессией)
+                после фиксации всех переданных событий
+
+        Returns:
+            Отметка, срабатывающая после фиксации событий
+
+        Raises:
+            IngestQueueFull: очередь переполнена (reject или тайм-аут block)
+        """
+        self._ensure_started()
+        # События читаются вне блокировки, в очередь кладутся порциями
+        chunk: List[NormalizedEvent] = []
+        for event in events:
+            chunk.append(event)
+            if len(chunk) >= ENQUEUE_CHUNK_SIZE:
+                self._put_chunk(chunk)
+                chunk = []
+        self._put_chunk(chunk)
+
+        ticket = IngestTicket(on_commit)
+        with self._cond:
+            self._items.append(ticket)
+            self._cond.notify_all()
+        return ticket
+
+    def _put_chunk(self, chunk: List[NormalizedEvent]) -> None:
+        with self._cond:
+            for event in chunk:
+                self._put(event)
+            self._cond.notify_all()
+
+    def _put(self, event: NormalizedEvent) -> None:
+        """Добавляет одно событие с учётом политики переполнения (под блокировкой)."""
+        if self._depth >= self._maxsize:
+            if self._overflow == OVERFLOW_REJECT:
+                self._rejected += 1
+                raise IngestQueueFull("Ingest queue is full")
+            if self._overflow == OVERFLOW_DROP_OLDEST:
+                self._drop_oldest()
+            else:
+                deadline = time.monotonic() + self._block_timeout
+                while self._depth >= self._maxsize:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._stopping:
+                        self._rejected += 1
+                        raise IngestQueueFull("Ingest queue is full")
+                    self._cond.notify_all()
+                    self._cond.wait(remaining)
+        self._items.append(event)
+        self._depth += 1
+        self._enqueued += 1
+        if self._depth >= self._batch_size:
+            self._cond.notify_all()
+
+    def _drop_oldest(self) -> None:
+        """Вытесняет самое старое событие; отметки остаются на месте."""
+        tickets: List[IngestTicket] = []
+        while self._items:
+            item = self._items.popleft()
+            if isinstance(item, IngestTicket):
+                tickets.append(item)
+                continue
+            self._depth -= 1
+            self._dropped += 1
+            break
+        self._items.extendleft(reversed(tickets))
+
+    # ------------------------------------------------------------------
+    # Писатель
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+            self._thread.start()
+        atexit.register(self.shutdown)
+
+    def _take_batch(self) -> Optional[List[_Item]]:
+        """Ждёт и забирает очередную пачку (под блокировкой)."""
+        with self._cond:
+            while not self._items:
+                if self._stopping:
+                    return None
+                self._cond.wait()
+
+            # Копим события до batch_size или max_delay с момента первого
+            deadline = time.monotonic() + self._max_delay
+            while self._depth < self._batch_size and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch: List[_Item] = []
+            taken = 0
+            while self._items and taken < self._batch_size:
+                item = self._items.popleft()
+                if not isinstance(item, IngestTicket):
+                    taken += 1
+                batch.append(item)
+            # Отметки сразу за пачкой относятся к ней
+            while self._items and isinstance(self._items[0], IngestTicket):
+                batch.append(self._items.popleft())
+            self._depth -= taken
+            self._busy = True
+            self._cond.notify_all()
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            try:
+                self._write(batch)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def _write(self, batch: List[_Item]) -> None:
+        """Сохраняет пачку одной транзакцией и отрабатывает отметки."""
+        events = [item for item in batch if not isinstance(item, IngestTicket)]
+        tickets = [item for item in batch if isinstance(item, IngestTicket)]
+
+        session_factory = self._session_factory
+        if session_factory is None:
+            from siem_backend.data.db import SessionLocal
+            session_factory = SessionLocal
+        service_factory = self._service_factory
+        if service_factory is None:
+            service_factory = _default_service
+
+        db = session_factory()
+        try:
+            started = time.perf_counter()
+            saved = 0
+            if events:
+                saved = service_factory().save_normalized_event_stream(db, events, chunk_size=len(events))
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._cond:
+                self._saved += saved
+                if events:
+                    self._batches += 1
+                    self._last_batch_size = len(events)
+                    self._last_commit_ms = elapsed_ms
+                    self._total_commit_ms += elapsed_ms
+            for ticket in tickets:
+                ticket._complete(db)
+        except Exception as e:
+            db.rollback()
+            with self._cond:
+                self._errors += 1
+            logger.exception("Ingest batch of %d events failed", len(events))
+            for ticket in tickets:
+                ticket._complete(None, e)
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+    # Управление
+    # ------------------------------------------------------------------
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ждёт, пока очередь опустеет и писатель закончит текущую пачку.
+
+        Args:
+            timeout: Тайм-аут в секундах
+
+        Returns:
+            True, если всё записано
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._items or self._busy:
+                if self._thread is None or not self._thread.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: Optional[float] = 30.0) -> None:
+        """
+        Дописывает очередь и останавливает писателя (хук завершения приложения).
+
+        Args:
+            timeout: Тайм-аут в секундах
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        thread.join(timeout)
+        # Писатель выходит только после того, как забрал всё из очереди
+        if thread.is_alive():
+            logger.warning("Ingest writer did not stop in %.1f s", timeout or 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Глубина очереди и задержка фиксации."""
+        with self._cond:
+            return {
+                "depth": self._depth,
+                "capacity": self._maxsize,
+                "overflow": self._overflow,
+                "enqueued": self._enqueued,
+                "saved": self._saved,
+                "dropped": self._dropped,
+                "rejected": self._rejected,
+                "batches": self._batches,
+                "errors": self._errors,
+                "last_batch_size": self._last_batch_size,
+                "last_commit_ms": round(self._last_commit_ms, 1),
+                "avg_commit_ms": round(self._total_commit_ms / self._batches, 1) if self._batches else 0.0,
+            }
+
+
+ingest_queue = IngestQueue(
+    maxsize=settings.ingest_queue_size,
+    batch_size=settings.ingest_batch_size,
+    max_delay=settings.ingest_flush_ms / 1000,
+    overflow=settings.ingest_overflow,
+    block_timeout=settings.ingest_block_timeout,
+)
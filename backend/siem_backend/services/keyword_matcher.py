@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    Собирает выражение из префиксного дерева слов.
+
+    Общие префиксы разбираются один раз ("auth|authentication" -> "auth(?:entication)?"),
+    поэтому в каждой позиции текста проверяется не весь список слов,
+    а один символ на уровень дерева.
+    """
+    trie: Dict[str, dict] = {}
+    for kw in keywords:
+        node = trie
+        for ch in kw:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Предкомпилированный поиск ключевых слов по категориям.
+
+    Слова каждой категории собраны в одно выражение-дерево, которое
+    проходит текст за один вызов re.search вместо отдельной проверки
+    `kw in text` на каждое слово. Категории проверяются в порядке
+    приоритета — результат совпадает с последовательными any().
+    """
+
+    def __init__(self, categories: Sequence[Tuple[str, Iterable[str]]]) -> None:
+        """
+        Args:
+            categories: Пары (категория, ключевые слова) в порядке приоритета
+        """
+        self._categories: List[Tuple[str, Pattern[str]]] = []
+        all_keywords: List[str] = []
+        for category, keywords in categories:
+            words = [kw.lower() for kw in keywords if kw]
+            if not words:
+                continue
+            self._categories.append((category, re.compile(_trie_pattern(words))))
+            all_keywords.extend(words)
+
+        self._keywords = tuple(all_keywords)
+        self._any: Optional[Pattern[str]] = re.compile(_trie_pattern(all_keywords)) if all_keywords else None
+
+    @property
+    def keywords(self) -> Tuple[str, ...]:
+        return self._keywords
+
+    def first(self, text: str) -> Optional[str]:
+        """
+        Самая приоритетная категория, слово которой встречается в тексте.
+
+        Args:
+            text: Текст в нижнем регистре
+
+        Returns:
+            Название категории или None
+        """
+        if not text:
+            return None
+        for category, pattern in self._categories:
+            if pattern.search(text) is not None:
+                return category
+        return None
+
+    def search(self, text: str) -> bool:
+        """Есть ли в тексте (в нижнем регистре) хотя бы одно ключевое слово."""
+        return self._any is not None and bool(text) and self._any.search(text) is not None
@@ -1,6 +1,12 @@
 import re
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Hashable, NamedTuple, Optional
+
+from siem_backend.services.keyword_matcher import KeywordMatcher
+
+CLASSIFICATION_CACHE_SIZE = 4096
 
 
 @dataclass(frozen=True)
@@ -14,6 +20,85 @@ class NormalizedEvent:
     raw_data: dict[str, Any]
 
 
+class Classification(NamedTuple):
+    event_type: str
+    source_category: str
+    severity: str
+
+
+# Числа (PID, порты, октеты IP) и hex-токены: целое слово из [0-9a-f] хотя бы
+# с одной цифрой (deadbeef42, a3f9 -> 0), иначе цифра и хвост из [0-9a-f] до
+# границы слова (0x1f3a -> 0x0, sha256 -> sha0). Ключевые слова не содержат цифр
+# и не состоят только из букв a-f, поэтому маскирование не меняет результат
+# классификации.
+_VARIABLE_PARTS = re.compile(r"\b[0-9a-f]*\d[0-9a-f]*\b|\d[0-9a-f]*\b")
+
+# Поля raw_data, от которых зависит классификация
+_CLASSIFICATION_FIELDS = ("event_type", "category", "type", "process", "service", "application", "subsystem")
+
+
+def message_template(message: str) -> str:
+    """
+    Шаблон сообщения: нижний регистр, числа, IP и hex заменены на "0".
+
+    "Connection timeout to 10.0.0.5:443" -> "connection timeout to 0.0.0.0:0"
+    """
+    return _VARIABLE_PARTS.sub("0", (message or "").lower())
+
+
+class ClassificationCache:
+    """
+    Ограниченный LRU-кэш результатов классификации.
+
+    Потокобезопасен: нормализация вызывается и из API, и из планировщика.
+    """
+
+    def __init__(self, maxsize: int = CLASSIFICATION_CACHE_SIZE) -> None:
+        self._maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Classification]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Classification]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Classification) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict[str, int]:
+        """Счётчики для подбора размера кэша."""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self._maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+classification_cache = ClassificationCache()
+
+
 class EventClassifier:
 
     AUTH_KEYWORDS = [
@@ -39,30 +124,91 @@ class EventClassifier:
         "application", "app", "program", "binary",
     ]
 
+    SYSTEM_SERVICES = [
+        "systemd", "launchd", "kernel", "init", "sshd", "cron", "rsyslog",
+        "journald", "networkd", "udev", "dbus", "polkit", "network",
+    ]
+
+    # Категории в порядке приоритета: первая найденная определяет результат
+    _MESSAGE_TYPES = KeywordMatcher([
+        ("authentication", AUTH_KEYWORDS),
+        ("network", NETWORK_KEYWORDS),
+        ("service", SERVICE_KEYWORDS),
+        ("process", PROCESS_KEYWORDS),
+    ])
+    _RAW_TYPES = KeywordMatcher([
+        ("authentication", ["auth", "login", "session"]),
+        ("network", ["network", "dns", "connection"]),
+        ("service", ["service", "daemon", "system"]),
+        ("process", ["process", "app", "application"]),
+    ])
+    _SUBSYSTEM_CATEGORIES = KeywordMatcher([
+        ("service", ["system", "kernel", "launchd", "systemd", "daemon"]),
+        ("user_process", ["user", "app", "application", "process"]),
+    ])
+    _MESSAGE_CATEGORIES = KeywordMatcher([
+        ("service", ["launchd", "systemd", "daemon", "service"]),
+        ("user_process", ["app", "application", "user process"]),
+    ])
+    _UNIT_IN_MESSAGE = re.compile(r"\b[a-zA-Z0-9_-]+\.service")
+    # Критические слова первыми: "crashed ... failed" — это critical, а не high
+    _SEVERITY_KEYWORDS = KeywordMatcher([
+        ("critical", ["critical", "panic", "crash", "fatal"]),
+        ("high", ["error", "failed", "failure", "denied", "refused"]),
+        ("medium", ["warning", "warn", "timeout"]),
+    ])
+
     @classmethod
-    def classify_event_type(cls, message: str, raw_data: dict) -> str:
-        msg_lower = (message or "").lower()
+    def classify(cls, message: str, raw_data: dict, source_os: str) -> Classification:
+        """
+        Тип события, категория источника и severity по ключевым словам.
+
+        Результат кэшируется по шаблону сообщения и полям raw_data,
+        от которых зависит классификация: повторяющиеся шаблоны
+        (отличаются только PID, адресами, портами) не сканируются заново.
+
+        Args:
+            message: Текст события
+            raw_data: Исходные данные события
+            source_os: ОС источника
+
+        Returns:
+            Classification
+        """
+        key = (message_template(message),) + tuple(map(raw_data.get, _CLASSIFICATION_FIELDS))
+        try:
+            cached = classification_cache.get(key)
+        except TypeError:
+            # Нехешируемые значения в raw_data — классифицируем без кэша
+            key, cached = None, None
+        if cached is not None:
+            return cached
+
+        result = Classification(
+            cls.classify_event_type(message, raw_data),
+            cls.classify_source_category(message, raw_data, source_os),
+            cls.classify_severity(message),
+        )
+        if key is not None:
+            classification_cache.put(key, result)
+        return result
 
-        if any(kw in msg_lower for kw in cls.AUTH_KEYWORDS):
-            return "authentication"
-        if any(kw in msg_lower for kw in cls.NETWORK_KEYWORDS):
-            return "network"
-        if any(kw in msg_lower for kw in cls.SERVICE_KEYWORDS):
-            return "service"
-        if any(kw in msg_lower for kw in cls.PROCESS_KEYWORDS):
-            return "process"
+    @classmethod
+    def classify_severity(cls, message: str) -> str:
+        """Severity по ключевым словам — для событий без уровня."""
+        return cls._SEVERITY_KEYWORDS.first((message or "").lower()) or "low"
 
-        event_type = raw_data.get("event_type") or raw_data.get("category") or raw_data.get("type")
+    @classmethod
+    def classify_event_type(cls, message: str, raw_data: dict) -> str:
+        event_type = cls._MESSAGE_TYPES.first((message or "").lower())
         if event_type:
-            event_type_lower = str(event_type).lower()
-            if any(kw in event_type_lower for kw in ["auth", "login", "session"]):
-                return "authentication"
-            if any(kw in event_type_lower for kw in ["network", "dns", "connection"]):
-                return "network"
-            if any(kw in event_type_lower for kw in ["service", "daemon", "system"]):
-                return "service"
-            if any(kw in event_type_lower for kw in ["process", "app", "application"]):
-                return "process"
+            return event_type
+
+        raw_type = raw_data.get("event_type") or raw_data.get("category") or raw_data.get("type")
+        if raw_type:
+            event_type = cls._RAW_TYPES.first(str(raw_type).lower())
+            if event_type:
+                return event_type
 
         return "system"
 
@@ -71,26 +217,16 @@ class EventClassifier:
         process = raw_data.get("process") or raw_data.get("service") or raw_data.get("application") or ""
         process_lower = str(process).lower()
 
-        system_services = ["systemd", "launchd", "kernel", "init", "sshd", "cron", "rsyslog", "journald", "networkd", "udev", "dbus", "polkit", "network"]
-        if process_lower in system_services or process_lower.startswith("system"):
+        if process_lower in cls.SYSTEM_SERVICES or process_lower.startswith("system"):
             return "service"
 
         subsystem = raw_data.get("subsystem") or raw_data.get("category") or ""
-        subsystem_lower = str(subsystem).lower()
-
-        if any(kw in subsystem_lower for kw in ["system", "kernel", "launchd", "systemd", "daemon"]):
-            return "service"
-
-        if any(kw in subsystem_lower for kw in ["user", "app", "application", "process"]):
-            return "user_process"
+        category = cls._SUBSYSTEM_CATEGORIES.first(str(subsystem).lower())
+        if category:
+            return category
 
         msg_lower = (message or "").lower()
-        if re.search(r"\b[a-zA-Z0-9_-]+\.service", msg_lower):
-            return "user_process"
-        
-        if any(kw in msg_lower for kw in ["launchd", "systemd", "daemon", "service"]):
-            return "service"
-        if any(kw in msg_lower for kw in ["app", "application", "user process"]):
+        if cls._UNIT_IN_MESSAGE.search(msg_lower):
             return "user_process"
 
-        return "os"
+        return cls._MESSAGE_CATEGORIES.first(msg_lower) or "os"
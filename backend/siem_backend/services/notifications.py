@@ -1,14 +1,24 @@
 import json
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 from urllib import request
 
-from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from siem_backend.core.config import settings
-from siem_backend.data.models import Event, Incident, IncidentType, Notification, NotificationType, SeverityLevel
+from siem_backend.data.models import (
+    Event,
+    EventType,
+    Incident,
+    IncidentType,
+    Notification,
+    NotificationType,
+    SeverityLevel,
+    SourceCategoryRef,
+)
+from siem_backend.data.reference import references
 from siem_backend.data.notification_repository import NotificationRepository
+from siem_backend.services.stream_bus import StreamBus, saved_ids, stream_bus
 
 
 class NotificationChannel(ABC):
@@ -101,9 +111,7 @@ def incident_text_ru(incident: Incident, db: Session) -> str:
     Returns:
         Текстовое описание
     """
-    # Получаем название типа инцидента
-    stmt = select(IncidentType.name).where(IncidentType.id == incident.incident_type_id)
-    t = db.execute(stmt).scalar_one_or_none() or ""
+    t = references.ensure_loaded(db).name(IncidentType, incident.incident_type_id, default="")
     
     details = incident.details or {}
     if t == "multiple_failed_logins":
@@ -170,13 +178,14 @@ def critical_event_text_ru(event: Event, db: Session) -> str:
     if service:
         return f"Обнаружено критическое событие в службе {service}"
     
-    # Получаем название категории источника
-    if event.source_category_rel:
-        return f"Обнаружено критическое событие в категории {event.source_category_rel.name}"
+    references.ensure_loaded(db)
+    category = references.name(SourceCategoryRef, event.source_category_id, default="")
+    if category:
+        return f"Обнаружено критическое событие в категории {category}"
     
-    # Получаем название типа события
-    if event.event_type_rel:
-        return f"Обнаружено критическое событие: {event.event_type_rel.name}"
+    event_type = references.name(EventType, event.event_type_id, default="")
+    if event_type:
+        return f"Обнаружено критическое событие: {event_type}"
     
     return "Обнаружено критическое событие"
 
@@ -188,10 +197,10 @@ class NotificationService:
         self,
         repo: Optional[NotificationRepository] = None,
         channels: Optional[List[NotificationChannel]] = None,
+        bus: Optional[StreamBus] = None,
     ) -> None:
         self._repo = repo or NotificationRepository()
-        self._type_cache: Dict[str, int] = {}
-        self._severity_cache: Dict[str, int] = {}
+        self._bus = bus or stream_bus
         
         if channels is not None:
             self._channels = channels
@@ -206,45 +215,6 @@ class NotificationService:
                 )
             self._channels = base_channels
 
-    def _load_reference_cache(self, db: Session) -> None:
-        """Загружает кэш справочников."""
-        if not self._type_cache:
-            for item in db.execute(select(NotificationType)).scalars().all():
-                self._type_cache[item.name] = item.id
-        
-        if not self._severity_cache:
-            for item in db.execute(select(SeverityLevel)).scalars().all():
-                self._severity_cache[item.name] = item.id
-
-    def _get_ref_id(
-        self, 
-        db: Session, 
-        model, 
-        cache: Dict[str, int], 
-        name: str,
-        default_name: Optional[str] = None
-    ) -> int:
-        """Получает ID справочника по имени."""
-        if name in cache:
-            return cache[name]
-        
-        stmt = select(model).where(model.name == name)
-        item = db.execute(stmt).scalar_one_or_none()
-        
-        if item:
-            cache[name] = item.id
-            return item.id
-        
-        if default_name and default_name in cache:
-            return cache[default_name]
-        
-        stmt = select(model).limit(1)
-        item = db.execute(stmt).scalar_one_or_none()
-        if item:
-            return item.id
-            
-        return 1
-
     def create_notification(
         self,
         db: Session,
@@ -272,19 +242,36 @@ class NotificationService:
         Returns:
             Сохранённое уведомление
         """
-        self._load_reference_cache(db)
-        
-        notification_type_id = self._get_ref_id(
-            db, NotificationType, self._type_cache,
-            notification_type, default_name="incident"
+        notification = self._build_notification(
+            db, notification_type, severity, title, message, incident_id, event_id, details
         )
+        saved = self._repo.add(db, notification)
+        db.refresh(saved)
         
-        severity_id = self._get_ref_id(
-            db, SeverityLevel, self._severity_cache,
-            severity, default_name="low"
-        )
+        # Отправка через внешние каналы
+        self._send_external(saved, severity)
+                        
+        db.commit()
+        self._bus.publish("notification", saved_ids([saved]))
+        return saved
+
+    def _build_notification(
+        self,
+        db: Session,
+        notification_type: str,
+        severity: str,
+        title: str,
+        message: str,
+        incident_id: Optional[int] = None,
+        event_id: Optional[int] = None,
+        details: Optional[Dict[str, Any]] = None,
+    ) -> Notification:
+        """Создаёт объект уведомления (без сохранения)."""
+        references.ensure_loaded(db)
+        notification_type_id = references.resolve(NotificationType, notification_type, default="incident")
+        severity_id = references.resolve(SeverityLevel, severity, default="low")
         
-        notification = Notification(
+        return Notification(
             notification_type_id=notification_type_id,
             severity_id=severity_id,
             title=title,
@@ -295,24 +282,23 @@ class NotificationService:
             channel="internal",
             status="pending",
         )
-        saved = self._repo.add(db, notification)
-        db.refresh(saved)
-        
-        # Отправка через внешние каналы
-        if severity in ("critical", "high"):
-            for channel in self._channels:
-                if channel.channel_name != "internal":
-                    try:
-                        success = channel.send(title, message, severity, details or {})
-                        if success:
-                            saved.status = "sent"
-                            saved.channel = channel.channel_name
-                    except Exception:
-                        saved.status = "failed"
-                        saved.details = {**(saved.details or {}), "error": "channel_send_failed"}
-                        
-        db.commit()
-        return saved
+
+    def _send_external(self, notification: Notification, severity: str) -> None:
+        """Отправляет уведомление через внешние каналы и отмечает статус."""
+        if severity not in ("critical", "high"):
+            return
+        for channel in self._channels:
+            if channel.channel_name != "internal":
+                try:
+                    success = channel.send(
+                        notification.title, notification.message, severity, notification.details or {}
+                    )
+                    if success:
+                        notification.status = "sent"
+                        notification.channel = channel.channel_name
+                except Exception:
+                    notification.status = "failed"
+                    notification.details = {**(notification.details or {}), "error": "channel_send_failed"}
 
     def notify_incident(self, db: Session, incident: Incident) -> Notification:
         """
@@ -326,9 +312,7 @@ class NotificationService:
             Созданное уведомление
         """
         # Получаем название серьёзности
-        severity_name = db.execute(
-            select(SeverityLevel.name).where(SeverityLevel.id == incident.severity_id)
-        ).scalar_one_or_none() or "low"
+        severity_name = references.ensure_loaded(db).name(SeverityLevel, incident.severity_id, default="low")
         
         text = incident_text_ru(incident, db)
         telegram_advice = get_telegram_advice(severity_name)
@@ -356,15 +340,7 @@ class NotificationService:
         Returns:
             Созданное уведомление или None
         """
-        # Проверяем серьёзность через связь
-        severity_name = None
-        if event.severity_rel:
-            severity_name = event.severity_rel.name
-        else:
-            stmt = select(SeverityLevel.name).where(SeverityLevel.id == event.severity_id)
-            severity_name = db.execute(stmt).scalar_one_or_none()
-        
-        if severity_name != "critical":
+        if references.ensure_loaded(db).name(SeverityLevel, event.severity_id) != "critical":
             return None
             
         text = critical_event_text_ru(event, db)
@@ -378,6 +354,42 @@ class NotificationService:
             details={"source_os": event.source_os_id, "source_category": event.source_category_id},
         )
 
+    def notify_critical_events(self, db: Session, events: Sequence[Event]) -> List[Notification]:
+        """
+        Отправляет уведомления о пачке критических событий с одной фиксацией.
+
+        Серьёзность проверяется по кэшу справочника, без запроса на событие.
+        
+        Args:
+            db: Сессия БД
+            events: События (не критические пропускаются)
+            
+        Returns:
+            Созданные уведомления
+        """
+        critical_id = references.ensure_loaded(db).id(SeverityLevel, "critical")
+        
+        notifications: List[Notification] = []
+        for event in events:
+            if event.severity_id != critical_id:
+                continue
+            text = critical_event_text_ru(event, db)
+            notification = self._build_notification(
+                db,
+                notification_type="critical_event",
+                severity="critical",
+                title=text,
+                message=text,
+                event_id=event.id,
+                details={"source_os": event.source_os_id, "source_category": event.source_category_id},
+            )
+            self._send_external(notification, "critical")
+            notifications.append(notification)
+        
+        self._repo.add_many(db, notifications)
+        self._bus.publish("notification", saved_ids(notifications))
+        return notifications
+
     def get_severity_name(self, db: Session, notification: Notification) -> str:
         """
         Получает название уровня серьёзности уведомления.
@@ -389,11 +401,7 @@ class NotificationService:
         Returns:
             Название уровня серьёзности
         """
-        if notification.severity_rel:
-            return notification.severity_rel.name
-
-        stmt = select(SeverityLevel.name).where(SeverityLevel.id == notification.severity_id)
-        return db.execute(stmt).scalar_one_or_none() or "unknown"
+        return references.ensure_loaded(db).name(SeverityLevel, notification.severity_id)
 
     def get_notification_type_name(self, db: Session, notification: Notification) -> str:
         """
@@ -406,8 +414,4 @@ class NotificationService:
         Returns:
             Название типа уведомления
         """
-        if notification.notification_type_rel:
-            return notification.notification_type_rel.name
-
-        stmt = select(NotificationType.name).where(NotificationType.id == notification.notification_type_id)
-        return db.execute(stmt).scalar_one_or_none() or "unknown"
+        return references.ensure_loaded(db).name(NotificationType, notification.notification_type_id)
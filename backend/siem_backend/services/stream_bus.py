@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import inspect
+
+logger = logging.getLogger(__name__)
+
+# Темы новых записей: у каждой свой счётчик ID (позиция потока для Last-Event-ID)
+ROW_TOPICS = ("event", "incident", "notification")
+
+
+@dataclass(frozen=True)
+class StreamMessage:
+    """Изменение, опубликованное сервисом после фиксации транзакции."""
+
+    topic: str
+    # ID записей темы (для тем без записей — пусто)
+    ids: Tuple[int, ...] = ()
+    # True — новые записи, False — изменение уже существующих (смена статуса)
+    created: bool = True
+    # Данные для тем без записей (например, число закрытых инцидентов)
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+StreamSubscriber = Callable[[StreamMessage], None]
+
+
+def saved_ids(rows: Iterable[Any]) -> List[int]:
+    """
+    ID сохранённых ORM-объектов без их перезагрузки.
+
+    После commit объекты просрочены, и обращение к row.id стоило бы
+    запроса на каждый; ключ идентичности берётся из состояния объекта.
+
+    Args:
+        rows: ORM-объекты (несохранённые и не ORM пропускаются)
+
+    Returns:
+        ID записей
+    """
+    ids = []
+    for row in rows:
+        state = inspect(row, raiseerr=False)
+        if state is not None and state.identity:
+            ids.append(state.identity[0])
+    return ids
+
+
+class StreamBus:
+    """
+    Внутрипроцессная шина изменений (pub/sub).
+
+    Сервисы публикуют ID записей после commit; подписчики (SSE-поток)
+    вызываются синхронно в потоке публикации. Без подписчиков публикация
+    ничего не стоит, ошибка подписчика только логируется — на запись
+    она не влияет.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: List[StreamSubscriber] = []
+
+    def subscribe(self, callback: StreamSubscriber) -> None:
+        """
+        Подписывает обработчик на все сообщения.
+
+        Args:
+            callback: Функция, принимающая StreamMessage
+        """
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: StreamSubscriber) -> None:
+        """
+        Отписывает обработчик (повторная отписка допустима).
+
+        Args:
+            callback: Ранее подписанная функция
+        """
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, topic: str, ids: Sequence[int] = (), created: bool = True, **data: Any) -> None:
+        """
+        Публикует изменение.
+
+        Args:
+            topic: Тема (ROW_TOPICS или тема без записей)
+            ids: ID изменённых записей
+            created: Новые записи (False — изменение существующих)
+            **data: Данные для тем без записей
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        ids = tuple(sorted({row_id for row_id in ids if row_id is not None}))
+        if topic in ROW_TOPICS and not ids:
+            return
+        message = StreamMessage(topic=topic, ids=ids, created=created, data=data)
+        for callback in subscribers:
+            try:
+                callback(message)
+            except Exception:
+                logger.exception("Stream subscriber failed for topic %s", topic)
+
+
+stream_bus = StreamBus()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+WILDCARD = "<*>"
+
+# Переменные части сообщения: hex (0x1f3a), числа, IP и адреса с портом (10.0.0.5:443)
+_PARAMS = re.compile(r"\b0x[0-9a-fA-F]+\b|\d+(?:[.:]\d+)*")
+
+
+class LogCluster:
+    """Кластер сообщений с общим шаблоном."""
+
+    __slots__ = ("tokens", "size", "template_id")
+
+    def __init__(self, tokens: List[str], template_id: Optional[int] = None, size: int = 0) -> None:
+        self.tokens = tokens
+        self.template_id = template_id
+        self.size = size
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+    def __repr__(self) -> str:
+        return f"<LogCluster(id={self.template_id}, size={self.size}, template={self.template!r})>"
+
+
+class _Node:
+    __slots__ = ("children", "clusters")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, _Node] = {}
+        self.clusters: List[LogCluster] = []
+
+
+def tokenize(message: str) -> List[str]:
+    """Токены сообщения с заменой чисел, IP и hex на <*>."""
+    return _PARAMS.sub(WILDCARD, message or "").split()
+
+
+class TemplateMiner:
+    """
+    Потоковый майнер шаблонов сообщений (алгоритм Drain).
+
+    Дерево фиксированной глубины: первый уровень — число токенов,
+    следующие depth - 2 уровня — первые токены сообщения. В листе
+    сообщение сравнивается с кластерами по доле совпавших токенов;
+    при сходстве не ниже sim_threshold различающиеся позиции
+    шаблона заменяются на <*>, иначе создаётся новый кластер.
+    """
+
+    def __init__(self, depth: int = 4, sim_threshold: float = 0.4, max_children: int = 100) -> None:
+        """
+        Args:
+            depth: Глубина дерева (не меньше 3)
+            sim_threshold: Минимальная доля совпавших токенов для слияния
+            max_children: Максимум дочерних узлов; остальные токены уходят в <*>
+        """
+        if depth < 3:
+            raise ValueError("depth must be at least 3")
+        self._prefix_depth = depth - 2
+        self._sim_threshold = sim_threshold
+        self._max_children = max_children
+        self._root: Dict[int, _Node] = {}
+
+    def clusters(self) -> Iterator[LogCluster]:
+        stack = list(self._root.values())
+        while stack:
+            node = stack.pop()
+            yield from node.clusters
+            stack.extend(node.children.values())
+
+    def add_message(self, message: str) -> Tuple[LogCluster, bool]:
+        """
+        Относит сообщение к кластеру, при необходимости обобщая шаблон.
+
+        Args:
+            message: Текст сообщения
+
+        Returns:
+            Кортеж (кластер, шаблон создан или изменён)
+        """
+        tokens = tokenize(message)
+        leaf = self._leaf(tokens, create=True)
+        cluster = self._best_match(leaf.clusters, tokens)
+
+        if cluster is None:
+            cluster = LogCluster(tokens)
+            leaf.clusters.append(cluster)
+            cluster.size = 1
+            return cluster, True
+
+        cluster.size += 1
+        changed = False
+        for i, (current, token) in enumerate(zip(cluster.tokens, tokens)):
+            if current != token and current != WILDCARD:
+                cluster.tokens[i] = WILDCARD
+                changed = True
+        return cluster, changed
+
+    def match(self, message: str) -> Optional[LogCluster]:
+        """Кластер для сообщения без изменения дерева."""
+        tokens = tokenize(message)
+        leaf = self._leaf(tokens, create=False)
+        return self._best_match(leaf.clusters, tokens) if leaf is not None else None
+
+    def load(self, template_id: int, template: str, size: int = 0) -> LogCluster:
+        """
+        Добавляет сохранённый шаблон в дерево.
+
+        Args:
+            template_id: ID шаблона в БД
+            template: Текст шаблона (токены через пробел)
+            size: Количество сообщений шаблона
+
+        Returns:
+            Восстановленный кластер
+        """
+        cluster = LogCluster(template.split(), template_id=template_id, size=size)
+        self._leaf(cluster.tokens, create=True).clusters.append(cluster)
+        return cluster
+
+    def _leaf(self, tokens: List[str], create: bool) -> Optional[_Node]:
+        node = self._root.get(len(tokens))
+        if node is None:
+            if not create:
+                return None
+            node = self._root[len(tokens)] = _Node()
+
+        for token in tokens[: self._prefix_depth]:
+            child = node.children.get(token)
+            if child is None:
+                wildcard = node.children.get(WILDCARD)
+                if not create or (wildcard is not None and len(node.children) >= self._max_children):
+                    child = wildcard
+                elif len(node.children) >= self._max_children - 1 and wildcard is None:
+                    # Последнее место занимает <*> для всех остальных токенов
+                    child = node.children[WILDCARD] = _Node()
+                else:
+                    child = node.children[token] = _Node()
+                if child is None:
+                    return None
+            node = child
+        return node
+
+    def _best_match(self, clusters: List[LogCluster], tokens: List[str]) -> Optional[LogCluster]:
+        best: Optional[LogCluster] = None
+        best_sim = -1.0
+        best_params = -1
+        for cluster in clusters:
+            same = 0
+            params = 0
+            for current, token in zip(cluster.tokens, tokens):
+                if current == WILDCARD:
+                    params += 1
+                elif current == token:
+                    same += 1
+            sim = same / len(tokens) if tokens else 1.0
+            if sim > best_sim or (sim == best_sim and params > best_params):
+                best, best_sim, best_params = cluster, sim, params
+
+        if best is not None and best_sim >= self._sim_threshold:
+            return best
+        return None
@@ -7,6 +7,8 @@
 - Пользователи
 - Уведомления
 
+- Справочники (реестр, заполненный как после init_db)
+
 Использование:
     from tests.mocks import EventFactory, IncidentFactory
     
@@ -20,6 +22,44 @@
 import datetime as dt
 from typing import Any, Dict, List, Optional
 
+from siem_backend.data.models import (
+    AnalysisRule,
+    EventType,
+    IncidentType,
+    NotificationType,
+    SeverityLevel,
+    SourceCategoryRef,
+    SourceOS,
+)
+from siem_backend.data.reference import references
+
+
+# =============================================================================
+# Справочники
+# =============================================================================
+
+# Имена справочников в порядке initial_data (ID = позиция + 1)
+REFERENCE_NAMES = {
+    SourceOS: ["macos", "linux", "windows", "mock"],
+    SeverityLevel: ["info", "low", "medium", "high", "critical"],
+    SourceCategoryRef: ["os", "auth", "network", "system_service", "user_process"],
+    EventType: [
+        "auth_failed", "auth_success", "network_error", "service_crash", "authentication",
+        "network", "service", "process", "system", "macos_unified_log",
+    ],
+    IncidentType: ["multiple_failed_logins", "repeated_network_errors", "service_crash_or_restart"],
+    NotificationType: ["incident", "critical_event"],
+    AnalysisRule: ["multiple_failed_logins", "repeated_network_errors", "service_crash_or_restart"],
+}
+
+
+def load_references() -> None:
+    """Заполняет реестр справочников так, как это делает init_db()."""
+    references.replace({
+        model: {name: i for i, name in enumerate(names, start=1)}
+        for model, names in REFERENCE_NAMES.items()
+    })
+
 
 # =============================================================================
 # Фабрика событий
@@ -1,11 +1,29 @@
+import threading
+import time
 import unittest
 from datetime import datetime, timedelta
+from collections import namedtuple
 from unittest.mock import Mock, MagicMock
 
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.orm import Session as OrmSession
+
 from siem_backend.services.analysis.rules.failed_logins import MultipleFailedLoginsRule
 from siem_backend.services.analysis.rules.network_errors import RepeatedNetworkErrorsRule
 from siem_backend.services.analysis.rules.service_crash import ServiceCrashOrRestartRule
-from siem_backend.data.models import Event
+from siem_backend.services.analysis.engine import RuleEngine
+from siem_backend.services.analysis.windows import KeyedWindows, SlidingWindowCounter, window_state
+from siem_backend.services.analysis.types import IncidentCandidate, RuleStats
+from siem_backend.services.analysis_engine import AnalysisEngine
+from siem_backend.services.incident_service import IncidentService
+from siem_backend.services.normalization import NormalizedEvent
+from siem_backend.data.incident_repository import IncidentRepository
+from siem_backend.data.models import Event, Incident, SystemRun
+from siem_backend.data.schemas import Base
+from siem_backend.services.notifications import NotificationService
+from siem_backend.data.reference import references
+from siem_backend.core.config import settings
+from tests.mocks import load_references
 
 
 class TestMultipleFailedLoginsRule(unittest.TestCase):
@@ -16,8 +34,11 @@ class TestMultipleFailedLoginsRule(unittest.TestCase):
         self.until = datetime.utcnow()
         self.rule = MultipleFailedLoginsRule(threshold=5, window_minutes=10)
         
-        # Мокаем справочник event_types
-        self.db.execute.return_value.scalar_one_or_none.return_value = 1
+        # Справочник event_types — из реестра справочников
+        load_references()
+
+    def tearDown(self):
+        references.invalidate()
 
     def _create_event(self, message: str, event_type: str = "authentication") -> Event:
         return Event(
@@ -93,8 +114,11 @@ class TestRepeatedNetworkErrorsRule(unittest.TestCase):
         self.until = datetime.utcnow()
         self.rule = RepeatedNetworkErrorsRule(threshold=10, window_minutes=10)
         
-        # Мокаем справочник event_types
-        self.db.execute.return_value.scalar_one_or_none.return_value = 1
+        # Справочник event_types — из реестра справочников
+        load_references()
+
+    def tearDown(self):
+        references.invalidate()
 
     def _create_event(self, message: str, event_type: str = "network") -> Event:
         return Event(
@@ -173,8 +197,11 @@ class TestServiceCrashOrRestartRule(unittest.TestCase):
         self.until = datetime.utcnow()
         self.rule = ServiceCrashOrRestartRule(threshold=1)
         
-        # Мокаем справочник event_types
-        self.db.execute.return_value.scalar_one_or_none.return_value = 1
+        # Справочник event_types — из реестра справочников
+        load_references()
+
+    def tearDown(self):
+        references.invalidate()
 
     def _create_event(self, message: str, event_type: str = "service") -> Event:
         return Event(
@@ -259,5 +286,499 @@ class TestServiceCrashOrRestartRule(unittest.TestCase):
         self.assertEqual(len(candidates), 0)
 
 
+EventRow = namedtuple("EventRow", "id ts event_type_id message")
+
+
+class TestRuleEngine(unittest.TestCase):
+    """Общий проход по окну событий."""
+
+    def setUp(self):
+        self.db = Mock()
+        self.since = datetime.utcnow() - timedelta(minutes=10)
+        self.until = datetime.utcnow()
+        load_references()
+
+    def tearDown(self):
+        references.invalidate()
+
+    def test_single_scan_routes_rows_by_event_type(self):
+        # authentication=5, network=6, service=7 (см. tests/mocks.py)
+        rows = [EventRow(i, self.until, 5, "Failed password for root") for i in range(1, 6)]
+        rows += [EventRow(10, self.until, 7, "Service crashed")]
+        rows += [EventRow(11, self.until, 6, "Service crashed")]
+        self.db.execute.return_value = rows
+        engine = RuleEngine([
+            MultipleFailedLoginsRule(threshold=5),
+            RepeatedNetworkErrorsRule(threshold=1),
+            ServiceCrashOrRestartRule(threshold=1),
+        ], aggregate=False)
+
+        candidates = engine.run(self.db, since=self.since, until=self.until)
+
+        self.assertEqual(self.db.execute.call_count, 1)
+        by_type = {c.incident_type: c for c in candidates}
+        self.assertEqual(set(by_type), {"multiple_failed_logins", "service_crash_or_restart"})
+        self.assertEqual(by_type["multiple_failed_logins"].details["count"], 5)
+        self.assertEqual(by_type["service_crash_or_restart"].event_id, 10)
+
+    def test_rule_without_event_types_runs_separately(self):
+        self.db.execute.return_value = []
+        custom = Mock(event_types=())
+        custom.run.return_value = ["candidate"]
+        engine = RuleEngine([ServiceCrashOrRestartRule(), custom], aggregate=False)
+
+        candidates = engine.run(self.db, since=self.since, until=self.until)
+
+        self.assertEqual(candidates, ["candidate"])
+        custom.run.assert_called_once_with(self.db, since=self.since, until=self.until)
+
+
+    def test_aggregate_mode_counts_in_sql(self):
+        self.db.execute.return_value.one.return_value = (12, 42)
+        custom = Mock(event_types=())
+        custom.aggregate.return_value = None
+        custom.run.return_value = []
+        engine = RuleEngine([RepeatedNetworkErrorsRule(threshold=10), custom], aggregate=True)
+
+        candidates = engine.run(self.db, since=self.since, until=self.until)
+
+        self.assertEqual(len(candidates), 1)
+        self.assertEqual(candidates[0].event_id, 42)
+        self.assertEqual(candidates[0].details["count"], 12)
+        self.assertEqual(candidates[0].severity, "low")
+        custom.run.assert_called_once()
+
+    def test_candidates_per_user_key(self):
+        rows = [EventRow(i, self.until, 5, f"Failed password for user{i}") for i in range(1, 6)]
+        rows += [EventRow(i, self.until, 5, "Failed password for invalid user admin") for i in range(6, 11)]
+        self.db.execute.return_value = rows
+        engine = RuleEngine([MultipleFailedLoginsRule(threshold=5)], aggregate=False)
+
+        candidates = engine.run(self.db, since=self.since, until=self.until)
+
+        self.assertEqual(len(candidates), 1)
+        self.assertEqual(candidates[0].details["key"], "admin")
+        self.assertEqual(candidates[0].details["count"], 5)
+        self.assertEqual(candidates[0].event_id, 10)
+        self.assertIn("admin", candidates[0].description)
+
+    def test_aggregate_statement_groups_by_service_key(self):
+        rule = ServiceCrashOrRestartRule(threshold=2)
+        stmt = rule.aggregate_statement(self.db, since=self.since, until=self.until)
+        sql = str(stmt.compile(compile_kwargs={"literal_binds": True})).lower()
+
+        self.assertIn("group by", sql)
+        self.assertIn("having count(events.id) >= 2", sql)
+        self.assertIsNone(MultipleFailedLoginsRule().aggregate(self.db, since=self.since, until=self.until))
+
+    def test_collects_rule_stats(self):
+        rows = [EventRow(i, self.until, 5, "Failed password for root") for i in range(1, 6)]
+        rows += [EventRow(6, self.until, 5, "Accepted password for root")]
+        self.db.execute.return_value = rows
+        stats = {}
+        engine = RuleEngine([MultipleFailedLoginsRule(threshold=5), ServiceCrashOrRestartRule()], aggregate=False)
+
+        engine.run(self.db, since=self.since, until=self.until, stats=stats)
+
+        logins = stats["multiple_failed_logins"]
+        self.assertEqual((logins.mode, logins.scanned, logins.matched, logins.candidates), ("scan", 6, 5, 1))
+        self.assertEqual(stats["service_crash_or_restart"].scanned, 0)
+        self.assertGreater(logins.to_dict()["wall_ms"], 0)
+
+    def _slow_rule(self, name, delay, result):
+        rule = Mock(event_types=("network",))
+        rule.name = name
+        rule.aggregate.return_value = None
+        rule.run.side_effect = lambda db, since, until: time.sleep(delay) or [result]
+        return rule
+
+    def test_parallel_mode_uses_session_per_rule(self):
+        sessions = []
+        factory = Mock(side_effect=lambda: sessions.append(Mock()) or sessions[-1])
+        rules = [self._slow_rule(f"rule{i}", 0.05, f"candidate{i}") for i in range(3)]
+        engine = RuleEngine(rules, aggregate=True, workers=3, rule_timeout=5, session_factory=factory)
+
+        started = time.perf_counter()
+        candidates = engine.run(self.db, since=self.since, until=self.until)
+
+        self.assertLess(time.perf_counter() - started, 0.14)
+        self.assertEqual(candidates, ["candidate0", "candidate1", "candidate2"])
+        self.assertEqual(len(sessions), 3)
+        for session in sessions:
+            session.close.assert_called_once()
+        self.db.execute.assert_not_called()
+
+    def test_parallel_mode_skips_slow_and_failing_rules(self):
+        failing = self._slow_rule("failing", 0, None)
+        failing.run.side_effect = RuntimeError("boom")
+        rules = [self._slow_rule("slow", 1.0, "late"), failing, self._slow_rule("fast", 0, "candidate")]
+        engine = RuleEngine(rules, aggregate=False, workers=3, rule_timeout=0.2, session_factory=Mock)
+
+        started = time.perf_counter()
+        with self.assertLogs("siem_backend.services.analysis.engine", level="WARNING") as logs:
+            candidates = engine.run(self.db, since=self.since, until=self.until)
+
+        self.assertLess(time.perf_counter() - started, 0.8)
+        self.assertEqual(candidates, ["candidate"])
+        self.assertTrue(any("slow timed out" in line for line in logs.output))
+        self.assertTrue(any("failing failed" in line for line in logs.output))
+
+    def test_parallel_timeout_interrupts_query_and_drops_late_stats(self):
+        engine_db = create_engine("sqlite://", connect_args={"check_same_thread": False})
+        endless = text("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c")
+        finished = []
+        hung = self._slow_rule("hung", 0, None)
+        hung.run.side_effect = lambda db, since, until: finished.append(db.execute(endless).scalar())
+        rules = [hung, self._slow_rule("fast", 0, "candidate")]
+        engine = RuleEngine(
+            rules, aggregate=False, workers=2, rule_timeout=0.2, session_factory=lambda: OrmSession(engine_db)
+        )
+        stats = {}
+
+        with self.assertLogs("siem_backend.services.analysis.engine", level="WARNING"):
+            candidates = engine.run(self.db, since=self.since, until=self.until, stats=stats)
+        # Запрос прерван в SQLite: поток пула освобождается сам
+        deadline = time.monotonic() + 2
+        while any(t.name.startswith("rule-worker") for t in threading.enumerate()) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(candidates, ["candidate"])
+        self.assertFalse(any(t.name.startswith("rule-worker") for t in threading.enumerate()))
+        self.assertEqual(finished, [])
+        self.assertEqual((stats["hung"].status, stats["hung"].wall_ms, stats["hung"].mode), ("timeout", 0.0, "scan"))
+        engine_db.dispose()
+
+    def test_aggregate_statement_matches_keywords_with_like(self):
+        rule = ServiceCrashOrRestartRule()
+        stmt = rule.aggregate_statement(self.db, since=self.since, until=self.until)
+        sql = str(stmt.compile(compile_kwargs={"literal_binds": True})).lower()
+
+        self.assertIn("count(events.id)", sql)
+        self.assertIn("max(events.id)", sql)
+        self.assertIn("events.event_type_id in (7)", sql)
+        for keyword in rule.keywords:
+            self.assertIn(f"like '%' || lower('{keyword}') || '%'", sql)
+
+
+class TestIncrementalAnalysis(unittest.TestCase):
+    """Скользящие окна и водяной знак."""
+
+    def setUp(self):
+        self.db = Mock()
+        self.until = datetime(2026, 3, 28, 16, 0, 0)
+        self.since = self.until - timedelta(minutes=60)
+        load_references()
+
+    def tearDown(self):
+        references.invalidate()
+
+    def test_window_counts_buckets_and_evicts_old_minutes(self):
+        window = SlidingWindowCounter()
+        window.add(self.since - timedelta(minutes=5), 1)
+        window.add(self.since + timedelta(seconds=10), 2)
+        window.add(self.since + timedelta(seconds=20), 7)
+        window.add(self.until, 3)
+
+        window = SlidingWindowCounter.from_list(window.to_list())
+        window.evict(self.since)
+
+        self.assertEqual(window.total(), (3, 7))
+        self.assertEqual(len(window.to_list()), 2)
+
+    def test_keyed_windows_evict_idle_and_least_recent_keys(self):
+        keyed = KeyedWindows(max_keys=2)
+        keyed.add("old", self.since - timedelta(minutes=5), 1)
+        keyed.add("a", self.until, 2)
+        keyed.add("old", self.since - timedelta(minutes=4), 3)
+        keyed.add("b", self.until, 4)
+
+        # "a" дольше всех без событий — вытеснен по пределу
+        self.assertEqual(keyed.evicted, 1)
+        totals = KeyedWindows.from_dict(keyed.to_dict()).totals(self.since)
+        self.assertEqual(totals, {"b": (1, 4)})
+
+    def test_threshold_spanning_runs_fires(self):
+        rule = MultipleFailedLoginsRule(threshold=5)
+        engine = RuleEngine([rule], aggregate=False)
+        windows = {}
+        run_rows = [
+            [EventRow(i, self.until, 5, "Failed password for root") for i in range(1, 4)],
+            [EventRow(i, self.until, 5, "Failed password for root") for i in range(4, 6)],
+        ]
+
+        watermark = 0
+        for max_id, rows in zip((3, 5), run_rows):
+            self.db.execute.side_effect = [Mock(scalar=Mock(return_value=max_id)), rows]
+            candidates, watermark = engine.run_incremental(
+                self.db, since=self.since, until=self.until, after_id=watermark, windows=windows
+            )
+
+        self.assertEqual(watermark, 5)
+        self.assertEqual(len(candidates), 1)
+        self.assertEqual(candidates[0].details["count"], 5)
+        self.assertEqual(candidates[0].event_id, 5)
+
+
+class TestAnalysisRunJournal(unittest.TestCase):
+    """Журнал запусков анализа и срабатываний правил."""
+
+    def setUp(self):
+        load_references()
+
+    def tearDown(self):
+        references.invalidate()
+
+    def test_full_run_records_rule_stats_and_triggers(self):
+        candidate = IncidentCandidate(
+            incident_type="multiple_failed_logins",
+            severity="warning",
+            description="5 failed logins",
+            detected_at=datetime.utcnow(),
+            event_id=7,
+            details={"count": 5},
+        )
+
+        def run(db, since, until, stats):
+            stats["multiple_failed_logins"] = RuleStats("multiple_failed_logins", scanned=9, matched=5, candidates=1)
+            return [candidate]
+
+        repo = Mock()
+        repo.get_existing_event_type_pairs.return_value = set()
+        repo.get_recent_incident_types.return_value = set()
+        runs, triggers = Mock(), Mock()
+        service = IncidentService(
+            repo=repo, engine=Mock(run=run), notification_service=Mock(), runs=runs, triggers=triggers
+        )
+
+        self.assertEqual(service.run_analysis(MagicMock(), incremental=False), repo.add_many.return_value)
+
+        rows = triggers.add_many.call_args[0][1]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]["rule_id"], rows[0]["event_id"], rows[0]["severity_at_trigger"]), (1, 7, "warning"))
+        run_row = runs.add.call_args[0][1]
+        self.assertEqual(run_row.details["mode"], "full")
+        self.assertEqual(run_row.details["rule_stats"]["multiple_failed_logins"]["scanned"], 9)
+
+
+class TestAutoResolve(unittest.TestCase):
+    """Автозакрытие неактивных инцидентов."""
+
+    def setUp(self):
+        load_references()
+
+    def tearDown(self):
+        references.invalidate()
+
+    def test_resolves_types_without_recent_events_in_one_update(self):
+        db = Mock()
+        repo = Mock()
+        repo.resolve_open.return_value = 4
+        events = Mock()
+        # Свежие события только сетевые (network=6)
+        events.latest_ts_by_type.return_value = {6: datetime.utcnow()}
+        service = IncidentService(repo=repo, events=events)
+
+        self.assertEqual(service.auto_resolve_inactive_incidents(db, minutes=60), 4)
+
+        self.assertEqual(events.latest_ts_by_type.call_args[0][1], {5, 6, 7})
+        repo.resolve_open.assert_called_once()
+        # multiple_failed_logins=1, service_crash_or_restart=3; сетевые остаются открытыми
+        self.assertEqual(sorted(repo.resolve_open.call_args[0][1]), [1, 3])
+        db.execute.assert_not_called()
+
+    def test_resolve_open_is_a_single_bulk_update(self):
+        db = Mock()
+        db.execute.return_value.rowcount = 2
+        cutoff = datetime.utcnow()
+
+        resolved = IncidentRepository().resolve_open(
+            db, [1, 3], detected_before=cutoff, resolved_at=cutoff, resolved_by="auto"
+        )
+
+        self.assertEqual(resolved, 2)
+        sql = str(db.execute.call_args[0][0]).lower()
+        self.assertTrue(sql.startswith("update incidents set"))
+        self.assertIn("incidents.incident_type_id in", sql)
+        db.commit.assert_called_once()
+
+
+class TestStreamingAnalysis(unittest.TestCase):
+    """Потоковый анализ с окнами в памяти."""
+
+    def setUp(self):
+        self.db = Mock()
+        self.now = datetime.utcnow()
+        self.rule = MultipleFailedLoginsRule(threshold=3)
+        self.incidents = Mock(rules=[self.rule, RepeatedNetworkErrorsRule()])
+        self.incidents.save_candidates.side_effect = lambda db, candidates: len(candidates)
+        load_references()
+
+    def tearDown(self):
+        references.invalidate()
+
+    def _event(self, message: str) -> NormalizedEvent:
+        return NormalizedEvent(
+            ts=self.now.isoformat(),
+            source_os="mock",
+            source_category="os",
+            event_type="authentication",
+            severity="medium",
+            message=message,
+            raw_data={},
+        )
+
+    def test_fires_per_user_key(self):
+        engine = AnalysisEngine(incident_service=self.incidents)
+
+        fired = [
+            engine.analyze(self._event(f"Failed password for {user}"), event_id=i).is_incident
+            for i, user in enumerate(["root", "admin", "root", "admin", "root"], start=1)
+        ]
+
+        self.assertEqual(fired, [False, False, False, False, True])
+
+    def test_fires_on_crossing_and_escalation_only(self):
+        engine = AnalysisEngine(incident_service=self.incidents)
+
+        results = [engine.analyze(self._event("Failed password for root"), event_id=i) for i in range(1, 11)]
+
+        fired = [(i, r.severity) for i, r in enumerate(results, start=1) if r.is_incident]
+        self.assertEqual(fired, [(3, "warning"), (10, "critical")])
+        self.assertFalse(engine.analyze(self._event("Accepted password for root"), event_id=11).is_incident)
+
+    def test_restores_snapshot_and_skips_caught_up_events(self):
+        window = KeyedWindows()
+        window.add("root", self.now, 9)
+        runs = Mock()
+        runs.get_last.return_value = SystemRun(details=window_state(
+            mode="streaming",
+            window_minutes=60,
+            rule_names=["multiple_failed_logins", "repeated_network_errors"],
+            watermark=10,
+            until=self.now,
+            windows={"multiple_failed_logins": window},
+        ))
+        # Догон: MAX(id) = 11, новое событие 11
+        self.db.execute.side_effect = [
+            Mock(scalar=Mock(return_value=11)),
+            [EventRow(11, self.now, 5, "Failed password for root")],
+        ]
+        engine = AnalysisEngine(incident_service=self.incidents, runs=runs)
+        row = {"ts": self.now, "event_type_id": 5, "message": "Failed password for root"}
+
+        found = engine.observe(self.db, [(row, 11), (row, 12)])
+
+        self.assertEqual(found, 1)
+        candidates = self.incidents.save_candidates.call_args[0][1]
+        self.assertEqual(candidates[0].details["count"], 3)
+        self.assertEqual(candidates[0].event_id, 12)
+
+
+class TestStreamingWithScheduledRun(unittest.TestCase):
+    """Потоковый анализ и плановый инкрементальный запуск на одной базе."""
+
+    def setUp(self):
+        load_references()
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.db = OrmSession(self.engine)
+        self.now = datetime.utcnow()
+        self.incidents = IncidentService(
+            engine=RuleEngine([MultipleFailedLoginsRule(threshold=3)]),
+            notification_service=NotificationService(channels=[], bus=Mock()),
+            bus=Mock(),
+        )
+        self.streaming = AnalysisEngine(incident_service=self.incidents)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        references.invalidate()
+
+    def _save_events(self, ids):
+        rows = [{
+            "id": i,
+            "ts": self.now - timedelta(seconds=10 - i),
+            "source_os_id": 1,
+            "source_category_id": 1,
+            "event_type_id": 5,
+            "severity_id": 3,
+            "message": "Failed password for root",
+            "raw_data": {},
+        } for i in ids]
+        self.db.execute(insert(Event), rows)
+        self.db.commit()
+        return [(row, row["id"]) for row in rows]
+
+    def test_scheduled_run_does_not_repeat_streamed_threshold(self):
+        # Поток создаёт инцидент на третьем событии и молчит на четвёртом
+        self.streaming.observe(self.db, self._save_events([1, 2, 3]))
+        self.streaming.observe(self.db, self._save_events([4]))
+
+        # Плановый запуск видит тот же порог с новым последним событием (4)
+        scheduled = IncidentService(
+            engine=RuleEngine([MultipleFailedLoginsRule(threshold=3)]),
+            notification_service=NotificationService(channels=[], bus=Mock()),
+            bus=Mock(),
+            streaming=self.streaming,
+        )
+        found = scheduled.run_analysis(self.db, incremental=True)
+
+        self.assertEqual(found, 0)
+        self.assertEqual(self.db.execute(select(func.count(Incident.id))).scalar(), 1)
+
+    def test_row_committed_below_watermark_is_counted_once(self):
+        engine = RuleEngine([MultipleFailedLoginsRule(threshold=5)], aggregate=False)
+        windows = {}
+        since, until = self.now - timedelta(minutes=60), self.now + timedelta(minutes=1)
+
+        # ID 3 выдан раньше 4, но зафиксирован после первого запуска
+        self._save_events([1, 2, 4])
+        _, watermark = engine.run_incremental(self.db, since=since, until=until, after_id=0, windows=windows)
+        self._save_events([3, 5])
+        candidates, watermark = engine.run_incremental(
+            self.db, since=since, until=until, after_id=watermark, windows=windows
+        )
+
+        self.assertEqual(watermark, 5)
+        self.assertEqual([(c.details["count"], c.event_id) for c in candidates], [(5, 5)])
+
+    def test_rows_scanned_per_run_follow_new_events(self):
+        rule = MultipleFailedLoginsRule(threshold=5)
+        engine = RuleEngine([rule], aggregate=False)
+        overlap = settings.analysis_watermark_overlap
+        windows = {}
+        since, until = self.now - timedelta(minutes=60), self.now + timedelta(minutes=60)
+
+        self._save_events(range(1, 3001))
+        _, watermark = engine.run_incremental(self.db, since=since, until=until, after_id=0, windows=windows)
+
+        scanned = []
+        for new in (20, 200):
+            self._save_events(range(watermark + 1, watermark + new + 1))
+            stats = {}
+            _, watermark = engine.run_incremental(
+                self.db, since=since, until=until, after_id=watermark, windows=windows, stats=stats
+            )
+            scanned.append(stats[rule.name].scanned)
+
+        # Новые строки плюс полоса перекрытия, а не всё окно
+        self.assertEqual(scanned, [20 + overlap, 200 + overlap])
+        self.assertEqual(sum(count for count, _ in windows[rule.name].totals(since).values()), 3220)
+
+    def test_window_state_is_kept_only_in_the_latest_run_per_mode(self):
+        self.streaming.observe(self.db, self._save_events([1]))
+        for i in (2, 3):
+            self.streaming.snapshot(self.db)
+            self._save_events([i])
+            self.incidents.run_analysis(self.db, incremental=True)
+
+        runs = self.db.execute(select(SystemRun).order_by(SystemRun.id)).scalars().all()
+        self.assertEqual(
+            [(run.details["mode"], "windows" in run.details) for run in runs],
+            [("streaming", True), ("incremental", False), ("incremental", True)],
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,253 @@
+import gc
+import os
+import tempfile
+import unittest
+from collections import OrderedDict
+from unittest.mock import patch
+
+from siem_backend.services.collectors import parsers
+from siem_backend.services.collectors.file import FileLogCollector
+from siem_backend.services.collectors.parsers import LineParser, get_line_parser
+from siem_backend.services.collectors.tail import FileCheckpoint, read_appended_lines, read_last_lines
+
+
+LINE = "2026-03-28 15:00:{sec:02d},000 ERROR nginx[1234]: Connection timeout to 10.0.0.5:80\n"
+
+
+class TestFileTailing(unittest.TestCase):
+    """Тесты режима слежения за файлом с контрольными точками."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "system.log")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _append(self, text: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_first_run_reads_tail_and_sets_checkpoint(self):
+        self._append("".join(LINE.format(sec=i) for i in range(10)))
+
+        collector = FileLogCollector(file_path=self.path, max_lines=3, follow=True)
+        events = collector.collect()
+
+        self.assertEqual(len(events), 3)
+        self.assertIsNotNone(collector.checkpoint)
+        self.assertEqual(collector.checkpoint.offset, os.path.getsize(self.path))
+
+    def test_reads_only_appended_lines(self):
+        self._append(LINE.format(sec=1))
+        checkpoint = FileLogCollector(file_path=self.path, follow=True)
+        checkpoint.collect()
+
+        self._append("".join(LINE.format(sec=i) for i in range(2, 7)))
+        collector = FileLogCollector(file_path=self.path, max_lines=2, follow=True, checkpoint=checkpoint.checkpoint)
+        events = collector.collect()
+
+        # В режиме слежения max_lines не обрезает новые данные
+        self.assertEqual(len(events), 5)
+
+        again = FileLogCollector(file_path=self.path, follow=True, checkpoint=collector.checkpoint)
+        self.assertEqual(again.collect(), [])
+
+    def test_partial_line_is_buffered(self):
+        self._append(LINE.format(sec=1))
+        _, checkpoint = read_appended_lines(self.path, FileCheckpoint(inode=os.stat(self.path).st_ino, offset=0))
+
+        self._append("2026-03-28 15:00:02,000 ERROR sshd[1]: Failed log")
+        lines, checkpoint = read_appended_lines(self.path, checkpoint)
+        self.assertEqual(lines, [])
+        self.assertTrue(checkpoint.partial.endswith("Failed log"))
+
+        self._append("in attempt for user admin\n")
+        lines, checkpoint = read_appended_lines(self.path, FileCheckpoint.from_dict(checkpoint.to_dict()))
+        self.assertEqual(lines, ["2026-03-28 15:00:02,000 ERROR sshd[1]: Failed login attempt for user admin"])
+        self.assertEqual(checkpoint.partial, "")
+
+    def test_truncation_restarts_from_beginning(self):
+        self._append("".join(LINE.format(sec=i) for i in range(5)))
+        _, checkpoint = read_appended_lines(self.path, FileCheckpoint(inode=os.stat(self.path).st_ino, offset=0))
+
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(LINE.format(sec=30))
+        lines, _ = read_appended_lines(self.path, checkpoint)
+
+        self.assertEqual(len(lines), 1)
+        self.assertIn("15:00:30", lines[0])
+
+    def test_rename_rotation_drains_old_file(self):
+        self._append(LINE.format(sec=1))
+        _, checkpoint = read_appended_lines(self.path, FileCheckpoint(inode=os.stat(self.path).st_ino, offset=0))
+
+        self._append(LINE.format(sec=2))
+        os.rename(self.path, self.path + ".1")
+        self._append(LINE.format(sec=3))
+
+        lines, new_checkpoint = read_appended_lines(self.path, checkpoint)
+
+        self.assertEqual(len(lines), 2)
+        self.assertIn("15:00:02", lines[0])
+        self.assertIn("15:00:03", lines[1])
+        self.assertEqual(new_checkpoint.inode, os.stat(self.path).st_ino)
+
+
+class TestReadLastLines(unittest.TestCase):
+    """Тесты чтения хвоста файла с конца блоками."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "system.log")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _expected(self, n: int) -> list:
+        with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+            return [ln.rstrip("\n") for ln in f.readlines()[-n:]]
+
+    def test_matches_readlines(self):
+        contents = [
+            "".join(LINE.format(sec=i % 60) for i in range(200)),
+            "".join(LINE.format(sec=i % 60) for i in range(50)) + "no trailing newline",
+            "\n\nsingle\n\n",
+            "ошибка входа пользователя\n" * 40,
+            "x",
+        ]
+        for text in contents:
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(text)
+            for n in (1, 3, 49, 50, 51, 500):
+                for block_size in (7, 64, 4096):
+                    with self.subTest(text=text[:20], n=n, block_size=block_size):
+                        self.assertEqual(read_last_lines(self.path, n, block_size=block_size), self._expected(n))
+
+    def test_empty_file(self):
+        open(self.path, "w").close()
+        self.assertEqual(read_last_lines(self.path, 10), [])
+
+
+class TestLineParser(unittest.TestCase):
+    """Тесты разбора строк с закреплением формата."""
+
+    def test_iso_with_level(self):
+        parsed = LineParser().parse("2026-03-28 15:00:05,000 ERROR sshd[5678]: Failed login attempt for user admin")
+
+        self.assertEqual(parsed.ts, "2026-03-28T15:00:05Z")
+        self.assertEqual(parsed.level, "ERROR")
+        self.assertEqual(parsed.process, "sshd")
+        self.assertEqual(parsed.pid, 5678)
+        self.assertEqual(parsed.message, "ERROR sshd[5678]: Failed login attempt for user admin")
+
+    def test_iso_with_timezone(self):
+        parsed = LineParser().parse("2026-03-28T18:00:05+03:00 host nginx[1]: Connection refused")
+
+        self.assertEqual(parsed.ts, "2026-03-28T15:00:05Z")
+        self.assertEqual(parsed.process, "nginx")
+
+    def test_service_in_message_wins(self):
+        parsed = LineParser().parse(
+            "2026-03-28 15:00:05,000 ERROR systemd[1]: redis.service: Main process exited, status=1/FAILURE"
+        )
+        self.assertEqual(parsed.process, "redis")
+
+    def test_bsd_syslog(self):
+        parsed = LineParser().parse("Mar  5 10:11:12 myhost sshd[42]: Invalid password for root")
+
+        self.assertTrue(parsed.ts.endswith("-03-05T10:11:12Z"))
+        self.assertEqual(parsed.process, "sshd")
+        self.assertEqual(parsed.pid, 42)
+        self.assertEqual(parsed.message, "myhost sshd[42]: Invalid password for root")
+
+    def test_plain_line(self):
+        parsed = LineParser().parse("Network unreachable")
+
+        self.assertEqual(parsed.message, "Network unreachable")
+        self.assertEqual(parsed.process, "")
+        self.assertEqual(parsed.level, "")
+
+    def test_sniff_pins_format_and_falls_back_on_miss(self):
+        parser = LineParser()
+        parser.sniff([LINE.format(sec=i).rstrip("\n") for i in range(5)] + ["garbage"])
+        self.assertEqual(parser.format_name, "iso_level")
+
+        parsed = parser.parse("Mar  5 10:11:12 myhost sshd[42]: Invalid password for root")
+        self.assertEqual(parsed.process, "sshd")
+        self.assertEqual(parser.format_name, "iso_level")
+
+
+    def test_parse_many_matches_parse(self):
+        lines = [
+            "2026-03-28 15:00:05,000 ERROR sshd[5678]: Failed login attempt for user admin",
+            "2026-03-28 15:00:06,000 ERROR systemd[1]: redis.service: Main process exited",
+            "2026-03-28 15:00:07,000 WARN 12345[7]: numeric process name",
+            "2026-03-28T18:00:08+03:00 INFO nginx[1]: Connection refused",
+            "Mar  5 10:11:12 myhost sshd[42]: Invalid password for root",
+        ]
+        parser = LineParser()
+        parser.sniff(lines[:3])
+
+        self.assertEqual(parser.parse_many(lines), [parser.parse(line) for line in lines])
+
+    def test_parse_many_chunks_fall_back_per_line(self):
+        lines = [
+            "2026-03-28 15:00:05,000 ERROR sshd[5678]: Failed login attempt for user admin",
+            "2026-03-28T18:00:06.250+03:00 INFO nginx: Connection refused",
+            "2026-03-28 15:00:07,000 ERROR systemd[1]: redis.service: Main process exited",
+            "garbage without timestamp",
+            "2026-03-28 15:00:08,000 ERROR sshd[1]: first\n2026-03-28 15:00:09,000 ERROR sshd[2]: second",
+            "2026-03-28 15:00:10,000 CRITICAL 12345[7]: numeric process name",
+        ]
+        parser = LineParser()
+        parser.sniff(lines[:3])
+
+        with patch.object(parsers, "PARSE_CHUNK_SIZE", 2):
+            self.assertEqual(parser.parse_many(lines), [parser.parse(line) for line in lines])
+        self.assertTrue(gc.isenabled())
+
+    def test_parsers_per_file_are_bounded(self):
+        with patch.object(parsers, "MAX_LINE_PARSERS", 2), patch.object(parsers, "_parsers", OrderedDict()):
+            first = get_line_parser("/var/log/a.log")
+            get_line_parser("/var/log/b.log")
+            self.assertIs(get_line_parser("/var/log/a.log"), first)
+            get_line_parser("/var/log/c.log")
+
+            # b.log дольше всех не читали — вытеснен
+            self.assertEqual(list(parsers._parsers), ["/var/log/a.log", "/var/log/c.log"])
+
+class TestFileSeverity(unittest.TestCase):
+    """Тесты определения severity по уровню строки."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "system.log")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _collect(self, text: str) -> list:
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return FileLogCollector(file_path=self.path).collect()
+
+    def test_level_maps_to_severity(self):
+        events = self._collect(
+            "2026-03-28 15:00:01,000 CRITICAL zoom[1]: Application crashed: out of memory\n"
+            "2026-03-28 15:00:02,000 ERROR sshd[2]: Failed login attempt for user admin\n"
+            "2026-03-28 15:00:03,000 WARN kernel[0]: error counter reset\n"
+            "2026-03-28 15:00:04,000 INFO cron[3]: job failed, will retry\n"
+        )
+
+        self.assertEqual([e.severity for e in events], ["critical", "high", "medium", "low"])
+        self.assertEqual(events[0].raw_data["level"], "CRITICAL")
+
+    def test_keyword_fallback_checks_critical_first(self):
+        events = self._collect("Mar  5 10:11:12 myhost launchd[1]: service crashed, restart failed\n")
+
+        self.assertEqual(events[0].severity, "critical")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,22 +12,39 @@
     python -m pytest tests/test_integration.py -v
 """
 
+import os
 import unittest
+import uuid
 from datetime import datetime, timedelta
 from unittest.mock import Mock, MagicMock, patch
 
+from fastapi import HTTPException, Response
+from sqlalchemy import create_engine, event as sa_event, insert, select, text
+from sqlalchemy.orm import Session as OrmSession
+
 from tests.mocks import (
     EventFactory,
     IncidentFactory,
     UserFactory,
     NotificationFactory,
     LogCollectorMock,
+    load_references,
 )
+import siem_backend.data.models_user  # noqa: F401
+from siem_backend.api.pagination import NEXT_CURSOR_HEADER, PREV_CURSOR_HEADER, encode_cursor, fetch_page
+from siem_backend.api.routes.events import get_event, list_events
 from siem_backend.services.normalization import EventClassifier, NormalizedEvent
 from siem_backend.services.analysis.rules.failed_logins import MultipleFailedLoginsRule
 from siem_backend.services.analysis.rules.network_errors import RepeatedNetworkErrorsRule
 from siem_backend.services.analysis.rules.service_crash import ServiceCrashOrRestartRule
-from siem_backend.data.models import Event
+from siem_backend.data.event_repository import EVENT_COLUMNS, EventRepository, _copy_value, event_dedup_hash
+from siem_backend.data.initial_data import init_reference_data
+from siem_backend.data.models import Event, Notification, SeverityLevel, SourceOS
+from siem_backend.data.schemas import Base
+from siem_backend.data.reference import REFERENCE_MODELS, references
+from siem_backend.services.collectors.mock import MockLogCollector
+from siem_backend.services.event_service import EventService
+from siem_backend.services.ingest_queue import IngestQueue, IngestQueueFull
 
 
 class TestEventNormalization(unittest.TestCase):
@@ -231,6 +248,10 @@ class TestAnalysisRulesWithMocks(unittest.TestCase):
         self.db = Mock()
         self.since = datetime.utcnow() - timedelta(minutes=10)
         self.until = datetime.utcnow()
+        load_references()
+
+    def tearDown(self):
+        references.invalidate()
 
     def test_multiple_failed_logins_rule_with_mock_events(self):
         """Правило множественных попыток входа с моками событий."""
@@ -376,5 +397,465 @@ class TestFullWorkflowWithMocks(unittest.TestCase):
         self.assertEqual(incident["incident_type"], "service_crash_or_restart")
 
 
+class TestEventStream(unittest.TestCase):
+    """Тесты потокового сбора и пакетного сохранения событий."""
+
+    def setUp(self):
+        load_references()
+
+    def tearDown(self):
+        references.invalidate()
+
+    def _service(self, added: list) -> EventService:
+        repo = Mock()
+        repo.existing_hashes.return_value = set()
+        repo.insert_many.side_effect = lambda db, rows: added.append(len(rows)) or {
+            row["dedup_hash"]: i for i, row in enumerate(rows)
+        }
+        templates = Mock()
+        templates.assign.side_effect = lambda db, messages: [None] * len(messages)
+        return EventService(repo=repo, notification_service=Mock(), template_service=templates)
+
+    def test_stream_is_saved_in_chunks(self):
+        produced = []
+        added = []
+
+        def events():
+            for i in range(25):
+                produced.append(i)
+                # На момент сохранения первого пакета поток не прочитан дальше него
+                self.assertLessEqual(len(produced) - sum(added), 10)
+                yield NormalizedEvent(
+                    ts=f"2026-03-28T15:00:{i:02d}Z",
+                    source_os="mock",
+                    source_category="os",
+                    event_type="network",
+                    severity="medium",
+                    message=f"Network timeout #{i}",
+                    raw_data={},
+                )
+
+        saved = self._service(added).save_normalized_event_stream(MagicMock(), events(), chunk_size=10)
+
+        self.assertEqual(saved, 25)
+        self.assertEqual(added, [10, 10, 5])
+
+    def test_rows_match_insert_columns(self):
+        repo = Mock()
+        repo.existing_hashes.return_value = set()
+        repo.insert_many.side_effect = lambda db, rows: {row["dedup_hash"]: 1 for row in rows}
+        templates = Mock()
+        templates.assign.return_value = [7]
+        service = EventService(repo=repo, notification_service=Mock(), template_service=templates)
+        event = NormalizedEvent(
+            ts="2026-03-28T15:00:00Z",
+            source_os="mock",
+            source_category="os",
+            event_type="network",
+            severity="medium",
+            message="Network timeout",
+            raw_data={"line": "x\ty"},
+        )
+
+        saved = service.save_normalized_event_stream(MagicMock(), [event])
+
+        self.assertEqual(saved, 1)
+        (row,) = repo.insert_many.call_args.args[1]
+        self.assertEqual(tuple(row), EVENT_COLUMNS)
+        self.assertEqual(row["template_id"], 7)
+        self.assertEqual(_copy_value(row["raw_data"]), '{"line": "x\\\\ty"}')
+        self.assertEqual(_copy_value(None), "\\N")
+
+    def test_duplicates_are_skipped_by_hash(self):
+        def event(second, message):
+            return NormalizedEvent(
+                ts=f"2026-03-28T15:00:{second:02d}.{second}Z",
+                source_os="mock",
+                source_category="os",
+                event_type="network",
+                severity="medium",
+                message=message,
+                raw_data={},
+            )
+
+        added = []
+        service = self._service(added)
+        service._repo.existing_hashes.return_value = {
+            event_dedup_hash(datetime(2026, 3, 28, 15, 0, 1), "Network timeout", 4)
+        }
+
+        saved = service.save_normalized_event_stream(MagicMock(), [
+            event(1, "Network timeout"),   # уже в БД
+            event(2, "Network timeout"),
+            event(2, "Network timeout"),   # дубликат внутри пакета
+            event(2, "DNS lookup failed"),
+        ])
+
+        self.assertEqual(saved, 2)
+        self.assertEqual(added, [2])
+
+    def test_collectors_are_lazy(self):
+        collector = MockLogCollector(event_count=12)
+        iterator = collector.iter_events()
+
+        self.assertIs(iter(iterator), iterator)
+        self.assertEqual(len(list(iterator)), 12)
+        self.assertEqual(len(collector.collect()), 12)
+
+
+class TestEventRepositoryInsertMany(unittest.TestCase):
+    """Выбор способа пакетной вставки."""
+
+    def test_postgres_batch_uses_insert_unless_copy_is_enabled(self):
+        db = MagicMock()
+        db.get_bind.return_value.dialect.name = "postgresql"
+        rows = [{"dedup_hash": str(i)} for i in range(5000)]
+        repo = EventRepository()
+
+        with patch.object(repo, "copy_rows") as copy_rows, patch.object(repo, "insert_rows") as insert_rows:
+            repo.insert_many(db, rows)
+            copy_rows.assert_not_called()
+            insert_rows.assert_called_once_with(db, rows)
+
+            with patch("siem_backend.data.event_repository.COPY_THRESHOLD", 5000):
+                repo.insert_many(db, rows)
+            copy_rows.assert_called_once_with(db, rows)
+
+
+@unittest.skipUnless(os.environ.get("SIEM_TEST_POSTGRES_URL"), "SIEM_TEST_POSTGRES_URL не задан")
+class TestPostgresCopyRows(unittest.TestCase):
+    """Пакетная вставка через COPY на настоящем PostgreSQL (таблицы во временной схеме)."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.schema = f"copy_test_{uuid.uuid4().hex[:8]}"
+        admin = create_engine(os.environ["SIEM_TEST_POSTGRES_URL"])
+        with admin.begin() as conn:
+            conn.execute(text(f"CREATE SCHEMA {cls.schema}"))
+        admin.dispose()
+        cls.engine = create_engine(
+            os.environ["SIEM_TEST_POSTGRES_URL"],
+            connect_args={"options": f"-csearch_path={cls.schema}"},
+        )
+        Base.metadata.create_all(cls.engine)
+        with OrmSession(cls.engine) as db:
+            init_reference_data(db)
+
+    @classmethod
+    def tearDownClass(cls):
+        with cls.engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {cls.schema} CASCADE"))
+        cls.engine.dispose()
+
+    def _row(self, second: int, message: str) -> dict:
+        ts = datetime(2026, 3, 28, 15, 0, second)
+        return {
+            "ts": ts,
+            "source_os_id": 1,
+            "source_category_id": 1,
+            "event_type_id": 1,
+            "severity_id": 1,
+            "message": message,
+            "template_id": None,
+            "raw_data": {"line": message, "path": "C:\\logs"},
+            "dedup_hash": event_dedup_hash(ts, message, 1),
+        }
+
+    def test_copy_round_trips_values_and_skips_duplicates(self):
+        rows = [self._row(i, message) for i, message in enumerate(
+            ["tab\there", "new\nline", "back\\slash", "юникод \\N"]
+        )]
+        repo = EventRepository()
+        with OrmSession(self.engine) as db:
+            first = repo.copy_rows(db, rows[:2])
+            db.commit()
+            # Временная таблица снята фиксацией
+            self.assertIsNone(db.execute(text("SELECT to_regclass('pg_temp.events_copy')")).scalar())
+
+            with patch("siem_backend.data.event_repository.COPY_THRESHOLD", 2):
+                second = repo.insert_many(db, rows)
+
+            stored = {
+                event.dedup_hash: event
+                for event in db.execute(select(Event).where(Event.id.in_([*first.values(), *second.values()]))).scalars()
+            }
+
+        self.assertEqual(set(first), {row["dedup_hash"] for row in rows[:2]})
+        self.assertEqual(set(second), {row["dedup_hash"] for row in rows[2:]})
+        for row in rows:
+            event = stored[row["dedup_hash"]]
+            self.assertEqual((event.message, event.raw_data, event.template_id), (
+                row["message"], row["raw_data"], None,
+            ))
+            self.assertEqual(event.ts.replace(tzinfo=None), row["ts"])
+
+    def test_failed_copy_leaves_no_temp_table(self):
+        bad = self._row(10, "broken")
+        bad["severity_id"] = "not a number"
+        with OrmSession(self.engine) as db:
+            with self.assertRaises(Exception):
+                EventRepository().copy_rows(db, [bad])
+            db.rollback()
+            self.assertIsNone(db.execute(text("SELECT to_regclass('pg_temp.events_copy')")).scalar())
+
+
+class TestReferenceRegistry(unittest.TestCase):
+    """Тесты общего реестра справочников."""
+
+    def tearDown(self):
+        references.invalidate()
+
+    def test_loaded_once_until_invalidated(self):
+        db = MagicMock()
+        db.execute.return_value.all.return_value = [(5, "critical")]
+
+        references.ensure_loaded(db)
+        references.ensure_loaded(db)
+
+        self.assertEqual(db.execute.call_count, len(REFERENCE_MODELS))
+        self.assertEqual(references.id(SeverityLevel, "critical"), 5)
+        self.assertEqual(references.name(SeverityLevel, 5), "critical")
+        self.assertEqual(references.name(SeverityLevel, 99), "unknown")
+
+        references.invalidate()
+        self.assertFalse(references.loaded)
+        references.ensure_loaded(db)
+        self.assertEqual(db.execute.call_count, 2 * len(REFERENCE_MODELS))
+
+    def test_resolve_falls_back_to_default_then_first_id(self):
+        load_references()
+
+        self.assertEqual(references.resolve(SourceOS, "macos", default="mock"), 1)
+        self.assertEqual(references.resolve(SourceOS, "solaris", default="mock"), 4)
+        self.assertEqual(references.resolve(SourceOS, "solaris"), 1)
+        references.replace({})
+        self.assertEqual(references.resolve(SourceOS, "solaris"), 1)
+
+
+class TestIngestQueue(unittest.TestCase):
+    """Тесты очереди записи событий."""
+
+    def _queue(self, **kwargs):
+        self.batches = []
+        service = Mock()
+        service.save_normalized_event_stream.side_effect = (
+            lambda db, events, chunk_size: self.batches.append(list(events)) or len(events)
+        )
+        self.session = Mock()
+        queue = IngestQueue(session_factory=lambda: self.session, service_factory=lambda: service, **kwargs)
+        self.addCleanup(queue.shutdown, 5)
+        return queue
+
+    def _events(self, n):
+        return [
+            NormalizedEvent(
+                ts="2026-03-28T15:00:00Z",
+                source_os="mock",
+                source_category="os",
+                event_type="service",
+                severity="info",
+                message=f"Service event #{i}",
+                raw_data={},
+            )
+            for i in range(n)
+        ]
+
+    def test_producers_are_grouped_into_batches_by_size(self):
+        queue = self._queue(batch_size=4, max_delay=5.0)
+
+        queue.put_many(self._events(3))
+        ticket = queue.put_many(self._events(5))
+
+        self.assertTrue(ticket.wait(5))
+        self.assertTrue(queue.flush(5))
+        self.assertEqual([len(b) for b in self.batches[:2]], [4, 4])
+        stats = queue.stats()
+        self.assertEqual(stats["saved"], 8)
+        self.assertEqual(stats["depth"], 0)
+
+    def test_partial_batch_is_written_after_delay(self):
+        queue = self._queue(batch_size=1000, max_delay=0.05)
+
+        ticket = queue.put_many(self._events(2))
+
+        self.assertTrue(ticket.wait(5))
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(queue.stats()["batches"], 1)
+
+    def test_commit_callback_runs_with_writer_session(self):
+        queue = self._queue(batch_size=10, max_delay=0.01)
+        callback = Mock()
+
+        ticket = queue.put_many(self._events(3), on_commit=callback)
+
+        self.assertTrue(ticket.wait(5))
+        callback.assert_called_once_with(self.session)
+        self.assertIsNone(ticket.error)
+
+    def test_overflow_policies(self):
+        queue = self._queue(maxsize=2, batch_size=100, max_delay=5.0, overflow="reject")
+        with self.assertRaises(IngestQueueFull):
+            queue.put_many(self._events(3))
+        self.assertEqual(queue.stats()["rejected"], 1)
+
+        queue = self._queue(maxsize=2, batch_size=100, max_delay=5.0, overflow="drop_oldest")
+        queue.put_many(self._events(3))
+        stats = queue.stats()
+        self.assertEqual(stats["depth"], 2)
+        self.assertEqual(stats["dropped"], 1)
+
+    def test_shutdown_flushes_pending_events(self):
+        queue = self._queue(batch_size=1000, max_delay=60.0)
+
+        queue.put_many(self._events(7))
+        queue.shutdown(5)
+
+        self.assertEqual(sum(len(b) for b in self.batches), 7)
+
+
+
+class TestKeysetPagination(unittest.TestCase):
+    """Курсорная пагинация списков на SQLite в памяти."""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.db = OrmSession(self.engine)
+        base = datetime(2026, 3, 28, 12, 0, 0)
+        # По три уведомления на одну секунду: курсор должен разрешать равные времена
+        self.db.execute(insert(Notification), [
+            {
+                "created_at": base + timedelta(seconds=i // 3),
+                "notification_type_id": 1,
+                "severity_id": 1,
+                "title": "title",
+                "message": f"message {i}",
+                "details": {},
+            }
+            for i in range(25)
+        ])
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def _page(self, **kwargs):
+        response = Response()
+        rows = fetch_page(
+            self.db, select(Notification), Notification.created_at, Notification.id, response, limit=7, **kwargs
+        )
+        return [row.id for row in rows], response.headers
+
+    def test_cursor_pages_match_offset_pages(self):
+        pages, after = [], None
+        while True:
+            ids, headers = self._page(after=after)
+            pages.append(ids)
+            after = headers.get(NEXT_CURSOR_HEADER)
+            if after is None:
+                break
+
+        self.assertEqual(pages, [self._page(offset=offset)[0] for offset in range(0, 25, 7)])
+        self.assertEqual(sum(pages, []), sorted(range(1, 26), key=lambda i: ((i - 1) // 3, i), reverse=True))
+
+    def test_before_cursor_returns_previous_page(self):
+        first, headers = self._page()
+        second, headers = self._page(after=headers[NEXT_CURSOR_HEADER])
+
+        back, _ = self._page(before=headers[PREV_CURSOR_HEADER])
+
+        self.assertEqual(back, first)
+        self.assertNotIn(PREV_CURSOR_HEADER, self._page()[1])
+
+    def test_rejects_bad_cursor_and_conflicting_parameters(self):
+        cursor = encode_cursor(datetime(2026, 3, 28, 12, 0, 5), 16)
+        for kwargs in ({"after": "not-a-cursor"}, {"after": cursor, "before": cursor}, {"after": cursor, "offset": 7}):
+            with self.assertRaises(HTTPException) as raised:
+                self._page(**kwargs)
+            self.assertEqual(raised.exception.status_code, 400)
+
+
+
+class TestEventListProjection(unittest.TestCase):
+    """Проекция полей списка событий и отложенная загрузка raw_data."""
+
+    LIST_DEFAULTS = {"severity": None, "limit": 50, "offset": 0, "after": None, "before": None}
+
+    def setUp(self):
+        load_references()
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+        self.db = OrmSession(self.engine)
+        base = datetime(2026, 3, 28, 12, 0, 0)
+        self.db.execute(insert(Event), [
+            {
+                "ts": base + timedelta(seconds=i),
+                "source_os_id": 1,
+                "source_category_id": 1,
+                "event_type_id": 7,
+                "severity_id": 3,
+                "message": f"nginx.service: Main process exited {i}",
+                "raw_data": {"service": "nginx", "payload": "x" * 1000} if i % 2 else {"process": ""},
+            }
+            for i in range(4)
+        ])
+        self.db.commit()
+        self.statements = []
+        sa_event.listen(self.engine, "before_cursor_execute", self._capture)
+
+    def tearDown(self):
+        sa_event.remove(self.engine, "before_cursor_execute", self._capture)
+        self.db.close()
+        self.engine.dispose()
+        references.invalidate()
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _list(self, **kwargs):
+        items = list_events(Response(), db=self.db, **{**self.LIST_DEFAULTS, "fields": None, **kwargs})
+        # Так ответ сериализует FastAPI (response_model_exclude_unset)
+        return [item.model_dump(exclude_unset=True) for item in items]
+
+    def test_default_list_skips_raw_data(self):
+        items = self._list()
+
+        self.assertEqual([item["id"] for item in items], [4, 3, 2, 1])
+        self.assertTrue(all("raw_data" not in item for item in items))
+        self.assertEqual([item["app"] for item in items], ["nginx", None, "nginx", None])
+        self.assertEqual(items[0]["event_type"], "service")
+        self.assertTrue(items[0]["description"])
+        # Столбец raw_data не читается целиком: только извлечение app в SQL
+        statement = self.statements[-1]
+        self.assertEqual(statement.count("events.raw_data"), statement.count("JSON_EXTRACT(events.raw_data"))
+
+    def test_fields_projection(self):
+        self.assertEqual(
+            self._list(fields="message, id", limit=1),
+            [{"id": 4, "message": "nginx.service: Main process exited 3"}],
+        )
+
+        item = self._list(fields="id,raw_data", limit=1)[0]
+        self.assertEqual(item["raw_data"]["service"], "nginx")
+        self.assertEqual(set(item), {"id", "raw_data"})
+
+        for fields in ("id,password", ","):
+            with self.assertRaises(HTTPException) as raised:
+                self._list(fields=fields)
+            self.assertEqual(raised.exception.status_code, 400)
+
+    def test_event_detail_returns_raw_data(self):
+        event = get_event(2, db=self.db)
+
+        self.assertEqual(event.raw_data["payload"], "x" * 1000)
+        self.assertEqual(event.app, "nginx")
+        self.assertEqual(event.severity, "medium")
+
+        with self.assertRaises(HTTPException) as raised:
+            get_event(100, db=self.db)
+        self.assertEqual(raised.exception.status_code, 404)
+
+
 if __name__ == "__main__":
     unittest.main()
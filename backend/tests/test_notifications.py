@@ -1,9 +1,25 @@
+import re
 import unittest
 from unittest.mock import Mock, MagicMock
 
-from siem_backend.services.notifications import get_telegram_advice, incident_text_ru
-from siem_backend.services.normalization import EventClassifier
+from generate_realtime_logs import ERROR_TEMPLATES, HOSTS, SERVICES
+from siem_backend.services.notifications import NotificationService, get_telegram_advice, incident_text_ru
+from siem_backend.services.normalization import (
+    Classification,
+    ClassificationCache,
+    EventClassifier,
+    classification_cache,
+    message_template,
+)
+from siem_backend.services.keyword_matcher import KeywordMatcher
 from siem_backend.data.models import Incident
+from siem_backend.services.analysis.rules.failed_logins import MultipleFailedLoginsRule
+from siem_backend.services.analysis.rules.network_errors import RepeatedNetworkErrorsRule
+from siem_backend.services.analysis.rules.service_crash import ServiceCrashOrRestartRule
+from siem_backend.services.collectors.mock import MockLogCollector
+from siem_backend.services.collectors.parsers import LineParser
+from siem_backend.data.reference import references
+from tests.mocks import LogCollectorMock, load_references
 
 
 class TestTelegramAdvice(unittest.TestCase):
@@ -40,6 +56,12 @@ class TestTelegramAdvice(unittest.TestCase):
 class TestIncidentTextRu(unittest.TestCase):
     """Тесты формирования текста инцидента (нормализованная модель)."""
 
+    def setUp(self):
+        load_references()
+
+    def tearDown(self):
+        references.invalidate()
+
     def _create_mock_incident(self, incident_type_id: int, severity_id: int, description: str, details: dict):
         """Создаёт мок инцидента с нормализованной структурой."""
         incident = Mock(spec=Incident)
@@ -55,7 +77,6 @@ class TestIncidentTextRu(unittest.TestCase):
 
     def test_multiple_failed_logins(self):
         db = Mock()
-        db.execute.return_value.scalar_one_or_none.return_value = "multiple_failed_logins"
         
         incident = self._create_mock_incident(
             incident_type_id=1,
@@ -68,7 +89,6 @@ class TestIncidentTextRu(unittest.TestCase):
 
     def test_repeated_network_errors(self):
         db = Mock()
-        db.execute.return_value.scalar_one_or_none.return_value = "repeated_network_errors"
         
         incident = self._create_mock_incident(
             incident_type_id=2,
@@ -83,7 +103,6 @@ class TestIncidentTextRu(unittest.TestCase):
 
     def test_service_crash_with_name(self):
         db = Mock()
-        db.execute.return_value.scalar_one_or_none.return_value = "service_crash_or_restart"
         
         incident = self._create_mock_incident(
             incident_type_id=3,
@@ -97,7 +116,6 @@ class TestIncidentTextRu(unittest.TestCase):
 
     def test_service_crash_without_name(self):
         db = Mock()
-        db.execute.return_value.scalar_one_or_none.return_value = "service_crash_or_restart"
         
         incident = self._create_mock_incident(
             incident_type_id=3,
@@ -179,5 +197,205 @@ class TestEventClassifier(unittest.TestCase):
                 self.assertEqual(category, "user_process")
 
 
+def _legacy_event_type(message: str, raw_data: dict) -> str:
+    """Прежняя классификация: последовательные any() по спискам слов."""
+    msg_lower = (message or "").lower()
+    for event_type, keywords in (
+        ("authentication", EventClassifier.AUTH_KEYWORDS),
+        ("network", EventClassifier.NETWORK_KEYWORDS),
+        ("service", EventClassifier.SERVICE_KEYWORDS),
+        ("process", EventClassifier.PROCESS_KEYWORDS),
+    ):
+        if any(kw in msg_lower for kw in keywords):
+            return event_type
+
+    raw_type = raw_data.get("event_type") or raw_data.get("category") or raw_data.get("type")
+    if raw_type:
+        raw_lower = str(raw_type).lower()
+        for event_type, keywords in (
+            ("authentication", ["auth", "login", "session"]),
+            ("network", ["network", "dns", "connection"]),
+            ("service", ["service", "daemon", "system"]),
+            ("process", ["process", "app", "application"]),
+        ):
+            if any(kw in raw_lower for kw in keywords):
+                return event_type
+    return "system"
+
+
+def _legacy_source_category(message: str, raw_data: dict) -> str:
+    process = raw_data.get("process") or raw_data.get("service") or raw_data.get("application") or ""
+    process_lower = str(process).lower()
+    if process_lower in EventClassifier.SYSTEM_SERVICES or process_lower.startswith("system"):
+        return "service"
+
+    subsystem_lower = str(raw_data.get("subsystem") or raw_data.get("category") or "").lower()
+    if any(kw in subsystem_lower for kw in ["system", "kernel", "launchd", "systemd", "daemon"]):
+        return "service"
+    if any(kw in subsystem_lower for kw in ["user", "app", "application", "process"]):
+        return "user_process"
+
+    msg_lower = (message or "").lower()
+    if re.search(r"\b[a-zA-Z0-9_-]+\.service", msg_lower):
+        return "user_process"
+    if any(kw in msg_lower for kw in ["launchd", "systemd", "daemon", "service"]):
+        return "service"
+    if any(kw in msg_lower for kw in ["app", "application", "user process"]):
+        return "user_process"
+    return "os"
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    """Однопроходный поиск ключевых слов совпадает с прежними any()."""
+
+    def _corpus(self) -> list:
+        corpus = [(e.message, e.raw_data) for e in MockLogCollector().collect()]
+
+        lines = list(LogCollectorMock.get_mock_file_lines())
+        for level, template in ERROR_TEMPLATES:
+            for service in SERVICES:
+                for host in HOSTS:
+                    message = template.format(pid=1234, host=host, port=443, user="admin", service=service)
+                    lines.append(f"2026-03-28 15:00:00,000 {level} {message}")
+        for line in lines:
+            parsed = LineParser().parse(line)
+            corpus.append((parsed.message, {"process": parsed.process}))
+            corpus.append((parsed.message, {}))
+
+        for entry in LogCollectorMock.get_mock_macos_log_entries():
+            corpus.append((entry["eventMessage"], entry))
+        return corpus
+
+    def test_classifier_matches_legacy(self):
+        for message, raw_data in self._corpus():
+            with self.subTest(message=message, raw_data=raw_data):
+                self.assertEqual(
+                    EventClassifier.classify_event_type(message, raw_data),
+                    _legacy_event_type(message, raw_data),
+                )
+                self.assertEqual(
+                    EventClassifier.classify_source_category(message, raw_data, "linux"),
+                    _legacy_source_category(message, raw_data),
+                )
+
+    def test_rule_filters_match_legacy(self):
+        rules = [MultipleFailedLoginsRule, RepeatedNetworkErrorsRule, ServiceCrashOrRestartRule]
+        for message, _ in self._corpus():
+            msg_lower = message.lower()
+            for rule in rules:
+                with self.subTest(rule=rule.name, message=message):
+                    self.assertEqual(
+                        rule._matcher.search(msg_lower),
+                        any(k in msg_lower for k in rule.keywords),
+                    )
+
+    def test_overlapping_keywords_use_priority(self):
+        matcher = KeywordMatcher([("high", ["failed login"]), ("low", ["login", "fail"])])
+
+        self.assertEqual(matcher.first("user login failed login"), "high")
+        self.assertEqual(matcher.first("login"), "low")
+        self.assertIsNone(matcher.first("nothing here"))
+
+
+class TestClassificationCache(unittest.TestCase):
+    """Тесты кэша классификации по шаблону сообщения."""
+
+    def setUp(self):
+        classification_cache.clear()
+
+    def test_template_masks_variable_parts(self):
+        self.assertEqual(
+            message_template("nginx[1234]: Connection timeout to 10.0.0.5:443 (0x1f3a)"),
+            "nginx[0]: connection timeout to 0.0.0.0:0 (0x0)",
+        )
+
+        # Маскирование безопасно, пока ни одно ключевое слово не похоже на hex
+        matchers = [value for value in vars(EventClassifier).values() if isinstance(value, KeywordMatcher)]
+        for keyword in (kw for matcher in matchers for kw in matcher.keywords):
+            self.assertNotRegex(keyword, r"^[0-9a-f]+$")
+
+    def test_repeated_template_hits_cache(self):
+        first = EventClassifier.classify("sshd[1409]: Failed password for user root from 10.0.0.5", {}, "linux")
+        second = EventClassifier.classify("sshd[9935]: Failed password for user root from 10.0.0.7", {}, "linux")
+
+        self.assertEqual(first, second)
+        self.assertEqual(first.event_type, "authentication")
+        self.assertEqual(first.severity, "high")
+        stats = classification_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+        # Поля raw_data входят в ключ
+        EventClassifier.classify("sshd[1]: Failed password for user root from 10.0.0.5", {"process": "zoom"}, "linux")
+        self.assertEqual(classification_cache.stats()["misses"], 2)
+
+    def test_letter_leading_hex_ids_share_cache_key(self):
+        self.assertEqual(
+            message_template("Container deadbeef42 session a3f9c2 exited"),
+            "container 0 session 0 exited",
+        )
+
+        first = EventClassifier.classify("Container deadbeef42 failed to start", {}, "linux")
+        second = EventClassifier.classify("Container a3f9c2e1 failed to start", {}, "linux")
+
+        self.assertEqual(first, second)
+        stats = classification_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_cached_result_matches_uncached(self):
+        for message, raw_data in TestKeywordMatcher()._corpus():
+            with self.subTest(message=message, raw_data=raw_data):
+                self.assertEqual(
+                    EventClassifier.classify(message, raw_data, "linux"),
+                    Classification(
+                        EventClassifier.classify_event_type(message, raw_data),
+                        EventClassifier.classify_source_category(message, raw_data, "linux"),
+                        EventClassifier.classify_severity(message),
+                    ),
+                )
+
+    def test_lru_eviction(self):
+        cache = ClassificationCache(maxsize=2)
+        value = Classification("network", "os", "low")
+        cache.put("a", value)
+        cache.put("b", value)
+        cache.get("a")
+        cache.put("c", value)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+class TestCriticalEventBatch(unittest.TestCase):
+    """Тесты пакетной отправки уведомлений о критических событиях."""
+
+    def setUp(self):
+        load_references()
+
+    def tearDown(self):
+        references.invalidate()
+
+    def test_batch_is_saved_once_without_severity_queries(self):
+        repo = Mock()
+        telegram = Mock(channel_name="telegram")
+        telegram.send.return_value = True
+        service = NotificationService(repo=repo, channels=[telegram])
+        db = MagicMock()
+        events = [
+            Mock(id=1, severity_id=5, raw_data={"service": "nginx"}, source_os_id=1, source_category_id=1),
+            Mock(id=2, severity_id=2, raw_data={}, source_os_id=1, source_category_id=1),
+            Mock(id=3, severity_id=5, raw_data={"service": "sshd"}, source_os_id=1, source_category_id=2),
+        ]
+
+        notifications = service.notify_critical_events(db, events)
+
+        self.assertEqual([n.event_id for n in notifications], [1, 3])
+        self.assertEqual(notifications[1].title, "Обнаружено критическое событие в службе sshd")
+        self.assertEqual({n.status for n in notifications}, {"sent"})
+        repo.add_many.assert_called_once_with(db, notifications)
+        repo.add.assert_not_called()
+        db.execute.assert_not_called()
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
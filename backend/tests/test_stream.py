@@ -0,0 +1,235 @@
+"""
+Тесты потока изменений: шина pub/sub, раздача SSE-клиентам и догон
+по Last-Event-ID.
+
+База — SQLite в памяти (одно соединение на все потоки).
+
+Запуск:
+    python -m pytest tests/test_stream.py -v
+"""
+
+import asyncio
+import datetime as dt
+import json
+import threading
+import unittest
+from unittest.mock import Mock
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event as sa_event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import siem_backend.data.models_user  # noqa: F401
+from siem_backend.api.stream import (
+    StreamCursor,
+    StreamFrame,
+    StreamHub,
+    decode_position,
+    encode_position,
+    event_stream,
+)
+from siem_backend.data.models import Event, Incident
+from siem_backend.data.reference import references
+from siem_backend.data.schemas import Base
+from siem_backend.services.incident_service import IncidentService
+from siem_backend.services.notifications import NotificationService
+from siem_backend.services.stream_bus import StreamBus
+from tests.mocks import load_references
+
+BASE = dt.datetime(2026, 3, 28, 12, 0, 0)
+
+
+class FakeRequest:
+    """Запрос, клиент которого не отключается."""
+
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+def parse_frames(chunks):
+    """Сообщения SSE -> [(id, event, data)] без retry и пингов."""
+    frames = []
+    for chunk in chunks:
+        fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n") if not line.startswith(":"))
+        if "event" in fields:
+            frames.append((fields["id"], fields["event"], json.loads(fields["data"])))
+    return frames
+
+
+class StreamDatabaseTestCase(unittest.TestCase):
+    """Общая база в памяти с событиями 1..3."""
+
+    def setUp(self):
+        load_references()
+        self.engine = create_engine(
+            "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+        )
+        Base.metadata.create_all(self.engine)
+        self.sessions = sessionmaker(bind=self.engine)
+        for i in range(1, 4):
+            self.add_event(i)
+
+    def tearDown(self):
+        self.engine.dispose()
+        references.invalidate()
+
+    def add_event(self, i: int) -> None:
+        with self.sessions() as db:
+            db.execute(insert(Event), [{
+                "ts": BASE + dt.timedelta(seconds=i),
+                "source_os_id": 2,
+                "source_category_id": 4,
+                "event_type_id": 7,
+                "severity_id": 3,
+                "message": f"nginx.service: Main process exited {i}",
+                "raw_data": {"service": "nginx"},
+            }])
+            db.commit()
+
+
+class TestStreamBus(StreamDatabaseTestCase):
+
+    def test_publish_fans_out_and_isolates_failures(self):
+        bus = StreamBus()
+        received = []
+        bus.subscribe(Mock(side_effect=RuntimeError("subscriber down")))
+        bus.subscribe(received.append)
+
+        bus.publish("event", [3, 1, 1, None])
+        bus.publish("event", [])
+        bus.publish("incidents_resolved", count=2)
+
+        self.assertEqual([(m.topic, m.ids, m.data) for m in received], [
+            ("event", (1, 3), {}),
+            ("incidents_resolved", (), {"count": 2}),
+        ])
+
+    def test_services_publish_after_commit(self):
+        bus = Mock(spec=StreamBus)
+        with self.sessions() as db:
+            db.execute(insert(Incident), [{
+                "detected_at": BASE, "incident_type_id": 3, "severity_id": 4, "description": "crash", "details": {},
+            }])
+            db.commit()
+
+            NotificationService(channels=[], bus=bus).create_notification(db, "incident", "high", "title", "message")
+            IncidentService(bus=bus).resolve_incident(db, 1, username="operator")
+
+        self.assertEqual(bus.publish.call_args_list[0].args, ("notification", [1]))
+        self.assertEqual(bus.publish.call_args_list[1].args, ("incident", [1]))
+        self.assertEqual(bus.publish.call_args_list[1].kwargs, {"created": False})
+
+
+class TestStreamHub(StreamDatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.bus = StreamBus()
+        self.hub = StreamHub(bus=self.bus, session_factory=self.sessions, queue_size=10)
+
+    def test_live_frames_are_loaded_once_for_all_clients(self):
+        statements = []
+        sa_event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            clients = [self.hub.connect(loop) for _ in range(3)]
+            await asyncio.to_thread(self.bus.publish, "event", [2, 3])
+            batches = [await asyncio.wait_for(client.queue.get(), timeout=5) for client in clients]
+            for client in clients:
+                self.hub.disconnect(client)
+            return batches
+
+        batches = asyncio.run(scenario())
+
+        self.assertTrue(all(batch is batches[0] for batch in batches))
+        self.assertEqual([frame.row_id for frame in batches[0]], [2, 3])
+        self.assertEqual(json.loads(batches[0][0].data)["app"], "nginx")
+        self.assertEqual(len(statements), 1)
+        # Без клиентов хаб отписан: публикация ничего не читает
+        self.bus.publish("event", [1])
+        self.assertEqual(len(statements), 1)
+
+    def test_publisher_does_not_wait_for_loading(self):
+        gate = threading.Event()
+
+        def blocked_session():
+            gate.wait(5)
+            return self.sessions()
+
+        hub = StreamHub(bus=self.bus, session_factory=blocked_session, queue_size=10)
+
+        async def scenario():
+            client = hub.connect(asyncio.get_running_loop())
+            # Хаб ещё не может читать БД, а публикация уже вернулась
+            self.bus.publish("event", [1])
+            self.bus.publish("event", [2])
+            gate.set()
+            frames = []
+            while len(frames) < 2:
+                frames.extend(await asyncio.wait_for(client.queue.get(), timeout=5))
+            hub.disconnect(client)
+            return frames
+
+        frames = asyncio.run(scenario())
+
+        self.assertEqual([frame.row_id for frame in frames], [1, 2])
+
+    def _run_stream(self, position, count, replay_limit=500, during=None):
+        async def scenario():
+            stream = event_stream(FakeRequest(), position, hub=self.hub, heartbeat_seconds=5, replay_limit=replay_limit)
+            chunks = []
+            try:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    if during is not None and "event: ready" in chunk:
+                        await asyncio.to_thread(during)
+                    if len(parse_frames(chunks)) == count:
+                        break
+            finally:
+                await stream.aclose()
+            return parse_frames(chunks)
+
+        return asyncio.run(scenario())
+
+    def test_resume_replays_missed_rows_then_goes_live(self):
+        def live():
+            # 3 уже отправлен догоном, 4 — новый
+            self.add_event(4)
+            self.bus.publish("event", [3, 4])
+
+        frames = self._run_stream({"event": 1, "incident": 0, "notification": 0}, count=4, during=live)
+
+        self.assertEqual([(frame_id, name) for frame_id, name, _ in frames], [
+            ("2.0.0", "event"), ("3.0.0", "event"), ("3.0.0", "ready"), ("4.0.0", "event"),
+        ])
+        self.assertEqual([data.get("id") for _, _, data in frames], [2, 3, None, 4])
+
+    def test_cursor_sends_ids_below_position_once(self):
+        cursor = StreamCursor({"event": 3, "incident": 0, "notification": 0})
+        # Второй писатель зафиксировал 4 позже, чем очередь записи — 5
+        frames = [StreamFrame(event="event", data="{}", topic="event", row_id=i, created=True) for i in (5, 5, 4)]
+
+        sent = [cursor.advance(frame) for frame in frames]
+
+        self.assertEqual(sent, [True, False, True])
+        self.assertEqual(encode_position(cursor.position), "5.0.0")
+
+    def test_reset_when_gap_exceeds_replay_limit(self):
+        frames = self._run_stream({"event": 0, "incident": 0, "notification": 0}, count=1, replay_limit=2)
+
+        self.assertEqual(frames, [("3.0.0", "reset", {})])
+
+    def test_position_round_trip_and_validation(self):
+        position = {"event": 120, "incident": 45, "notification": 7}
+        self.assertEqual(decode_position(encode_position(position)), position)
+
+        for token in ("120.45", "a.b.c", "1.2.-3", ""):
+            with self.assertRaises(HTTPException) as raised:
+                decode_position(token)
+            self.assertEqual(raised.exception.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
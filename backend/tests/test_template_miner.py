@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import MagicMock, Mock
+
+from siem_backend.services.event_template_service import EventTemplateService
+from siem_backend.services.template_miner import TemplateMiner, tokenize
+
+
+class TestTemplateMiner(unittest.TestCase):
+    """Тесты майнера шаблонов сообщений."""
+
+    def test_tokenize_masks_numbers_and_addresses(self):
+        self.assertEqual(
+            tokenize("nginx[2535]: Connection timeout to 192.168.1.100:443 id=0x1f3a"),
+            ["nginx[<*>]:", "Connection", "timeout", "to", "<*>", "id=<*>"],
+        )
+
+    def test_variable_tokens_merge_into_wildcard(self):
+        miner = TemplateMiner()
+        first, created = miner.add_message("sshd[1409]: Failed password for user root")
+        second, changed = miner.add_message("sshd[9935]: Failed password for user admin")
+
+        self.assertTrue(created)
+        self.assertTrue(changed)
+        self.assertIs(first, second)
+        self.assertEqual(second.template, "sshd[<*>]: Failed password for user <*>")
+        self.assertEqual(second.size, 2)
+
+        _, changed = miner.add_message("sshd[1]: Failed password for user operator")
+        self.assertFalse(changed)
+
+    def test_different_messages_get_different_clusters(self):
+        miner = TemplateMiner()
+        crash, _ = miner.add_message("zoom[1]: Application crashed: out of memory")
+        dns, _ = miner.add_message("nginx[2]: DNS lookup failed for backend-server")
+        login, _ = miner.add_message("sshd[3]: Failed login attempt for user admin")
+
+        self.assertEqual(len({id(crash), id(dns), id(login)}), 3)
+        self.assertEqual(len(list(miner.clusters())), 3)
+
+    def test_loaded_template_is_matched(self):
+        miner = TemplateMiner()
+        miner.load(42, "sshd[<*>]: Failed password for user <*>", size=10)
+
+        cluster, changed = miner.add_message("sshd[7]: Failed password for user guest")
+
+        self.assertEqual(cluster.template_id, 42)
+        self.assertFalse(changed)
+        self.assertEqual(cluster.size, 11)
+        self.assertIsNone(miner.match("completely different message"))
+
+
+class TestEventTemplateService(unittest.TestCase):
+    """Тесты привязки событий к шаблонам."""
+
+    def setUp(self):
+        EventTemplateService.invalidate()
+
+    def tearDown(self):
+        EventTemplateService.invalidate()
+
+    def test_assign_creates_templates_once(self):
+        repo = Mock()
+        repo.list_all.return_value = []
+        repo.add.side_effect = [Mock(id=1), Mock(id=2)]
+        service = EventTemplateService(repo=repo)
+        db = MagicMock()
+
+        ids = service.assign(db, [
+            "sshd[1]: Failed password for user root",
+            "nginx[2]: DNS lookup failed for backend-server",
+            "sshd[3]: Failed password for user root",
+        ])
+
+        self.assertEqual(ids, [1, 2, 1])
+        self.assertEqual(repo.add.call_count, 2)
+        repo.apply_changes.assert_called_once_with(db, {}, {1: 2, 2: 1})
+
+    def test_changed_template_is_updated(self):
+        repo = Mock()
+        template = Mock(id=5, template="sshd[<*>]: Failed password for user root", size=3)
+        repo.list_all.return_value = [template]
+        service = EventTemplateService(repo=repo)
+        db = MagicMock()
+
+        ids = service.assign(db, ["sshd[9]: Failed password for user admin"])
+
+        self.assertEqual(ids, [5])
+        repo.add.assert_not_called()
+        repo.apply_changes.assert_called_once_with(db, {5: "sshd[<*>]: Failed password for user <*>"}, {5: 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
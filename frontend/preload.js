@@ -31,6 +31,25 @@ contextBridge.exposeInMainWorld('electronAPI', {
     }
   },
 
+  // Потоковое чтение ответа (SSE /api/stream): куски текста передаются в onChunk
+  stream: (url, options, onChunk) => {
+    const controller = new AbortController();
+    const done = (async () => {
+      const response = await fetch(url, { ...options, signal: controller.signal });
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+      }
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      for (;;) {
+        const { value, done: finished } = await reader.read();
+        if (finished) break;
+        onChunk(decoder.decode(value, { stream: true }));
+      }
+    })();
+    return { done, cancel: () => controller.abort() };
+  },
+
   // Метод для сохранения данных перед закрытием
   saveAppState: (key, value) => {
     try {
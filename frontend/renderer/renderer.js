@@ -6,6 +6,10 @@ const POLL_INTERVAL_MS = 10000;
 const AUTH_CREDS_KEY = 'siem_auth_creds';
 
 let allIncidents = [];
+// Кэши дашборда: пополняются из потока /api/stream без повторных запросов списков
+let eventsForStats = [];
+let notificationsHistory = [];
+let dashboardLoaded = false;
 let seenIncidentIds = new Set();
 let drilldownSeverity = null;
 let drilldownQuery = '';
@@ -17,6 +21,14 @@ const FAST_POLL_INTERVAL_MS = 3000;  // 3 секунды — реальное в
 const SLOW_POLL_INTERVAL_MS = 10000; // 10 секунд
 const FAST_POLL_DURATION_MS = 10 * 60 * 1000; // 10 минут быстрого polling
 
+const EVENTS_CACHE_SIZE = 500;
+const HISTORY_SIZE = 20;
+// Поля событий дашборда — те же, что приходят в потоке
+const DASHBOARD_EVENT_FIELDS = 'id,ts,source_os,source_category,event_type,severity,message,app';
+const STREAM_RETRY_MS = 3000;
+let streamLastEventId = null;
+let streamRenderTimer = null;
+
 function getAuthHeaders() {
   const creds = localStorage.getItem(AUTH_CREDS_KEY);
   if (!creds) return {};
@@ -208,18 +220,18 @@ async function collectFileEvents() {
   showOutput('Сбор реальных логов из system.log...');
   try {
     const data = await apiCall(
-      '/api/collect/file?max_lines=200',
+      '/api/collect/file?max_lines=200&wait=true',
       { method: 'POST' }
     );
     const collected = data?.collected_count ?? 0;
-    const saved = data?.saved_count ?? 0;
+    const queued = data?.queued_count ?? data?.saved_count ?? 0;
     const filePath = data?.file_path ?? 'unknown';
     if (collected === 0) {
       showOutput('В файле логов нет новых событий.\nПуть к файлу: ' + filePath);
       return;
     }
     showOutput(
-      `События собраны.\nСохранено: ${saved}\nПуть: ${filePath}\n\nЗагрузка событий...`
+      `События собраны.\nПередано на запись: ${queued}\nПуть: ${filePath}\n\nЗагрузка событий...`
     );
     await loadEvents();
     await checkNewIncidents();
@@ -269,84 +281,84 @@ async function fetchIncidents() {
   return Array.isArray(data) ? data : [];
 }
 
-async function loadEventsHistory() {
+function renderEventsHistory(events) {
   const listEl = document.getElementById('eventsHistory');
   if (!listEl) return;
-  try {
-    const data = await apiCall('/api/events/?limit=20&offset=0');
-    listEl.innerHTML = '';
-    if (!Array.isArray(data) || data.length === 0) {
-      listEl.innerHTML = '<div class="history-empty">Событий нет</div>';
-      return;
-    }
-    for (const ev of data) {
-      const dt = ev.ts ? new Date(ev.ts) : null;
-      const timeStr = dt ? dt.toLocaleString('ru-RU', { dateStyle: 'short', timeStyle: 'medium' }) : '—';
-      const title = `${ev.event_type || ''} [${ev.severity || ''}]`.trim();
-
-      const sourceCat = {
-        'service': 'Сервис',
-        'user_process': 'Приложение',
-        'os': 'ОС'
-      }[ev.source_category] || ev.source_category;
-
-      const meta = `${timeStr} · ${sourceCat} · ${ev.source_os || ''}`;
-      const item = document.createElement('div');
-      item.className = 'history-item';
-      item.innerHTML = `<div class="history-item-title">${escapeHtml(title || 'Событие')}</div><div class="history-item-meta">${escapeHtml(meta)}</div>`;
-      listEl.appendChild(item);
-    }
-  } catch (_) {
-    listEl.innerHTML = '<div class="history-empty">Не удалось загрузить события</div>';
+  listEl.innerHTML = '';
+  if (events.length === 0) {
+    listEl.innerHTML = '<div class="history-empty">Событий нет</div>';
+    return;
+  }
+  for (const ev of events.slice(0, HISTORY_SIZE)) {
+    const dt = ev.ts ? new Date(ev.ts) : null;
+    const timeStr = dt ? dt.toLocaleString('ru-RU', { dateStyle: 'short', timeStyle: 'medium' }) : '—';
+    const title = `${ev.event_type || ''} [${ev.severity || ''}]`.trim();
+
+    const sourceCat = {
+      'service': 'Сервис',
+      'user_process': 'Приложение',
+      'os': 'ОС'
+    }[ev.source_category] || ev.source_category;
+
+    const meta = `${timeStr} · ${sourceCat} · ${ev.source_os || ''}`;
+    const item = document.createElement('div');
+    item.className = 'history-item';
+    item.innerHTML = `<div class="history-item-title">${escapeHtml(title || 'Событие')}</div><div class="history-item-meta">${escapeHtml(meta)}</div>`;
+    listEl.appendChild(item);
   }
 }
 
-async function loadNotificationsHistory() {
+function renderNotificationsHistory(notifications) {
   const listEl = document.getElementById('notificationsHistory');
   if (!listEl) return;
+  listEl.innerHTML = '';
+  if (notifications.length === 0) {
+    listEl.innerHTML = '<div class="history-empty">Уведомлений нет</div>';
+    return;
+  }
+  for (const n of notifications.slice(0, HISTORY_SIZE)) {
+    const dt = n.created_at ? new Date(n.created_at) : null;
+    const timeStr = dt ? dt.toLocaleString('ru-RU', { dateStyle: 'short', timeStyle: 'medium' }) : '—';
+    const title = n.title || 'Уведомление';
+    const metaParts = [];
+    if (n.severity) metaParts.push(n.severity);
+    if (n.notification_type) metaParts.push(n.notification_type);
+    metaParts.push(timeStr);
+    const meta = metaParts.join(' · ');
+    const item = document.createElement('div');
+    item.className = 'history-item';
+    item.innerHTML = `<div class="history-item-title">${escapeHtml(title)}</div><div class="history-item-meta">${escapeHtml(meta)}</div>`;
+    listEl.appendChild(item);
+  }
+}
+
+async function loadNotificationsHistory() {
+  const listEl = document.getElementById('notificationsHistory');
   try {
-    const data = await apiCall('/api/notifications/?limit=20&offset=0');
-    listEl.innerHTML = '';
-    if (!Array.isArray(data) || data.length === 0) {
-      listEl.innerHTML = '<div class="history-empty">Уведомлений нет</div>';
-      return;
-    }
-    for (const n of data) {
-      const dt = n.created_at ? new Date(n.created_at) : null;
-      const timeStr = dt ? dt.toLocaleString('ru-RU', { dateStyle: 'short', timeStyle: 'medium' }) : '—';
-      const title = n.title || 'Уведомление';
-      const metaParts = [];
-      if (n.severity) metaParts.push(n.severity);
-      if (n.notification_type) metaParts.push(n.notification_type);
-      metaParts.push(timeStr);
-      const meta = metaParts.join(' · ');
-      const item = document.createElement('div');
-      item.className = 'history-item';
-      item.innerHTML = `<div class="history-item-title">${escapeHtml(title)}</div><div class="history-item-meta">${escapeHtml(meta)}</div>`;
-      listEl.appendChild(item);
-    }
+    const data = await apiCall(`/api/notifications/?limit=${HISTORY_SIZE}&offset=0`);
+    notificationsHistory = Array.isArray(data) ? data : [];
+    renderNotificationsHistory(notificationsHistory);
   } catch (_) {
-    listEl.innerHTML = '<div class="history-empty">Не удалось загрузить уведомления</div>';
+    if (listEl) listEl.innerHTML = '<div class="history-empty">Не удалось загрузить уведомления</div>';
   }
 }
 
-async function loadHistory() {
-  await Promise.all([loadEventsHistory(), loadNotificationsHistory()]);
+function notifyNewIncidents(list) {
+  let changed = false;
+  for (const inc of list) {
+    const id = inc.id;
+    if (id != null && !seenIncidentIds.has(id)) {
+      seenIncidentIds.add(id);
+      changed = true;
+      showNewIncidentToast(inc);
+    }
+  }
+  if (changed) saveSeenIncidentIds();
 }
 
 async function checkNewIncidents() {
   try {
-    const list = await fetchIncidents();
-    let changed = false;
-    for (const inc of list) {
-      const id = inc.id;
-      if (id != null && !seenIncidentIds.has(id)) {
-        seenIncidentIds.add(id);
-        changed = true;
-        showNewIncidentToast(inc);
-      }
-    }
-    if (changed) saveSeenIncidentIds();
+    notifyNewIncidents(await fetchIncidents());
   } catch (_) {}
 }
 
@@ -873,7 +885,7 @@ function switchView(viewName) {
 
 async function loadEventsChart() {
   try {
-    const events = await apiCall('/api/events/?limit=500&offset=0');
+    const events = await apiCall('/api/events/?limit=500&offset=0&fields=ts,severity');
     const data = buildEventsByHour(events || []);
     renderEventsByHourChart(data);
   } catch (_) {
@@ -888,29 +900,30 @@ async function loadEventsChart() {
   }
 }
 
+function renderDashboard() {
+  renderSeverityChart(buildSeverityCounts(allIncidents));
+  renderRecentEvents(eventsForStats);
+  updateDashboardStats({ events: eventsForStats, incidents: allIncidents });
+  renderEventsByHourChart(buildEventsByHour(eventsForStats));
+  renderAppMap(eventsForStats);
+  renderAppErrorsTable(eventsForStats);
+  renderEventsHistory(eventsForStats);
+  renderNotificationsHistory(notificationsHistory);
+}
+
 async function loadIncidentsAndChart() {
   try {
     allIncidents = await fetchIncidents();
-    const counts = buildSeverityCounts(allIncidents);
-    renderSeverityChart(counts);
-    let eventsForStats = [];
     try {
-      const events = await apiCall('/api/events/?limit=500&offset=0');
+      const events = await apiCall(`/api/events/?limit=${EVENTS_CACHE_SIZE}&offset=0&fields=${DASHBOARD_EVENT_FIELDS}`);
       eventsForStats = Array.isArray(events) ? events : [];
     } catch (_) {
       eventsForStats = [];
     }
 
-    renderRecentEvents(eventsForStats);
-    updateDashboardStats({ events: eventsForStats, incidents: allIncidents });
-
-    const eventsData = buildEventsByHour(eventsForStats || []);
-    renderEventsByHourChart(eventsData);
-
-    renderAppMap(eventsForStats);
-    renderAppErrorsTable(eventsForStats);
-
-    await loadHistory();
+    renderDashboard();
+    await loadNotificationsHistory();
+    dashboardLoaded = true;
   } catch (_) {
     const container = document.getElementById('chartContainer');
     if (container) container.innerHTML = '<p class="chart-empty">Не удалось загрузить инциденты.</p>';
@@ -1116,9 +1129,8 @@ if (window.location.pathname.endsWith('login.html')) {
         document.querySelectorAll('[data-require-admin]').forEach(el => el.style.display = 'none');
       }
 
-      loadIncidentsAndChart();
-      checkNewIncidents();
-
+      // Списки загружаются по первому ready из потока — без окна между загрузкой и подпиской
+      startStream();
       startPolling();
     } catch (err) {
     }
@@ -1172,43 +1184,26 @@ if (window.location.pathname.endsWith('login.html')) {
 function startPolling() {
   let pollingInterval = null;
 
-  function startInterval(intervalMs) {
-    if (pollingInterval) {
-      clearInterval(pollingInterval);
-    }
-    pollingInterval = setInterval(runPoll, intervalMs);
-  }
-
+  // Опрос только запускает сбор и анализ; данные на экран приходят из потока (startStream)
   function runPoll() {
     if (!currentUser) return;
 
-    const now = Date.now();
-    const isFastPolling = now < fastPollingUntil;
-
-    // Сначала собираем новые события из файла логов (для ВСЕХ пользователей)
-    if (isFastPolling) {
-      try {
-        apiCall('/api/collect/auto', { method: 'POST' })
-          .catch(() => {});
-      } catch (_) {}
-    }
-
-    // Затем запускаем анализ инцидентов (для ВСЕХ пользователей)
-    if (isFastPolling) {
-      try {
-        apiCall('/api/analyze/run?since_minutes=60', { method: 'POST' })
-          .catch(() => {});
-      } catch (_) {}
+    if (Date.now() >= fastPollingUntil) {
+      if (currentUser.role !== 'admin') {
+        clearInterval(pollingInterval);
+        pollingInterval = null;
+        return;
+      }
+      fastPollingUntil = Date.now() + FAST_POLL_DURATION_MS;
     }
 
-    // Обновляем данные на экране
-    checkNewIncidents();
-    loadIncidentsAndChart();
+    // Сначала собираем новые события из файла логов
+    apiCall('/api/collect/auto', { method: 'POST' })
+      .catch(() => {});
 
-    if (!isFastPolling && currentUser.role === 'admin') {
-      fastPollingUntil = Date.now() + FAST_POLL_DURATION_MS;
-      startInterval(FAST_POLL_INTERVAL_MS);
-    }
+    // Затем запускаем анализ инцидентов
+    apiCall('/api/analyze/run?since_minutes=60', { method: 'POST' })
+      .catch(() => {});
   }
 
   // Проверяем наличие currentUser перед запуском
@@ -1217,13 +1212,141 @@ function startPolling() {
     return;
   }
 
-  // Для всех пользователей: быстрый polling первую минуту, потом медленный
+  // Для всех пользователей: быстрый сбор первые 10 минут, у администратора — постоянно
   fastPollingUntil = Date.now() + FAST_POLL_DURATION_MS;
-  startInterval(FAST_POLL_INTERVAL_MS);
+  pollingInterval = setInterval(runPoll, FAST_POLL_INTERVAL_MS);
 
   scheduleMidnightRefresh();
 }
 
+// Потоковое чтение ответа: через preload (electronAPI.stream) или fetch в браузере
+function openStream(url, headers, onChunk) {
+  if (window.electronAPI?.stream) {
+    return window.electronAPI.stream(url, { headers }, onChunk);
+  }
+  const controller = new AbortController();
+  const done = (async () => {
+    const resp = await fetch(url, { headers, signal: controller.signal });
+    if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+    const reader = resp.body.getReader();
+    const decoder = new TextDecoder();
+    for (;;) {
+      const { value, done: finished } = await reader.read();
+      if (finished) break;
+      onChunk(decoder.decode(value, { stream: true }));
+    }
+  })();
+  return { done, cancel: () => controller.abort() };
+}
+
+// Поток изменений /api/stream (SSE) вместо периодического перечитывания списков
+function startStream() {
+  function connect() {
+    if (!currentUser) return;
+    const headers = { ...getAuthHeaders() };
+    if (streamLastEventId) headers['Last-Event-ID'] = streamLastEventId;
+    const fresh = !streamLastEventId;
+
+    let buffer = '';
+    const stream = openStream(API_BASE + '/api/stream/', headers, (chunk) => {
+      buffer += chunk.replace(/\r\n/g, '\n');
+      let sep;
+      while ((sep = buffer.indexOf('\n\n')) >= 0) {
+        const block = buffer.slice(0, sep);
+        buffer = buffer.slice(sep + 2);
+        handleStreamBlock(block, fresh);
+      }
+    });
+
+    Promise.resolve(stream.done)
+      .catch(() => {
+        // Поток недоступен — хотя бы один раз показываем данные из списков
+        if (!dashboardLoaded) {
+          loadIncidentsAndChart();
+          checkNewIncidents();
+        }
+      })
+      .finally(() => setTimeout(connect, STREAM_RETRY_MS));
+  }
+
+  connect();
+}
+
+function handleStreamBlock(block, fresh) {
+  let id = null;
+  let event = 'message';
+  let data = '';
+  for (const line of block.split('\n')) {
+    if (!line || line.startsWith(':')) continue;
+    const idx = line.indexOf(':');
+    const field = idx >= 0 ? line.slice(0, idx) : line;
+    const value = idx >= 0 ? line.slice(idx + 1).replace(/^ /, '') : '';
+    if (field === 'id') id = value;
+    else if (field === 'event') event = value;
+    else if (field === 'data') data += value;
+  }
+  if (id !== null) streamLastEventId = id;
+  if (event === 'message') return;
+
+  let payload = {};
+  try {
+    payload = data ? JSON.parse(data) : {};
+  } catch (_) {
+    return;
+  }
+  applyStreamMessage(event, payload, fresh);
+}
+
+function prependUnique(list, item, limit) {
+  if (list.some(existing => existing.id === item.id)) return;
+  list.unshift(item);
+  if (list.length > limit) list.length = limit;
+}
+
+function applyStreamMessage(event, payload, fresh) {
+  switch (event) {
+    case 'ready':
+      // Первое подключение: загружаем списки уже после подписки на поток
+      if (fresh) {
+        loadIncidentsAndChart();
+        checkNewIncidents();
+      }
+      return;
+    case 'reset':
+    case 'incidents_resolved':
+      loadIncidentsAndChart();
+      return;
+    case 'event':
+      prependUnique(eventsForStats, payload, EVENTS_CACHE_SIZE);
+      break;
+    case 'notification':
+      prependUnique(notificationsHistory, payload, HISTORY_SIZE);
+      break;
+    case 'incident': {
+      const idx = allIncidents.findIndex(inc => inc.id === payload.id);
+      if (idx >= 0) {
+        allIncidents[idx] = payload;
+      } else {
+        allIncidents.unshift(payload);
+      }
+      notifyNewIncidents([payload]);
+      break;
+    }
+    default:
+      return;
+  }
+  scheduleDashboardRender();
+}
+
+// Пачка сообщений потока перерисовывает дашборд один раз
+function scheduleDashboardRender() {
+  if (streamRenderTimer) return;
+  streamRenderTimer = setTimeout(() => {
+    streamRenderTimer = null;
+    renderDashboard();
+  }, 300);
+}
+
 async function collectFileEventsSilent() {
   try {
     await apiCall('/api/collect/file?max_lines=200', { method: 'POST' });
@@ -1254,8 +1377,7 @@ function renderAppMap(events) {
   const appErrors = events.filter(ev => {
     const msg = (ev.message || '').toLowerCase();
     const type = (ev.event_type || '').toLowerCase();
-    const raw = ev.raw_data || {};
-    const process = raw.process || raw.service || raw.application || ev.source_category || '';
+    const process = ev.app || ev.source_category || '';
 
     if (systemProcesses.some(sys => process.toLowerCase().includes(sys))) {
       return false;
@@ -1270,8 +1392,7 @@ function renderAppMap(events) {
 
   const appCounts = {};
   for (const ev of appErrors) {
-    const raw = ev.raw_data || {};
-    let appName = raw.process || raw.service || raw.application || ev.source_category || 'Unknown';
+    let appName = ev.app || ev.source_category || 'Unknown';
 
     if (!appName || appName === 'Unknown') {
       const match = (ev.message || '').match(/([a-zA-Z0-9_-]+)\.service:/);
@@ -1356,8 +1477,7 @@ function renderAppErrorsTable(events) {
     const dt = ev.ts ? new Date(ev.ts) : null;
     const timeStr = dt ? dt.toLocaleTimeString('ru-RU', { timeStyle: 'short' }) : '—';
 
-    const raw = ev.raw_data || {};
-    let appName = raw.process || raw.service || raw.application || ev.source_category || 'Unknown';
+    let appName = ev.app || ev.source_category || 'Unknown';
 
     let errorMsg = ev.message || '';
     if (errorMsg.length > 80) {